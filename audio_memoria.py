@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download dos áudios do Telegram direto para a memória
+O arquivo só vai para o disco acima do limite configurado e, mesmo
+assim, é apagado automaticamente ao ser fechado. Abaixo do limite o
+buffer é um BytesIO: um SpooledTemporaryFile iria para o disco de
+qualquer jeito no envio, porque o httpx chama fileno() para medir o arquivo
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+# ========== CONFIGURAÇÕES ==========
+# Acima desse tamanho (bytes) o áudio é gravado num arquivo temporário
+AUDIO_LIMITE_MEMORIA = int(os.environ.get('AUDIO_LIMITE_MEMORIA', str(10 * 1024 * 1024)))
+
+
+def novo_buffer(tamanho=None, limite_memoria=AUDIO_LIMITE_MEMORIA):
+    """BytesIO até o limite; acima dele, arquivo temporário sem nome (apagado ao fechar)"""
+    if tamanho is not None and tamanho > limite_memoria:
+        return tempfile.TemporaryFile(suffix='.ogg')
+    return io.BytesIO()
+
+
+def _limitar(buffer, limite_memoria):
+    """Tamanho desconhecido que passou do limite: move o conteúdo para o disco"""
+    if not isinstance(buffer, io.BytesIO) or buffer.getbuffer().nbytes <= limite_memoria:
+        return buffer
+    arquivo = tempfile.TemporaryFile(suffix='.ogg')
+    buffer.seek(0)
+    shutil.copyfileobj(buffer, arquivo)
+    buffer.close()
+    return arquivo
+
+
+async def baixar_audio(voice, limite_memoria=AUDIO_LIMITE_MEMORIA):
+    """Baixa o áudio para um buffer em memória, já posicionado no início"""
+    arquivo = await voice.get_file()
+
+    buffer = novo_buffer(arquivo.file_size, limite_memoria)
+    try:
+        await arquivo.download_to_memory(buffer)
+        buffer = _limitar(buffer, limite_memoria)
+    except Exception:
+        buffer.close()
+        raise
+
+    buffer.seek(0)
+    return buffer
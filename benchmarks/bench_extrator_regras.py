@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do extrator local por regras
+Roda o corpus rotulado e mede quantas frases dispensam o LLM (confiança
+acima do limiar), a precisão dessas respostas e o tempo economizado
+
+Uso: python benchmarks/bench_extrator_regras.py [latencia_llm_ms] [limiar]
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from extrator_regras import EXTRATOR_LIMIAR, dobrar, extrair_por_regras
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus_extracao.jsonl')
+
+# Campos comparados além de tipo/obra/valor, quando o rótulo os traz
+CAMPOS_EXTRAS = ('categoria', 'funcao', 'nome_funcionario')
+
+
+def carregar_corpus(caminho=CORPUS):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def divergencias(esperado, obtido):
+    """Lista os campos em que a extração difere do rótulo"""
+    erros = []
+    if obtido['tipo'] != esperado['tipo']:
+        erros.append('tipo')
+    if dobrar(obtido['obra']) != dobrar(esperado['obra']):
+        erros.append('obra')
+    if abs(float(obtido['valor']) - float(esperado['valor'])) > 0.005:
+        erros.append('valor')
+    for campo in CAMPOS_EXTRAS:
+        if campo in esperado and dobrar(obtido.get(campo, '')) != dobrar(esperado[campo]):
+            erros.append(campo)
+    # As regras só datam "hoje": outra data no rótulo tinha de ir para o LLM
+    if esperado.get('data', 'hoje') != 'hoje':
+        erros.append('data')
+    return erros
+
+
+def main():
+    latencia_llm = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 1.5
+    limiar = float(sys.argv[2]) if len(sys.argv) > 2 else EXTRATOR_LIMIAR
+    corpus = carregar_corpus()
+
+    aceitas, corretas = 0, 0
+    inicio = time.perf_counter()
+    for exemplo in corpus:
+        dados = extrair_por_regras(exemplo['texto'])
+        if dados['confianca'] < limiar:
+            continue
+        aceitas += 1
+        erros = divergencias(exemplo, dados)
+        if erros:
+            print(f"❌ {exemplo['texto']}  →  {', '.join(erros)}")
+        else:
+            corretas += 1
+    duracao = time.perf_counter() - inicio
+
+    total = len(corpus)
+    print("=" * 50)
+    print(f"📊 Extrator por regras (limiar {limiar:.2f}, LLM {latencia_llm * 1000:.0f} ms)")
+    print("=" * 50)
+    print(f"Frases no corpus:        {total}")
+    print(f"Resolvidas sem LLM:      {aceitas} ({aceitas / total:.0%})")
+    print(f"Corretas entre elas:     {corretas}/{aceitas} ({corretas / max(aceitas, 1):.0%})")
+    print(f"Tempo por frase:         {duracao / total * 1000:.3f} ms")
+    print(f"Chamadas ao LLM evitadas: {aceitas}")
+    print(f"Latência economizada:    {aceitas * latencia_llm:.1f}s "
+          f"(média {aceitas * latencia_llm / total * 1000:.0f} ms por frase)")
+
+
+if __name__ == "__main__":
+    main()
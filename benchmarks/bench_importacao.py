@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da importação em lote (importacao.py) com OpenAI e Google falsos
+Monta um zip de áudios no formato do WhatsApp e uma lista de texto e
+compara a importação um item por vez (como mandar cada áudio à mão) com
+a importação em lote: itens por segundo, chamadas à OpenAI e ao Google e
+tempo até as planilhas ficarem em dia. No fim reimporta o mesmo zip para
+conferir que nada é gravado de novo
+
+Uso: python benchmarks/bench_importacao.py [--bot railway|v4] [--audios N] [--linhas N]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import zipfile
+import argparse
+import tempfile
+import importlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from falsos import GoogleFalso, OpenAIFalso, audio_falso
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus_extracao.jsonl')
+MODULOS = {'railway': 'bot_telegram_railway', 'v4': 'bot_telegram_v4'}
+
+
+def frases(quantidade, semente):
+    with open(CORPUS, encoding='utf-8') as arquivo:
+        corpus = [json.loads(linha)['texto'] for linha in arquivo if linha.strip()]
+    rng = random.Random(semente)
+    return [rng.choice(corpus) for _ in range(quantidade)]
+
+
+def montar_zip(caminho, quantidade, semente):
+    """Zip com PTT-AAAAMMDD-WAnnnn.opus, como na exportação do WhatsApp"""
+    with zipfile.ZipFile(caminho, 'w') as arquivo_zip:
+        for numero, frase in enumerate(frases(quantidade, semente)):
+            nome = f"PTT-202401{numero % 28 + 1:02d}-WA{numero:04d}.opus"
+            arquivo_zip.writestr(nome, audio_falso(frase, 20_000))
+
+
+def montar_texto(caminho, quantidade, semente):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write("# lançamentos da obra\n")
+        for numero, frase in enumerate(frases(quantidade, semente)):
+            arquivo.write(f"{numero % 28 + 1:02d}/02/2024 - {frase}\n")
+
+
+async def importar(bot, caminho, concorrencia, openai, google):
+    """Importa e espera as linhas chegarem às planilhas; retorna as medidas"""
+    chamadas_openai = sum(openai.chamadas.values())
+    chamadas_google = sum(google.chamadas.values())
+    linhas = google.linhas_anexadas
+
+    relatorio = await bot.importar(caminho, concorrencia=concorrencia)
+    fim = time.perf_counter()
+    bot.sincronizador.acordar()
+    while (google.linhas_anexadas - linhas < relatorio.importados
+           and time.perf_counter() - fim < 120):
+        await asyncio.sleep(0.05)
+
+    return {
+        "relatorio": relatorio,
+        "planilha": time.perf_counter() - fim,
+        "openai": sum(openai.chamadas.values()) - chamadas_openai,
+        "google": sum(google.chamadas.values()) - chamadas_google,
+    }
+
+
+def mostrar(titulo, medida):
+    r = medida["relatorio"]
+    print(f"\n{titulo}")
+    print(f"  {r.importados} importados, {r.duplicados} já registrados, {len(r.falhas)} falhas "
+          f"em {r.segundos:.1f}s ({r.vazao:.1f} itens/s)")
+    print(f"  OpenAI: {medida['openai']} chamadas | Google: {medida['google']} chamadas | "
+          f"planilhas em dia {medida['planilha']:.1f}s depois")
+    for nome, erro in r.falhas[:3]:
+        print(f"  ❌ {nome}: {erro[:100]}")
+
+
+async def executar(args):
+    openai = OpenAIFalso(args.latencia_whisper, args.latencia_gpt)
+    await openai.iniciar()
+
+    pasta = tempfile.mkdtemp(prefix='bench_importacao_')
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': "123456:FALSO",
+        'OPENAI_API_KEY': 'sk-falso',
+        'GOOGLE_CREDENTIALS_JSON': '{"falso": true}',
+        'OPENAI_BASE_URL': openai.url,
+        'LIVRO_LANCAMENTOS_DB': os.path.join(pasta, 'lancamentos.db'),
+        'CACHE_PROCESSAMENTO_DB': os.path.join(pasta, 'cache.db'),
+        'REGISTRO_OBRAS_DB': os.path.join(pasta, 'registro.db'),
+    })
+    bot = importlib.import_module(MODULOS[args.bot])
+    google = GoogleFalso(args.latencia_google, bot.limitador_google)
+    cliente_google = google.cliente()
+    bot.gerenciador_google.obter = lambda: cliente_google
+    bot.sincronizador.iniciar()
+
+    um_por_vez = os.path.join(pasta, 'um_por_vez.zip')
+    lote = os.path.join(pasta, 'lote.zip')
+    lista = os.path.join(pasta, 'lista.txt')
+    montar_zip(um_por_vez, args.audios, 1)
+    montar_zip(lote, args.audios, 2)
+    montar_texto(lista, args.linhas, 3)
+
+    print("=" * 64)
+    print(f"📥 Importação em lote - bot {args.bot}")
+    print("=" * 64)
+    print(f"{args.audios} áudios por zip, {args.linhas} linhas de texto")
+
+    antes = await importar(bot, um_por_vez, 1, openai, google)
+    mostrar("Um por vez (concorrência 1):", antes)
+    depois = await importar(bot, lote, args.concorrencia, openai, google)
+    mostrar(f"Em lote (concorrência {args.concorrencia}):", depois)
+    texto = await importar(bot, lista, args.concorrencia, openai, google)
+    mostrar("Lista de texto:", texto)
+    de_novo = await importar(bot, lote, args.concorrencia, openai, google)
+    mostrar("Mesmo zip de novo:", de_novo)
+
+    ganho = depois["relatorio"].vazao / antes["relatorio"].vazao if antes["relatorio"].vazao else 0
+    print(f"\n🚀 Em lote: {ganho:.1f}x mais itens por segundo")
+
+    await asyncio.get_running_loop().run_in_executor(None, bot.sincronizador.parar)
+    await openai.parar()
+    falhas = sum(len(m["relatorio"].falhas) for m in (antes, depois, texto, de_novo))
+    return 1 if falhas or de_novo["relatorio"].importados else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bot', choices=sorted(MODULOS), default='railway')
+    parser.add_argument('--audios', type=int, default=40)
+    parser.add_argument('--linhas', type=int, default=200)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--latencia-whisper', type=float, default=0.5)
+    parser.add_argument('--latencia-gpt', type=float, default=0.4)
+    parser.add_argument('--latencia-google', type=float, default=0.1)
+    return asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark ponta a ponta dos bots com Telegram, OpenAI e Google falsos
+Sobe a Bot API falsa, a OpenAI falsa (latência configurável) e as
+planilhas em memória, liga o bot escolhido no modo webhook e reproduz
+rajadas de áudios de várias equipes. Mede do envio do update até a
+confirmação final: p50/p95/p99, mensagens por segundo e chamadas a cada
+API por mensagem. Com --json/--comparar dá para acompanhar regressões
+
+Uso: python benchmarks/bench_ponta_a_ponta.py --bot railway|v4|ambos [opções]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import importlib
+import subprocess
+from collections import deque
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from falsos import GoogleFalso, OpenAIFalso, TelegramFalso, audio_falso, porta_livre
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus_extracao.jsonl')
+MODULOS = {'railway': 'bot_telegram_railway', 'v4': 'bot_telegram_v4'}
+TOKEN = "123456:FALSO"
+SEGREDO = "segredo-bench"
+
+# Variação aceita contra a base do --comparar antes de apontar regressão
+TOLERANCIA = 0.10
+
+
+def percentil(valores, p):
+    """Percentil por posição (nearest-rank) de uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    posicao = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[posicao]
+
+
+def resposta_final(texto):
+    """Confirmação, duplicado ou erro: a última mensagem do bot para um áudio"""
+    return '✔️' in texto or texto.startswith('❌') or texto.startswith('♻️')
+
+
+def rajadas(chats, audios, janela, intervalo, semente, textos=0.0):
+    """Linha do tempo [(segundos, chat_id, frase, digitada)]: cada equipe manda uma rajada"""
+    with open(CORPUS, encoding='utf-8') as arquivo:
+        frases = [json.loads(linha)['texto'] for linha in arquivo if linha.strip()]
+    rng = random.Random(semente)
+    eventos = []
+    for indice in range(chats):
+        instante = rng.uniform(0, janela)
+        for _ in range(audios):
+            eventos.append((instante, 1000 + indice, rng.choice(frases), rng.random() < textos))
+            instante += rng.expovariate(1 / intervalo) if intervalo > 0 else 0
+    return sorted(eventos)
+
+
+def preparar_ambiente(args, pasta, telegram, openai):
+    """Variáveis lidas pelos bots na importação (bancos em pasta temporária)"""
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': TOKEN,
+        'OPENAI_API_KEY': 'sk-falso',
+        'GOOGLE_CREDENTIALS_JSON': '{"falso": true}',
+        'TELEGRAM_API_URL': telegram.url,
+        'OPENAI_BASE_URL': openai.url,
+        'LIVRO_LANCAMENTOS_DB': os.path.join(pasta, 'lancamentos.db'),
+        'CACHE_PROCESSAMENTO_DB': os.path.join(pasta, 'cache.db'),
+        'REGISTRO_OBRAS_DB': os.path.join(pasta, 'registro.db'),
+        'BOT_PROCESSOS': '1',
+    })
+    if args.sem_regras:
+        os.environ['EXTRATOR_LIMIAR'] = '2'
+
+
+async def medir(args):
+    eventos = rajadas(args.chats, args.audios, args.janela, args.intervalo, args.semente, args.textos)
+    enviados = {}       # chat_id -> deque de (instante de envio, digitada) na ordem do chat
+    latencias, erros = [], []
+    digitadas = []      # latências das mensagens de texto
+    concluidos = asyncio.Event()
+
+    def ao_enviar(chat_id, texto, instante):
+        if not resposta_final(texto) or not enviados.get(chat_id):
+            return
+        enviado, digitada = enviados[chat_id].popleft()
+        latencias.append(instante - enviado)
+        if digitada:
+            digitadas.append(instante - enviado)
+        if texto.startswith('❌'):
+            erros.append(texto[:120])
+        if len(latencias) == len(eventos):
+            concluidos.set()
+
+    telegram = TelegramFalso(args.latencia_telegram, ao_enviar)
+    openai = OpenAIFalso(args.latencia_whisper, args.latencia_gpt)
+    await telegram.iniciar()
+    await openai.iniciar()
+
+    pasta = tempfile.mkdtemp(prefix='bench_bot_')
+    preparar_ambiente(args, pasta, telegram, openai)
+    from servidor_webhook import CABECALHO_SEGREDO, servir_webhook
+    bot = importlib.import_module(MODULOS[args.bot])
+
+    google = GoogleFalso(args.latencia_google, None if args.sem_cota else bot.limitador_google)
+    cliente_google = google.cliente()
+    bot.gerenciador_google.obter = lambda: cliente_google
+
+    app = bot.criar_aplicacao()
+    porta = porta_livre()
+    parar = asyncio.Event()
+    servidor = asyncio.create_task(servir_webhook(
+        app, url_publica=f"http://127.0.0.1:{porta}", porta=porta,
+        caminho='/telegram', segredo=SEGREDO, parar=parar
+    ))
+
+    base = f"http://127.0.0.1:{porta}"
+    async with aiohttp.ClientSession() as sessao:
+        for _ in range(100):
+            try:
+                async with sessao.get(f"{base}/saude") as resposta:
+                    if resposta.status == 200:
+                        break
+            except aiohttp.ClientConnectionError:
+                pass
+            await asyncio.sleep(0.05)
+
+        chamadas_inicio = sum(telegram.chamadas.values())
+        inicio = time.perf_counter()
+        for numero, (instante, chat_id, frase, digitada) in enumerate(eventos, 1):
+            await asyncio.sleep(max(0.0, inicio + instante - time.perf_counter()))
+            if digitada:
+                update = telegram.update_texto(numero, chat_id, frase)
+            else:
+                update = telegram.update_voz(numero, chat_id, audio_falso(frase, args.tamanho_audio))
+            enviados.setdefault(chat_id, deque()).append((time.perf_counter(), digitada))
+            async with sessao.post(f"{base}/telegram", json=update,
+                                   headers={CABECALHO_SEGREDO: SEGREDO}) as resposta:
+                resposta.raise_for_status()
+
+        try:
+            await asyncio.wait_for(concluidos.wait(), args.tempo_max)
+        except asyncio.TimeoutError:
+            pass
+        fim = time.perf_counter()
+
+    # Tempo até o último lançamento chegar às abas (sincronização em segundo plano)
+    while google.linhas_anexadas < len(latencias) and time.perf_counter() - fim < args.tempo_max:
+        await asyncio.sleep(0.05)
+    planilha = time.perf_counter() - fim
+
+    chamadas_google = sum(google.chamadas.values())
+    parar.set()
+    await servidor
+    await telegram.parar()
+    await openai.parar()
+
+    total = len(eventos)
+    ordenadas = sorted(latencias)
+    return {
+        "bot": args.bot,
+        "mensagens": total,
+        "respondidas": len(latencias),
+        "erros": len(erros),
+        "exemplos_erro": erros[:3],
+        "p50": percentil(ordenadas, 50),
+        "p95": percentil(ordenadas, 95),
+        "p99": percentil(ordenadas, 99),
+        "maximo": ordenadas[-1] if ordenadas else 0.0,
+        "digitadas": len(digitadas),
+        "p50_digitadas": percentil(sorted(digitadas), 50),
+        "duracao": fim - inicio,
+        "vazao": len(latencias) / (fim - inicio) if fim > inicio else 0.0,
+        "ate_planilha": planilha,
+        "telegram_por_msg": (sum(telegram.chamadas.values()) - chamadas_inicio) / total,
+        "telegram": dict(telegram.chamadas),
+        "openai_por_msg": sum(openai.chamadas.values()) / total,
+        "openai": dict(openai.chamadas),
+        "openai_bytes": openai.bytes_recebidos,
+        "google_por_msg": chamadas_google / total,
+        "google": dict(google.chamadas),
+    }
+
+
+def relatorio(r):
+    print("=" * 64)
+    print(f"🚀 Ponta a ponta - bot {r['bot']}")
+    print("=" * 64)
+    print(f"Mensagens: {r['mensagens']} | respondidas: {r['respondidas']} | erros: {r['erros']}")
+    for exemplo in r['exemplos_erro']:
+        print(f"  ❌ {exemplo}")
+    print(f"Latência (envio → confirmação): p50 {r['p50']:.2f}s | p95 {r['p95']:.2f}s | "
+          f"p99 {r['p99']:.2f}s | máx {r['maximo']:.2f}s")
+    if r.get('digitadas'):
+        print(f"Mensagens digitadas: {r['digitadas']} | p50 {r['p50_digitadas']:.2f}s (sem download nem Whisper)")
+    print(f"Vazão: {r['vazao']:.2f} msgs/s ({r['respondidas']} em {r['duracao']:.1f}s)")
+    print(f"Planilha em dia {r['ate_planilha']:.2f}s depois da última confirmação")
+    print("Chamadas por mensagem:")
+    print(f"  Telegram {r['telegram_por_msg']:.2f} {r['telegram']}")
+    print(f"  OpenAI   {r['openai_por_msg']:.2f} {r['openai']} ({r['openai_bytes'] / 1024:.0f} KB de áudio)")
+    print(f"  Google   {r['google_por_msg']:.2f} {r['google']}")
+
+
+def comparar(atual, base):
+    """Aponta métricas que pioraram além da tolerância em relação à base"""
+    regressoes = []
+    for metrica, maior_melhor in (("p50", False), ("p95", False), ("p99", False), ("vazao", True),
+                                  ("telegram_por_msg", False), ("openai_por_msg", False),
+                                  ("google_por_msg", False)):
+        antes, depois = base.get(metrica), atual.get(metrica)
+        if not antes or depois is None:
+            continue
+        variacao = (depois - antes) / antes
+        piorou = variacao < -TOLERANCIA if maior_melhor else variacao > TOLERANCIA
+        marca = "⚠️" if piorou else "  "
+        print(f"{marca} {metrica}: {antes:.3f} → {depois:.3f} ({variacao:+.0%})")
+        if piorou:
+            regressoes.append(metrica)
+    return regressoes
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bot', choices=['railway', 'v4', 'ambos'], default='ambos')
+    parser.add_argument('--chats', type=int, default=20, help="equipes mandando áudios")
+    parser.add_argument('--audios', type=int, default=5, help="áudios por equipe (rajada)")
+    parser.add_argument('--janela', type=float, default=10, help="segundos em que as rajadas começam")
+    parser.add_argument('--intervalo', type=float, default=1.5, help="segundos médios entre áudios da rajada")
+    parser.add_argument('--textos', type=float, default=0.0, help="fração das mensagens digitadas (sem áudio)")
+    parser.add_argument('--tamanho-audio', type=int, default=30_000, help="bytes de cada áudio falso")
+    parser.add_argument('--latencia-telegram', type=float, default=0.05)
+    parser.add_argument('--latencia-whisper', type=float, default=1.5)
+    parser.add_argument('--latencia-gpt', type=float, default=1.0)
+    parser.add_argument('--latencia-google', type=float, default=0.2)
+    parser.add_argument('--sem-regras', action='store_true', help="força o GPT (desliga o extrator local)")
+    parser.add_argument('--sem-cota', action='store_true', help="não aplica o limitador de cota do Google")
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--tempo-max', type=float, default=300, help="espera máxima pelas respostas")
+    parser.add_argument('--json', help="grava o resultado neste arquivo")
+    parser.add_argument('--comparar', help="resultado anterior (--json) para apontar regressões")
+    return parser.parse_args()
+
+
+def main():
+    args = argumentos()
+
+    if args.bot == 'ambos':
+        # Um processo por bot (cada um importa o próprio módulo e bancos)
+        codigo = 0
+        for bot in ('railway', 'v4'):
+            comando = [sys.executable, __file__] + [a for a in sys.argv[1:] if a != 'ambos']
+            comando = [c for c in comando if c != '--bot'] + ['--bot', bot]
+            for opcao in ('--json', '--comparar'):
+                valor = getattr(args, opcao[2:])
+                if valor:
+                    indice = comando.index(opcao)
+                    raiz, extensao = os.path.splitext(valor)
+                    comando[indice + 1] = f"{raiz}.{bot}{extensao or '.json'}"
+            codigo |= subprocess.call(comando)
+        return codigo
+
+    resultado = asyncio.run(medir(args))
+    relatorio(resultado)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            print(f"\nComparação com {args.comparar}:")
+            if comparar(resultado, json.load(arquivo)):
+                return 1
+    return 1 if resultado['respondidas'] < resultado['mensagens'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
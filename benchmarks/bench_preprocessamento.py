@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do pré-processamento de áudio (preprocessamento_audio.py)
+Gera com o ffmpeg notas de voz sintéticas de várias durações (um terço de
+pausas) e uma gravação longa em estéreo acima do limite de 25 MB do
+Whisper, e transcreve cada uma com um Whisper falso cuja latência cresce
+com o tamanho e a duração do áudio: primeiro enviando o arquivo como
+chegou, depois pré-processado e em trechos paralelos. Mostra bytes
+enviados e latência da transcrição antes e depois
+
+Uso: python benchmarks/bench_preprocessamento.py [--bot railway|v4] [--duracoes 20,120,300,600]
+Precisa do ffmpeg no PATH (ou em FFMPEG_BINARIO)
+"""
+
+import io
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import importlib
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from falsos import OpenAIFalso
+import preprocessamento_audio
+
+MODULOS = {'railway': 'bot_telegram_railway', 'v4': 'bot_telegram_v4'}
+
+# "Fala": harmônicos com modulação de sílabas, 6 s de fala a cada 9 s, e ruído de fundo baixo
+VOZ = ("(0.3*sin(2*PI*180*t)+0.2*sin(2*PI*360*t+1)+0.1*sin(2*PI*720*t))"
+       "*(0.6+0.4*sin(2*PI*4*t))*lt(mod(t\\,9)\\,6)+0.002*(random(0)-0.5)")
+
+
+def gerar_audio(caminho, segundos, canais, bitrate):
+    """Ogg/Opus sintético (Telegram: mono ~32 kbps; gravação encaminhada: estéreo)"""
+    subprocess.run([
+        preprocessamento_audio.FFMPEG_BINARIO, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f"aevalsrc=exprs='{'|'.join([VOZ] * canais)}':s=48000:d={segundos}",
+        '-c:a', 'libopus', '-b:a', bitrate, '-compression_level', '0', caminho,
+    ], check=True)
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+
+async def medir(transcrever, dados, openai):
+    """Transcreve uma vez; retorna bytes enviados, chamadas, segundos e erro"""
+    enviados = openai.bytes_recebidos
+    chamadas = openai.chamadas['transcricao']
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        await transcrever(io.BytesIO(dados))
+    except Exception as e:
+        erro = str(e)[:60]
+    return {
+        "bytes": openai.bytes_recebidos - enviados,
+        "chamadas": openai.chamadas['transcricao'] - chamadas,
+        "segundos": time.perf_counter() - inicio,
+        "erro": erro,
+    }
+
+
+def formatar(medida):
+    if medida["erro"]:
+        return f"{medida['bytes'] / 1e6:6.2f} MB  {'falhou':>7}  "
+    return f"{medida['bytes'] / 1e6:6.2f} MB  {medida['segundos']:6.1f}s  x{medida['chamadas']}"
+
+
+async def executar(args):
+    if not preprocessamento_audio.FFMPEG_BINARIO:
+        print("❌ ffmpeg não encontrado (instale ou aponte FFMPEG_BINARIO)")
+        return 2
+
+    openai = OpenAIFalso(args.latencia_whisper, latencia_por_mb=args.latencia_por_mb,
+                         latencia_por_segundo=args.latencia_por_segundo)
+    await openai.iniciar()
+
+    pasta = tempfile.mkdtemp(prefix='bench_preprocessamento_')
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': "123456:FALSO",
+        'OPENAI_API_KEY': 'sk-falso',
+        'GOOGLE_CREDENTIALS_JSON': '{"falso": true}',
+        'OPENAI_BASE_URL': openai.url,
+        'LIVRO_LANCAMENTOS_DB': os.path.join(pasta, 'lancamentos.db'),
+        'CACHE_PROCESSAMENTO_DB': os.path.join(pasta, 'cache.db'),
+        'REGISTRO_OBRAS_DB': os.path.join(pasta, 'registro.db'),
+    })
+    bot = importlib.import_module(MODULOS[args.bot])
+
+    casos = [(f"voz {int(s)}s", s, 1, '32k') for s in args.duracoes]
+    if args.gravacao:
+        casos.append((f"gravação {args.gravacao // 60:.0f}min estéreo", args.gravacao, 2, '192k'))
+
+    print("=" * 72)
+    print(f"🎙️ Pré-processamento de áudio - bot {args.bot}")
+    print("=" * 72)
+    print(f"Whisper falso: {args.latencia_whisper}s + {args.latencia_por_mb}s/MB + "
+          f"{args.latencia_por_segundo}s por segundo de áudio, limite de 25 MB")
+    print(f"\n{'áudio':<24}{'original (como chegou)':<28}{'pré-processado':<28}")
+
+    totais = {"antes": [0, 0.0], "depois": [0, 0.0]}
+    falhas_depois = 0
+    for nome, segundos, canais, bitrate in casos:
+        dados = await asyncio.get_running_loop().run_in_executor(
+            None, gerar_audio, os.path.join(pasta, f"{nome}.ogg"), segundos, canais, bitrate)
+        antes = await medir(bot.transcrever_arquivo, dados, openai)
+        depois = await medir(bot.transcrever_audio, dados, openai)
+        print(f"{nome:<24}{formatar(antes):<28}{formatar(depois):<28}")
+
+        falhas_depois += bool(depois["erro"])
+        for chave, medida in (("antes", antes), ("depois", depois)):
+            if not antes["erro"]:
+                totais[chave][0] += medida["bytes"]
+                totais[chave][1] += medida["segundos"]
+
+    (bytes_antes, segundos_antes), (bytes_depois, segundos_depois) = totais["antes"], totais["depois"]
+    if bytes_depois and segundos_depois:
+        print(f"\n📦 Bytes enviados: {bytes_antes / bytes_depois:.1f}x menos | "
+              f"⏱️ Transcrição: {segundos_antes / segundos_depois:.1f}x mais rápida "
+              f"(áudios que funcionavam antes)")
+
+    await openai.parar()
+    return 1 if falhas_depois else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bot', choices=sorted(MODULOS), default='railway')
+    parser.add_argument('--duracoes', type=lambda v: [float(s) for s in v.split(',')],
+                        default=[20, 120, 300, 600], help="segundos de cada nota de voz")
+    parser.add_argument('--gravacao', type=float, default=1800,
+                        help="segundos da gravação estéreo a 192 kbps (0 = sem)")
+    parser.add_argument('--latencia-whisper', type=float, default=0.5)
+    parser.add_argument('--latencia-por-mb', type=float, default=1.0)
+    parser.add_argument('--latencia-por-segundo', type=float, default=0.05)
+    return asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do provisionamento de planilhas de obra
+Compara a sequência antiga (uma chamada por célula/coluna) com o modelo
+aplicado num único batch_update, contando chamadas à API e tempo total
+
+Uso: python benchmarks/bench_provisionamento.py [latencia_ms]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from modelo_planilha import MODELO_V4, montar_requisicoes, provisionar_planilha
+
+# ========== FAKE DO GSPREAD ==========
+
+class Contador:
+    """Conta chamadas à API e simula a latência de rede"""
+
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.chamadas = 0
+
+    def chamar(self):
+        self.chamadas += 1
+        time.sleep(self.latencia)
+
+
+class FakeWorksheet:
+    def __init__(self, contador):
+        self.contador = contador
+
+    def update_title(self, titulo):
+        self.contador.chamar()
+
+    def update(self, intervalo, valores):
+        self.contador.chamar()
+
+    def format(self, intervalo, formato):
+        self.contador.chamar()
+
+    def merge_cells(self, intervalo):
+        self.contador.chamar()
+
+    def set_column_width(self, coluna, largura):
+        self.contador.chamar()
+
+
+class FakeSpreadsheet:
+    def __init__(self, contador):
+        self.contador = contador
+        self.sheet1 = FakeWorksheet(contador)
+        self.requisicoes = 0
+
+    def add_worksheet(self, titulo, linhas, colunas):
+        self.contador.chamar()
+        return FakeWorksheet(self.contador)
+
+    def batch_update(self, corpo):
+        self.contador.chamar()
+        self.requisicoes = len(corpo['requests'])
+
+
+class FakeCliente:
+    def __init__(self, latencia):
+        self.contador = Contador(latencia)
+
+    def create(self, titulo):
+        # gspread: POST no Drive + leitura dos metadados da planilha nova
+        self.contador.chamar()
+        self.contador.chamar()
+        return FakeSpreadsheet(self.contador)
+
+# ========== SEQUÊNCIA ANTIGA ==========
+
+def provisionar_antigo(gc, nome_obra):
+    """Reproduz as chamadas do criar_planilha_obra antigo (v4)"""
+    spreadsheet = gc.create(f"Obra: {nome_obra}")
+    obra = nome_obra.upper()
+
+    sheet = spreadsheet.sheet1
+    sheet.update_title("Gastos")
+    sheet.update('A1', f"GASTOS - OBRA: {obra}")
+    sheet.format('A1', {})
+    sheet.merge_cells('A1:E1')
+    sheet.update('A2:E2', [[]])
+    sheet.format('A2:E2', {})
+    for coluna, largura in enumerate([100, 300, 150, 120, 300], 1):
+        sheet.set_column_width(coluna, largura)
+
+    ws_pag = spreadsheet.add_worksheet("Pagamentos", 1000, 5)
+    ws_pag.update('A1', f"PAGAMENTOS - OBRA: {obra}")
+    ws_pag.format('A1', {})
+    ws_pag.merge_cells('A1:E1')
+    ws_pag.update('A2:E2', [[]])
+    ws_pag.format('A2:E2', {})
+    for coluna, largura in enumerate([100, 200, 150, 120, 300], 1):
+        ws_pag.set_column_width(coluna, largura)
+
+    ws_resumo = spreadsheet.add_worksheet("Resumo", 100, 2)
+    ws_resumo.update('A1', f"RESUMO - OBRA: {obra}")
+    ws_resumo.format('A1', {})
+    ws_resumo.merge_cells('A1:B1')
+    for celula in ('A3', 'B3', 'A4', 'B4', 'A6', 'B6'):
+        ws_resumo.update(celula, '')
+    for intervalo in ('B3', 'B4', 'A6:B6', 'B6'):
+        ws_resumo.format(intervalo, {})
+    ws_resumo.set_column_width(1, 200)
+    ws_resumo.set_column_width(2, 150)
+
+    return spreadsheet
+
+# ========== EXECUÇÃO ==========
+
+def medir(nome, funcao, latencia):
+    """Executa um provisionamento e retorna (chamadas, segundos)"""
+    gc = FakeCliente(latencia)
+    inicio = time.perf_counter()
+    funcao(gc)
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<12} {gc.contador.chamadas:>8} {duracao:>10.3f}s")
+    return gc.contador.chamadas, duracao
+
+def main():
+    latencia = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.15
+
+    print("=" * 40)
+    print(f"📊 Provisionamento (latência simulada {latencia * 1000:.0f} ms)")
+    print("=" * 40)
+    print(f"{'Modo':<12} {'Chamadas':>8} {'Tempo':>11}")
+
+    chamadas_antes, tempo_antes = medir("antes", lambda gc: provisionar_antigo(gc, "João"), latencia)
+    chamadas_depois, tempo_depois = medir("depois", lambda gc: provisionar_planilha(gc, "João", MODELO_V4), latencia)
+
+    print("-" * 40)
+    print(f"Requests dentro do lote: {len(montar_requisicoes(MODELO_V4, 'João'))}")
+    print(f"Chamadas economizadas:   {chamadas_antes - chamadas_depois}")
+    print(f"Ganho de tempo:          {tempo_antes / tempo_depois:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do resolvedor de nomes de obra
+Gera obras sintéticas e alguns milhares de variações faladas ("obra do
+João Silva", "joao silva", "Jaoo Silva", "João"...) e compara a
+normalização antiga (regex encadeadas, título exato) com o resolvedor:
+acertos, planilhas duplicadas, junções indevidas e nomes por segundo
+
+Uso: python benchmarks/bench_resolvedor_obras.py [obras] [variacoes] [semente]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from resolvedor_obras import ResolvedorObras, titulo_obra
+
+NOMES = [
+    "João", "José", "Antônio", "Francisco", "Luís", "Paulo", "Pedro", "Lucas", "Marcos", "André",
+    "Sebastião", "Márcio", "Cláudio", "Fábio", "Rogério", "Sérgio", "Vinícius", "Mário", "Otávio", "Jéssica",
+    "Maria", "Ana", "Júlia", "Letícia", "Patrícia", "Cecília", "Mônica", "Lúcia", "Vitória", "Beatriz",
+    "Raimundo", "Benedito", "Geraldo", "Edson", "Wellington", "Reginaldo", "Valdir", "Gilberto", "Ivone", "Conceição",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Ribeiro", "Carvalho", "Araújo", "Melo", "Barbosa", "Cardoso", "Rocha", "Dias", "Nascimento", "Andrade",
+    "Conceição", "Simões", "Falcão", "Guimarães", "Magalhães", "Brandão", "Estêvão", "Assunção", "Gonçalves", "Peixoto",
+]
+LOGRADOUROS = ["Rua", "Avenida", "Travessa", "Alameda", "Condomínio", "Loteamento"]
+BAIRROS = ["Centro", "Jardim América", "Vila Nova", "Boa Vista", "São José", "Santa Luzia", "Ipiranga", "Morumbi"]
+PREFIXOS = ["obra do", "obra da", "obra", "na obra do", "", "a obra do", "Obra do", "OBRA DO"]
+
+
+def normalizar_antigo(nome):
+    """Normalização anterior do bot v4 (oito regex encadeadas, título exato)"""
+    nome = nome.lower()
+    nome = re.sub(r'[àáâãäå]', 'a', nome)
+    nome = re.sub(r'[èéêë]', 'e', nome)
+    nome = re.sub(r'[ìíîï]', 'i', nome)
+    nome = re.sub(r'[òóôõö]', 'o', nome)
+    nome = re.sub(r'[ùúûü]', 'u', nome)
+    nome = re.sub(r'[ç]', 'c', nome)
+    nome = re.sub(r'[^a-z0-9\s]', '', nome)
+    nome = re.sub(r'\s+', ' ', nome.strip())
+    return nome.title()
+
+
+def sem_acento(texto):
+    return texto.translate(str.maketrans("áâãàéêíóôõúçÁÂÃÉÊÍÓÔÚÇ", "aaaaeeiooouc" "AAAEEIOOUC"))
+
+
+def erro_digitacao(rng, texto):
+    """Troca duas letras vizinhas ou uma letra de uma palavra longa"""
+    palavras = texto.split()
+    longas = [i for i, p in enumerate(palavras) if len(p) >= 5 and p.isalpha()]
+    if not longas:
+        return texto
+    i = rng.choice(longas)
+    p = palavras[i]
+    j = rng.randrange(1, len(p) - 1)
+    if rng.random() < 0.5:
+        p = p[:j] + p[j + 1] + p[j] + p[j + 2:]
+    else:
+        p = p[:j] + rng.choice("aeiou") + p[j + 1:]
+    palavras[i] = p
+    return ' '.join(palavras)
+
+
+def gerar_obras(rng, quantidade):
+    """Obras base distintas: pessoas e endereços (com número)"""
+    obras = set()
+    while len(obras) < quantidade:
+        if rng.random() < 0.7:
+            obras.add(f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}")
+        else:
+            obras.add(f"{rng.choice(LOGRADOUROS)} {rng.choice(BAIRROS)} {rng.randint(1, 400)}")
+    return sorted(obras)
+
+
+def variar(rng, obra, primeiros_unicos):
+    """Uma forma falada da obra; retorna (texto, categoria)"""
+    nome = obra
+    categoria = "variação"
+    primeiro = obra.split()[0]
+    if primeiro in primeiros_unicos and rng.random() < 0.15:
+        nome, categoria = primeiro, "nome parcial"
+    if rng.random() < 0.4:
+        nome = sem_acento(nome)
+    if rng.random() < 0.3:
+        nome = nome.lower()
+    if rng.random() < 0.25 and categoria != "nome parcial":
+        nome, categoria = erro_digitacao(rng, nome), "erro de digitação"
+    prefixo = rng.choice(PREFIXOS)
+    pontuacao = rng.choice(["", "", ".", ",", "!"])
+    return f"{prefixo} {nome}{pontuacao}".strip(), categoria
+
+
+def executar(quantidade_obras=800, quantidade_variacoes=4000, semente=7):
+    rng = random.Random(semente)
+    todas = gerar_obras(rng, quantidade_obras * 2)
+    rng.shuffle(todas)
+    conhecidas, novas = todas[:quantidade_obras], todas[quantidade_obras:quantidade_obras + quantidade_obras // 4]
+
+    contagem_primeiros = {}
+    for obra in conhecidas:
+        contagem_primeiros[obra.split()[0]] = contagem_primeiros.get(obra.split()[0], 0) + 1
+    primeiros_unicos = {p for p, n in contagem_primeiros.items() if n == 1 and p not in LOGRADOUROS}
+
+    variacoes = []
+    for _ in range(quantidade_variacoes):
+        obra = rng.choice(conhecidas)
+        texto, categoria = variar(rng, obra, primeiros_unicos)
+        variacoes.append((obra, texto, categoria))
+
+    # ---------- antes: título exato após as regex ----------
+    titulos = {normalizar_antigo(f"obra do {obra}"): obra for obra in conhecidas}
+    inicio = time.perf_counter()
+    for _, texto, _ in variacoes:
+        normalizar_antigo(texto)
+    tempo_antigo = time.perf_counter() - inicio
+    duplicadas_antigo = sum(1 for obra, texto, _ in variacoes if titulos.get(normalizar_antigo(texto)) != obra)
+
+    # ---------- depois: resolvedor com índice de trigramas ----------
+    inicio = time.perf_counter()
+    resolvedor = ResolvedorObras(formatar=titulo_obra)
+    resolvedor.carregar(titulo_obra(f"obra do {obra}") for obra in conhecidas)
+    tempo_indice = time.perf_counter() - inicio
+    esperado = {obra: titulo_obra(f"obra do {obra}") for obra in conhecidas}
+
+    por_categoria = {}
+    inicio = time.perf_counter()
+    resultados = [resolvedor.resolver(texto) for _, texto, _ in variacoes]
+    tempo_resolver = time.perf_counter() - inicio
+    for (obra, _, categoria), resultado in zip(variacoes, resultados):
+        certo, total = por_categoria.get(categoria, (0, 0))
+        por_categoria[categoria] = (certo + (resultado == esperado[obra]), total + 1)
+
+    duplicadas = resolvedor.novas
+
+    existentes = set(esperado.values())
+    juncoes = [obra for obra in novas if resolvedor.resolver(f"obra do {obra}") in existentes]
+
+    acertos = sum(certo for certo, _ in por_categoria.values())
+    print("=" * 60)
+    print("🧭 Benchmark do resolvedor de nomes de obra")
+    print("=" * 60)
+    print(f"Obras conhecidas: {len(conhecidas)} | variações: {len(variacoes)} | obras novas: {len(novas)}")
+    print("\nAntes (regex + título exato):")
+    print(f"  Planilhas duplicadas: {duplicadas_antigo} ({duplicadas_antigo / len(variacoes):.1%})")
+    print(f"  Tempo: {tempo_antigo * 1e6 / len(variacoes):.1f} µs/nome")
+    print("\nDepois (dobra numa passada + trigramas/edição):")
+    print(f"  Obra certa: {acertos}/{len(variacoes)} ({acertos / len(variacoes):.1%})")
+    for categoria, (certo, total) in sorted(por_categoria.items()):
+        print(f"    {categoria}: {certo}/{total} ({certo / total:.1%})")
+    print(f"  Planilhas duplicadas (obras criadas por variação): {duplicadas} ({duplicadas / len(variacoes):.1%})")
+    print(f"  Obras novas juntadas a uma existente: {len(juncoes)}/{len(novas)}")
+    for obra in juncoes[:5]:
+        print(f"    • {obra} → {resolvedor.encontrar(obra)}")
+    print(f"  Índice: {tempo_indice * 1000:.1f} ms para {len(conhecidas)} obras")
+    print(f"  Tempo: {tempo_resolver * 1e6 / len(variacoes):.1f} µs/nome "
+          f"({len(variacoes) / tempo_resolver:,.0f} nomes/s)")
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:4]]
+    executar(*argumentos)
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serviços falsos para medir os bots localmente, sem tokens nem cota
+- TelegramFalso: Bot API (aiohttp) que entrega áudios por webhook, serve
+  os arquivos e registra as mensagens enviadas/editadas
+- OpenAIFalso: Whisper e chat completions (aiohttp) com latência
+  configurável; a "transcrição" vem embutida no próprio áudio falso (num
+  Ogg/Opus de verdade, a latência pode crescer com a duração)
+- GoogleFalso: planilhas em memória atrás de uma sessão HTTP compatível
+  com o gspread (o código real do gspread roda), contando as chamadas
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime
+from urllib.parse import unquote
+from aiohttp import web
+import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL, SPREADSHEETS_API_V4_BASE_URL
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from extrator_regras import extrair_por_regras
+from preprocessamento_audio import duracao_ogg
+
+# Áudio falso: cabeçalho Ogg + frase + identificador (bytes únicos por envio)
+MARCA_AUDIO = b"OggS\x00FALSO\x00"
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def audio_falso(frase, tamanho=0):
+    """Bytes de um "áudio" cuja transcrição falsa é a frase (tamanho mínimo opcional)"""
+    dados = MARCA_AUDIO + frase.encode('utf-8') + b"\x00" + uuid.uuid4().hex.encode()
+    return dados + b"\x00" * max(0, tamanho - len(dados))
+
+
+def frase_do_audio(dados):
+    """Inverso de audio_falso (o que o Whisper falso "ouve")"""
+    if not dados.startswith(MARCA_AUDIO):
+        return ""
+    return dados[len(MARCA_AUDIO):].split(b"\x00", 1)[0].decode('utf-8')
+
+
+async def iniciar_site(app, porta):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', porta).start()
+    return runner
+
+# ========== TELEGRAM ==========
+
+class TelegramFalso:
+    """Bot API falsa: responde os métodos usados pelos bots e guarda os áudios"""
+
+    def __init__(self, latencia=0.0, ao_enviar=None):
+        self.latencia = latencia
+        self.ao_enviar = ao_enviar      # ao_enviar(chat_id, texto, instante)
+        self.chamadas = Counter()
+        self.arquivos = {}              # file_id -> bytes
+        self.webhook = None
+        self._mensagens = 0
+        self.porta = None
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.porta}"
+
+    async def iniciar(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{metodo}', self._metodo)
+        app.router.add_get('/file/bot{token}/{caminho:.+}', self._arquivo)
+        self.porta = porta_livre()
+        self._runner = await iniciar_site(app, self.porta)
+
+    async def parar(self):
+        await self._runner.cleanup()
+
+    def update_voz(self, update_id, chat_id, dados, duracao=5):
+        """Update de mensagem de voz; os bytes ficam disponíveis para o getFile"""
+        file_id = f"voz-{update_id}"
+        self.arquivos[file_id] = dados
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Obra"},
+                "voice": {
+                    "file_id": file_id, "file_unique_id": f"u{file_id}",
+                    "duration": duracao, "mime_type": "audio/ogg", "file_size": len(dados),
+                },
+            },
+        }
+
+    def update_texto(self, update_id, chat_id, texto):
+        """Update de mensagem de texto (lançamento digitado)"""
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Obra"},
+                "text": texto,
+            },
+        }
+
+    async def _metodo(self, request):
+        metodo = request.match_info['metodo']
+        if request.content_type == 'application/json':
+            dados = await request.json()
+        else:
+            dados = dict(await request.post()) if request.can_read_body else {}
+        self.chamadas[metodo] += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        if metodo == 'getMe':
+            resultado = {"id": 1, "is_bot": True, "first_name": "Falso", "username": "falso_bot"}
+        elif metodo == 'setWebhook':
+            self.webhook = dados
+            resultado = True
+        elif metodo == 'getFile':
+            file_id = dados['file_id']
+            resultado = {
+                "file_id": file_id, "file_unique_id": f"u{file_id}",
+                "file_size": len(self.arquivos.get(file_id, b"")),
+                "file_path": f"voice/{file_id}.oga",
+            }
+        elif metodo in ('sendMessage', 'editMessageText'):
+            chat_id = int(dados['chat_id'])
+            texto = dados.get('text', '')
+            if metodo == 'sendMessage':
+                self._mensagens += 1
+                message_id = self._mensagens
+            else:
+                message_id = int(dados['message_id'])
+            if self.ao_enviar is not None:
+                self.ao_enviar(chat_id, texto, time.perf_counter())
+            resultado = {
+                "message_id": message_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": texto,
+            }
+        else:
+            resultado = True
+        return web.json_response({"ok": True, "result": resultado})
+
+    async def _arquivo(self, request):
+        self.chamadas['download'] += 1
+        file_id = request.match_info['caminho'].split('/')[-1].rsplit('.', 1)[0]
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        if file_id not in self.arquivos:
+            return web.Response(status=404)
+        return web.Response(body=self.arquivos[file_id], content_type='audio/ogg')
+
+# ========== OPENAI ==========
+
+def dados_falsos(texto):
+    """Resposta de extração do "modelo" falso (extrator por regras + campos dos dois bots)"""
+    dados = extrair_por_regras(texto, obra_padrao="geral")
+    dados.pop('confianca', None)
+    dados.setdefault('data', datetime.now().strftime('%d/%m/%Y'))
+    dados.setdefault('observacoes', '')
+    if dados.get('tipo') == 'pagamento':
+        dados.setdefault('nome_funcionario', '')
+        dados.setdefault('funcao', 'Outros')
+        dados['funcionario'] = dados['nome_funcionario']
+    else:
+        dados.setdefault('descricao', texto[:60])
+        dados.setdefault('categoria', 'Outros')
+    return dados
+
+
+class OpenAIFalso:
+    """Whisper e chat completions falsos, com latência fixa por chamada
+
+    latencia_por_mb: envio do arquivo; latencia_por_segundo: duração do áudio
+    (só em Ogg/Opus de verdade). Acima de limite_bytes responde 413, como a API
+    """
+
+    def __init__(self, latencia_transcricao=1.0, latencia_extracao=0.8, latencia_por_mb=0.0,
+                 latencia_por_segundo=0.0, limite_bytes=25 * 1024 * 1024):
+        self.latencia_transcricao = latencia_transcricao
+        self.latencia_extracao = latencia_extracao
+        self.latencia_por_mb = latencia_por_mb
+        self.latencia_por_segundo = latencia_por_segundo
+        self.limite_bytes = limite_bytes
+        self.chamadas = Counter()
+        self.bytes_recebidos = 0
+        self.textos_extraidos = 0
+        self.porta = None
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.porta}/v1"
+
+    async def iniciar(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/v1/audio/transcriptions', self._transcrever)
+        app.router.add_post('/v1/chat/completions', self._completar)
+        self.porta = porta_livre()
+        self._runner = await iniciar_site(app, self.porta)
+
+    async def parar(self):
+        await self._runner.cleanup()
+
+    async def _transcrever(self, request):
+        self.chamadas['transcricao'] += 1
+        formulario = await request.post()
+        dados = formulario['file'].file.read()
+        self.bytes_recebidos += len(dados)
+        if len(dados) > self.limite_bytes:
+            self.chamadas['transcricao_recusada'] += 1
+            return web.json_response(
+                {"error": {"message": "Maximum content size limit exceeded", "type": "invalid_request_error"}},
+                status=413)
+
+        duracao = duracao_ogg(dados) if not dados.startswith(MARCA_AUDIO) else None
+        await asyncio.sleep(self.latencia_transcricao + self.latencia_por_mb * len(dados) / 1e6
+                            + self.latencia_por_segundo * (duracao or 0))
+        texto = frase_do_audio(dados) if duracao is None else f"[{duracao:.0f}s]"
+        return web.json_response({"text": texto})
+
+    async def _completar(self, request):
+        self.chamadas['extracao'] += 1
+        corpo = await request.json()
+        prompt = corpo['messages'][-1]['content']
+        await asyncio.sleep(self.latencia_extracao)
+
+        lote = re.findall(r'^\[([^\]]+)\] "(.*)"$', prompt, re.M)
+        if lote:
+            self.textos_extraidos += len(lote)
+            conteudo = {"resultados": [dict(dados_falsos(texto), id=id_item) for id_item, texto in lote]}
+        else:
+            self.textos_extraidos += 1
+            achado = re.search(r'Texto: "(.*)"', prompt)
+            conteudo = dados_falsos(achado.group(1) if achado else "")
+
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+            "created": int(time.time()), "model": corpo.get('model', 'falso'),
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(conteudo, ensure_ascii=False)},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+# ========== GOOGLE ==========
+
+class RespostaFalsa:
+    def __init__(self, status, dados):
+        self.status_code = status
+        self.ok = status < 400
+        self._dados = dados
+        self.text = json.dumps(dados)
+        self.headers = {}
+
+    def json(self):
+        return self._dados
+
+
+class _SessaoFalsa:
+    """Sessão HTTP que o gspread usa; cada método vira uma chamada ao GoogleFalso"""
+
+    def __init__(self, google):
+        self.google = google
+
+    def __getattr__(self, metodo):
+        if metodo not in ('get', 'post', 'put', 'patch', 'delete'):
+            raise AttributeError(metodo)
+        return lambda url, params=None, json=None, **_: self.google.atender(metodo, url, params or {}, json)
+
+
+class GoogleFalso:
+    """Drive + Sheets em memória (o suficiente para os bots), contando chamadas
+
+    limitador: LimitadorGoogle opcional, consumido a cada chamada como na sessão real
+    """
+
+    def __init__(self, latencia=0.0, limitador=None):
+        self.latencia = latencia
+        self.limitador = limitador
+        self.chamadas = Counter()
+        self.planilhas = {}   # id -> {"nome", "abas": {sheet_id: {"title", "index", "linhas"}}}
+        self.linhas_anexadas = 0
+        self._lock = threading.Lock()
+
+    def cliente(self):
+        return gspread.Client(auth=None, session=_SessaoFalsa(self))
+
+    def atender(self, metodo, url, params, corpo):
+        if self.limitador is not None:
+            self.limitador.balde(metodo).adquirir()
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            if url.startswith(DRIVE_FILES_API_V3_URL):
+                return self._drive(metodo, params, corpo)
+            resto = url[len(SPREADSHEETS_API_V4_BASE_URL) + 1:]
+            if resto.endswith('/values:batchGet'):
+                return self._valores_em_lote(resto[:-len('/values:batchGet')], params)
+            if '/values/' in resto:
+                planilha_id, intervalo = resto.split('/values/', 1)
+                return self._valores(metodo, planilha_id, unquote(intervalo), corpo)
+            if resto.endswith(':batchUpdate'):
+                return self._batch_update(resto[:-len(':batchUpdate')], corpo)
+            return self._metadados(resto)
+
+    @staticmethod
+    def _nao_encontrado():
+        return RespostaFalsa(404, {"error": {"code": 404, "message": "Requested entity was not found.",
+                                             "status": "NOT_FOUND"}})
+
+    def _drive(self, metodo, params, corpo):
+        if metodo == 'post':
+            self.chamadas['drive.create'] += 1
+            planilha_id = uuid.uuid4().hex
+            self.planilhas[planilha_id] = {
+                "nome": corpo['name'],
+                "abas": {0: {"title": "Sheet1", "index": 0, "linhas": []}},
+            }
+            return RespostaFalsa(200, {"id": planilha_id, "name": corpo['name']})
+
+        self.chamadas['drive.list'] += 1
+        consulta = params.get('q', '')
+        igual = re.search(r'name = ["\'](.*?)["\']', consulta)
+        contem = re.search(r'name contains ["\'](.*?)["\']', consulta)
+        arquivos = [
+            {"id": planilha_id, "name": planilha['nome'],
+             "createdTime": "2025-01-01T00:00:00Z", "modifiedTime": "2025-01-01T00:00:00Z"}
+            for planilha_id, planilha in self.planilhas.items()
+            if (not igual or planilha['nome'] == igual.group(1))
+            and (not contem or contem.group(1) in planilha['nome'])
+        ]
+        return RespostaFalsa(200, {"files": arquivos})
+
+    def _metadados(self, planilha_id):
+        self.chamadas['sheets.get'] += 1
+        planilha = self.planilhas.get(planilha_id)
+        if planilha is None:
+            return self._nao_encontrado()
+        return RespostaFalsa(200, {
+            "spreadsheetId": planilha_id,
+            "properties": {"title": planilha['nome']},
+            "sheets": [
+                {"properties": {"sheetId": sheet_id, "title": aba['title'], "index": aba['index'],
+                                "sheetType": "GRID",
+                                "gridProperties": {"rowCount": 1000, "columnCount": 26}}}
+                for sheet_id, aba in planilha['abas'].items()
+            ],
+        })
+
+    def _batch_update(self, planilha_id, corpo):
+        self.chamadas['sheets.batchUpdate'] += 1
+        planilha = self.planilhas.get(planilha_id)
+        if planilha is None:
+            return self._nao_encontrado()
+        abas = planilha['abas']
+        respostas = []
+        for requisicao in corpo.get('requests', []):
+            if 'addSheet' in requisicao:
+                propriedades = dict(requisicao['addSheet'].get('properties', {}))
+                sheet_id = propriedades.setdefault('sheetId', max(abas) + 1)
+                abas[sheet_id] = {"title": propriedades.get('title', f"Sheet{sheet_id + 1}"),
+                                  "index": len(abas), "linhas": []}
+                respostas.append({"addSheet": {"properties": propriedades}})
+                continue
+            if 'updateSheetProperties' in requisicao:
+                propriedades = requisicao['updateSheetProperties']['properties']
+                if 'title' in propriedades:
+                    abas[propriedades['sheetId']]['title'] = propriedades['title']
+            elif 'updateCells' in requisicao:
+                intervalo = requisicao['updateCells']['range']
+                linhas = abas[intervalo['sheetId']]['linhas']
+                inicio = intervalo.get('startRowIndex', 0)
+                for i, linha in enumerate(requisicao['updateCells'].get('rows', [])):
+                    while len(linhas) <= inicio + i:
+                        linhas.append([])
+                    linhas[inicio + i] = [
+                        next(iter(celula.get('userEnteredValue', {'': ''}).values()))
+                        for celula in linha.get('values', [])
+                    ]
+            respostas.append({})
+        return RespostaFalsa(200, {"spreadsheetId": planilha_id, "replies": respostas})
+
+    def _valores_em_lote(self, planilha_id, params):
+        """values:batchGet de intervalos 'Aba'!A3:F (linhas inteiras a partir da inicial)"""
+        self.chamadas['sheets.values.batchGet'] += 1
+        planilha = self.planilhas.get(planilha_id)
+        if planilha is None:
+            return self._nao_encontrado()
+        intervalos = params.get('ranges', [])
+        resposta = []
+        for intervalo in [intervalos] if isinstance(intervalos, str) else intervalos:
+            titulo, _, celulas = intervalo.rpartition('!')
+            titulo = titulo.strip("'").replace("''", "'")
+            aba = next((a for a in planilha['abas'].values() if a['title'] == titulo), None)
+            if aba is None:
+                return RespostaFalsa(400, {"error": {"code": 400, "message": f"Unable to parse range: {intervalo}",
+                                                     "status": "INVALID_ARGUMENT"}})
+            inicio = int(re.match(r'[A-Z]+(\d+)', celulas).group(1))
+            valores = [list(linha) for linha in aba['linhas'][inicio - 1:]]
+            resposta.append({"range": intervalo, "majorDimension": "ROWS", **({"values": valores} if valores else {})})
+        return RespostaFalsa(200, {"spreadsheetId": planilha_id, "valueRanges": resposta})
+
+    def _valores(self, metodo, planilha_id, intervalo, corpo):
+        planilha = self.planilhas.get(planilha_id)
+        if planilha is None:
+            return self._nao_encontrado()
+        anexar = intervalo.endswith(':append')
+        intervalo = intervalo[:-len(':append')] if anexar else intervalo
+        titulo, _, celulas = intervalo.rpartition('!')
+        titulo = titulo.strip("'").replace("''", "'")
+        aba = next((a for a in planilha['abas'].values() if a['title'] == titulo), None)
+        if aba is None:
+            return RespostaFalsa(400, {"error": {"code": 400, "message": f"Unable to parse range: {intervalo}",
+                                                 "status": "INVALID_ARGUMENT"}})
+        linhas = aba['linhas']
+
+        if anexar:
+            self.chamadas['sheets.append'] += 1
+            primeira = len(linhas) + 1
+            linhas.extend(corpo.get('values', []))
+            self.linhas_anexadas += len(corpo.get('values', []))
+            intervalo_gravado = f"'{titulo}'!A{primeira}:Z{len(linhas)}"
+            return RespostaFalsa(200, {"spreadsheetId": planilha_id, "tableRange": intervalo_gravado,
+                                       "updates": {"updatedRange": intervalo_gravado,
+                                                   "updatedRows": len(corpo.get('values', []))}})
+
+        self.chamadas['sheets.values.get'] += 1
+        coluna = re.match(r'[A-Z]+', celulas).group(0)
+        indice = gspread.utils.a1_to_rowcol(f"{coluna}1")[1] - 1
+        valores = [str(linha[indice]) if len(linha) > indice else "" for linha in linhas]
+        while valores and not valores[-1]:
+            valores.pop()
+        resposta = {"range": intervalo, "majorDimension": "COLUMNS"}
+        if valores:
+            resposta["values"] = [valores]
+        return RespostaFalsa(200, resposta)
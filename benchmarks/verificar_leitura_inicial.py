@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação da leitura inicial das planilhas (sincronizacao_planilhas.py)
+Grava lançamentos com um livro, copia para um Google falso e simula um
+deploy com disco novo: confere que o livro novo é refeito das abas numa
+values.batchGet por planilha, que os totais do /resumo batem com os de
+antes, que nada é gravado de novo nas abas, que linhas digitadas à mão
+(sem ID) entram e que uma segunda partida não relê as planilhas. Também
+confere que o histórico não se perde quando um lançamento chega antes da
+leitura ou quando o Google está fora do ar na primeira tentativa
+
+Uso: python benchmarks/verificar_leitura_inicial.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from falsos import GoogleFalso
+from catalogo_obras import CatalogoObras
+from livro_lancamentos import LivroLancamentos
+from modelo_planilha import MODELO_RAILWAY, ids_abas, provisionar_planilha
+from registro_obras import RegistroObras
+from sincronizacao_planilhas import SincronizadorPlanilhas
+
+OBRAS = ["Casa Azul", "Prédio Centro"]
+
+
+def montar_sincronizador(livro, gc, pasta):
+    """Sincronizador como nos bots: registro obra → planilha e catálogo do Drive"""
+    registro = RegistroObras(os.path.join(pasta, f"registro_{id(livro)}.db"))
+    catalogo = CatalogoObras()
+
+    def abrir_aba(gc, obra, aba):
+        return registro.obter_aba(gc, f"Obra: {obra}", aba,
+                                  lambda: provisionar_planilha(gc, obra, MODELO_RAILWAY),
+                                  abas_novas=ids_abas(MODELO_RAILWAY))
+
+    def listar(gc):
+        return [(obra['nome'], obra['id']) for obra in catalogo.listar(gc)]
+
+    return SincronizadorPlanilhas(livro, lambda: gc, abrir_aba, listar)
+
+
+def lancar(livro, obra, i):
+    data = f"{1 + i % 28:02d}/{1 + i % 3:02d}/2025"
+    if i % 3:
+        descricao, categoria, valor = f"Item {i}", ["Material", "Ferramentas"][i % 2], 100 + i * 7.5
+        livro.registrar(obra, 'gasto', [data, descricao, categoria, f"R$ {valor}", ""],
+                        data=data, descricao=descricao, categoria=categoria, valor=valor)
+    else:
+        funcionario, funcao, valor = f"Pessoa {i}", "Pedreiro", 200 + i
+        livro.registrar(obra, 'pagamento', [data, funcionario, funcao, f"R$ {valor}", ""],
+                        data=data, funcionario=funcionario, funcao=funcao, valor=valor)
+
+
+def mesmos_totais(depois, esperado):
+    """Compara dois /resumo (com arredondamento)"""
+    campos = ('gastos', 'pagamentos', 'quantidade', 'categorias', 'funcoes', 'meses')
+    return depois is not None and all(
+        round(depois[c], 2) == round(esperado[c], 2) if not isinstance(depois[c], dict)
+        else {k: round(v, 2) for k, v in depois[c].items()} == {k: round(v, 2) for k, v in esperado[c].items()}
+        for c in campos
+    )
+
+
+def com_lancamento(resumo, categoria, mes, valor):
+    """/resumo esperado depois de mais um gasto"""
+    resumo = dict(resumo, categorias=dict(resumo['categorias']), meses=dict(resumo['meses']))
+    resumo['gastos'] += valor
+    resumo['quantidade'] += 1
+    resumo['categorias'][categoria] = resumo['categorias'].get(categoria, 0) + valor
+    resumo['meses'][mes] = resumo['meses'].get(mes, 0) + valor
+    return resumo
+
+
+def main():
+    pasta = tempfile.mkdtemp(prefix='verificar_leitura_inicial_')
+    google = GoogleFalso()
+    gc = google.cliente()
+    resultados = []
+
+    def conferir(nome, condicao, detalhe):
+        resultados.append((nome, bool(condicao), detalhe))
+
+    # Antes do deploy: lançamentos gravados e copiados para as abas
+    antigo = LivroLancamentos(os.path.join(pasta, 'antigo.db'))
+    for i in range(60):
+        lancar(antigo, OBRAS[i % 2], i)
+    montar_sincronizador(antigo, gc, pasta).sincronizar()
+
+    # Linha digitada à mão na planilha (sem ID), com o valor como número
+    planilha = next(p for p in google.planilhas.values() if p['nome'] == f"Obra: {OBRAS[0]}")
+    aba_gastos = next(a for a in planilha['abas'].values() if a['title'] == 'Gastos')
+    aba_gastos['linhas'].append(["15/02/2025", "Areia (manual)", "Material", 350, ""])
+    antes = {obra: antigo.resumo(obra) for obra in OBRAS}
+    esperado = antes[OBRAS[0]]
+    esperado['gastos'] += 350
+    esperado['quantidade'] += 1
+    esperado['categorias']['Material'] = esperado['categorias'].get('Material', 0) + 350
+    esperado['meses']['2025-02'] = esperado['meses'].get('2025-02', 0) + 350
+
+    # Deploy com disco novo: livro vazio, leitura inicial das abas
+    novo = LivroLancamentos(os.path.join(pasta, 'novo.db'))
+    sincronizador = montar_sincronizador(novo, gc, pasta)
+    lotes_antes = google.chamadas['sheets.values.batchGet']
+    conferir("Leitura inicial concluída", sincronizador.importar_planilhas(),
+             f"{sincronizador.linhas_importadas} lançamentos importados")
+    lotes = google.chamadas['sheets.values.batchGet'] - lotes_antes
+    conferir("Uma values.batchGet por planilha", lotes == len(OBRAS), f"{lotes} chamada(s)")
+
+    for obra in OBRAS:
+        depois = novo.resumo(obra)
+        conferir(f"/resumo {obra} igual ao de antes", mesmos_totais(depois, antes[obra]),
+                 f"R$ {depois['gastos'] + depois['pagamentos']:.2f} em {depois['quantidade']} lançamentos"
+                 if depois else "sem totais")
+
+    # Importadas já contam como sincronizadas: nada vai de novo para as abas
+    anexadas = google.linhas_anexadas
+    sincronizador.sincronizar()
+    conferir("Nada regravado nas abas", google.linhas_anexadas == anexadas,
+             f"{google.linhas_anexadas - anexadas} linha(s) anexada(s)")
+
+    # Lançamento novo depois do deploy vai para a linha seguinte da aba
+    linhas_gastos = len(aba_gastos['linhas'])
+    novo.registrar(OBRAS[0], 'gasto', ["20/02/2025", "Brita", "Material", "R$ 90", ""],
+                   data="20/02/2025", descricao="Brita", categoria="Material", valor=90)
+    sincronizador.sincronizar()
+    conferir("Lançamento novo anexado uma vez", len(aba_gastos['linhas']) == linhas_gastos + 1
+             and aba_gastos['linhas'][-1][1] == "Brita",
+             f"{len(aba_gastos['linhas']) - linhas_gastos} linha(s) nova(s)")
+
+    # Segunda partida com o mesmo livro: as obras já estão nele, nada é relido
+    lotes_antes = google.chamadas['sheets.values.batchGet']
+    outra = montar_sincronizador(LivroLancamentos(novo.caminho), gc, pasta)
+    outra.importar_planilhas()
+    conferir("Segunda partida não relê as abas",
+             google.chamadas['sheets.values.batchGet'] == lotes_antes and outra.linhas_importadas == 0,
+             f"{google.chamadas['sheets.values.batchGet'] - lotes_antes} chamada(s), "
+             f"{outra.linhas_importadas} importado(s)")
+
+    # Lançamento que chega antes da leitura (disco novo): o histórico entra
+    # igual e o lançamento pendente vai para a aba uma vez só
+    linhas_gastos = len(aba_gastos['linhas'])
+    esperado = novo.resumo(OBRAS[0])
+    corrida = LivroLancamentos(os.path.join(pasta, 'corrida.db'))
+    corrida.registrar(OBRAS[0], 'gasto', ["21/02/2025", "Cal", "Material", "R$ 45", ""],
+                      data="21/02/2025", descricao="Cal", categoria="Material", valor=45)
+    sincronizador = montar_sincronizador(corrida, gc, pasta)
+    sincronizador.importar_planilhas()
+    sincronizador.sincronizar()
+    conferir("Lançamento antes da leitura: histórico lido",
+             mesmos_totais(corrida.resumo(OBRAS[0]), com_lancamento(esperado, "Material", "2025-02", 45)),
+             f"{corrida.resumo(OBRAS[0])['quantidade']} lançamentos em {OBRAS[0]}")
+    conferir("Lançamento antes da leitura: anexado uma vez",
+             len(aba_gastos['linhas']) == linhas_gastos + 1 and aba_gastos['linhas'][-1][1] == "Cal"
+             and corrida.estado_sincronizacao()['pendentes'] == 0,
+             f"{len(aba_gastos['linhas']) - linhas_gastos} linha(s) nova(s)")
+
+    # Google fora do ar na primeira tentativa; lançamento gravado enquanto isso
+    linhas_gastos = len(aba_gastos['linhas'])
+    esperado = corrida.resumo(OBRAS[0])
+    queda = LivroLancamentos(os.path.join(pasta, 'queda.db'))
+    sincronizador = montar_sincronizador(queda, gc, pasta)
+    listar = sincronizador.listar_planilhas
+
+    def fora_do_ar(gc):
+        raise ConnectionError("Google fora do ar")
+
+    sincronizador.listar_planilhas = fora_do_ar
+    primeira = sincronizador.importar_planilhas()
+    queda.registrar(OBRAS[0], 'gasto', ["22/02/2025", "Prego", "Material", "R$ 12", ""],
+                    data="22/02/2025", descricao="Prego", categoria="Material", valor=12)
+    sincronizador.listar_planilhas = listar
+    segunda = sincronizador.importar_planilhas()
+    sincronizador.sincronizar()
+    conferir("Google fora do ar: leitura repetida depois",
+             not primeira and segunda
+             and mesmos_totais(queda.resumo(OBRAS[0]), com_lancamento(esperado, "Material", "2025-02", 12)),
+             f"1ª tentativa {'ok' if primeira else 'falhou'}, 2ª {'ok' if segunda else 'falhou'}, "
+             f"{queda.resumo(OBRAS[0])['quantidade']} lançamentos em {OBRAS[0]}")
+    conferir("Google fora do ar: lançamento anexado uma vez",
+             len(aba_gastos['linhas']) == linhas_gastos + 1 and aba_gastos['linhas'][-1][1] == "Prego",
+             f"{len(aba_gastos['linhas']) - linhas_gastos} linha(s) nova(s)")
+
+    print("=" * 60)
+    print("📥 Verificação da leitura inicial das planilhas")
+    print("=" * 60)
+    for nome, ok, detalhe in resultados:
+        print(f"{'✅' if ok else '❌'} {nome}: {detalhe}")
+    return 0 if all(ok for _, ok, _ in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
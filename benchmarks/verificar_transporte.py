@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação local do transporte HTTP da OpenAI (transporte_http.py)
+Sobe um servidor falso (aiohttp) com respostas roteirizadas e confere:
+nova tentativa em 429/503, Retry-After em segundos, como data HTTP e com teto em backoff_max,
+timeout de leitura e conexão recusada seguidos de nova tentativa,
+desistência depois de max_tentativas, nenhuma repetição em 400 e
+reaproveitamento da conexão (keep-alive)
+
+Uso: python benchmarks/verificar_transporte.py
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import httpx
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from transporte_http import TransporteHTTP
+
+TIMEOUT_LEITURA = 0.5
+
+# ========== SERVIDOR FALSO ==========
+
+class ServidorFalso:
+    """Cada rota responde conforme o roteiro: status, (status, cabeçalhos) ou 'lento'"""
+
+    def __init__(self):
+        self.roteiros = {}
+        self.chamadas = {}
+        self.conexoes = set()
+
+    def roteirizar(self, rota, *respostas):
+        self.roteiros[rota] = list(respostas)
+        self.chamadas[rota] = 0
+
+    async def tratar(self, request):
+        rota = request.match_info['rota']
+        self.chamadas[rota] = self.chamadas.get(rota, 0) + 1
+        self.conexoes.add(request.transport.get_extra_info('peername'))
+        await request.read()
+
+        roteiro = self.roteiros.get(rota) or [200]
+        resposta = roteiro.pop(0) if len(roteiro) > 1 else roteiro[0]
+        if resposta == 'lento':
+            await asyncio.sleep(TIMEOUT_LEITURA * 3)
+            resposta = 200
+        status, cabecalhos = resposta if isinstance(resposta, tuple) else (resposta, {})
+        return web.json_response({"rota": rota, "chamada": self.chamadas[rota]},
+                                 status=status, headers=cabecalhos)
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def iniciar_site(app, porta):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', porta).start()
+    return runner
+
+# ========== EXECUÇÃO ==========
+
+def novo_transporte(**kwargs):
+    opcoes = dict(timeout_conexao=1, timeout_leitura=TIMEOUT_LEITURA, max_tentativas=4,
+                  backoff_base=0.05, backoff_max=0.05)
+    opcoes.update(kwargs)
+    return TransporteHTTP(**opcoes)
+
+
+async def cronometrar(transporte, url):
+    inicio = time.perf_counter()
+    try:
+        resposta = await transporte.post(url, json={"ok": True})
+    except httpx.HTTPError as e:
+        return e, time.perf_counter() - inicio
+    return resposta, time.perf_counter() - inicio
+
+
+async def verificar():
+    falso = ServidorFalso()
+    app = web.Application()
+    app.router.add_post('/v1/{rota}', falso.tratar)
+    porta = porta_livre()
+    runner = await iniciar_site(app, porta)
+    base = f"http://127.0.0.1:{porta}/v1"
+
+    resultados = []
+
+    def conferir(nome, condicao, detalhe):
+        resultados.append((nome, bool(condicao), detalhe))
+
+    # 429 e 503 sem Retry-After: backoff e nova tentativa
+    falso.roteirizar('429', 429, 200)
+    falso.roteirizar('503', 503, 503, 200)
+    transporte = novo_transporte()
+    resposta, _ = await cronometrar(transporte, f"{base}/429")
+    conferir("429 → nova tentativa", resposta.status_code == 200 and falso.chamadas['429'] == 2,
+             f"HTTP {resposta.status_code}, {falso.chamadas['429']} chamadas")
+    resposta, _ = await cronometrar(transporte, f"{base}/503")
+    conferir("503 → novas tentativas", resposta.status_code == 200 and falso.chamadas['503'] == 3,
+             f"HTTP {resposta.status_code}, {falso.chamadas['503']} chamadas")
+
+    # Retry-After maior que backoff_max (0.05 s) é limitado ao teto
+    falso.roteirizar('retry-longo', (429, {'Retry-After': '3600'}), 200)
+    resposta, segundos = await cronometrar(transporte, f"{base}/retry-longo")
+    conferir("Retry-After: 3600 limitado a backoff_max", resposta.status_code == 200 and segundos < 0.5,
+             f"HTTP {resposta.status_code} depois de {segundos:.2f}s")
+
+    # Erro 400 não é repetido
+    falso.roteirizar('400', 400)
+    resposta, _ = await cronometrar(transporte, f"{base}/400")
+    conferir("400 sem nova tentativa", resposta.status_code == 400 and falso.chamadas['400'] == 1,
+             f"HTTP {resposta.status_code}, {falso.chamadas['400']} chamada(s)")
+
+    # Keep-alive: as chamadas sequenciais acima usaram a mesma conexão
+    conferir("Conexão reaproveitada", len(falso.conexoes) == 1, f"{len(falso.conexoes)} conexão(ões)")
+
+    # Retry-After em segundos e como data HTTP (a data tem resolução de 1 s)
+    transporte_paciente = novo_transporte(backoff_max=5)
+    falso.roteirizar('retry-segundos', (429, {'Retry-After': '1'}), 200)
+    resposta, segundos = await cronometrar(transporte_paciente, f"{base}/retry-segundos")
+    conferir("Retry-After: 1", resposta.status_code == 200 and 0.9 <= segundos < 2,
+             f"HTTP {resposta.status_code} depois de {segundos:.2f}s")
+
+    data = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=2), usegmt=True)
+    falso.roteirizar('retry-data', (503, {'Retry-After': data}), 200)
+    resposta, segundos = await cronometrar(transporte_paciente, f"{base}/retry-data")
+    conferir("Retry-After como data HTTP", resposta.status_code == 200 and 0.9 <= segundos < 3,
+             f"HTTP {resposta.status_code} depois de {segundos:.2f}s ({data})")
+    await transporte_paciente.fechar()
+
+    # Timeout de leitura seguido de nova tentativa
+    falso.roteirizar('lento', 'lento', 200)
+    resposta, segundos = await cronometrar(transporte, f"{base}/lento")
+    conferir("Timeout de leitura → nova tentativa",
+             getattr(resposta, 'status_code', None) == 200 and falso.chamadas['lento'] == 2,
+             f"{resposta!r} depois de {segundos:.2f}s, {falso.chamadas['lento']} chamadas")
+    await transporte.fechar()
+
+    # Desiste depois de max_tentativas: devolve o último 503 / relança o timeout
+    transporte = novo_transporte(max_tentativas=3)
+    falso.roteirizar('sempre-503', 503)
+    resposta, _ = await cronometrar(transporte, f"{base}/sempre-503")
+    conferir("Desiste após 3 tentativas (503)",
+             resposta.status_code == 503 and falso.chamadas['sempre-503'] == 3,
+             f"HTTP {resposta.status_code}, {falso.chamadas['sempre-503']} chamadas")
+
+    falso.roteirizar('sempre-lento', 'lento')
+    resposta, _ = await cronometrar(transporte, f"{base}/sempre-lento")
+    conferir("Desiste após 3 timeouts", isinstance(resposta, httpx.ReadTimeout)
+             and falso.chamadas['sempre-lento'] == 3,
+             f"{type(resposta).__name__}, {falso.chamadas['sempre-lento']} chamadas")
+    await transporte.fechar()
+
+    # Conexão recusada: tenta de novo e acerta quando o servidor sobe
+    porta_tardia = porta_livre()
+    transporte = novo_transporte(max_tentativas=3)
+    transporte._backoff = lambda tentativa: 0.5   # espera fixa, maior que o atraso do servidor
+    app_tardio = web.Application()
+    app_tardio.router.add_post('/v1/{rota}', falso.tratar)
+
+    async def subir_depois():
+        await asyncio.sleep(0.2)
+        return await iniciar_site(app_tardio, porta_tardia)
+
+    subida = asyncio.create_task(subir_depois())
+    resposta, _ = await cronometrar(transporte, f"http://127.0.0.1:{porta_tardia}/v1/tardio")
+    conferir("Conexão recusada → nova tentativa",
+             getattr(resposta, 'status_code', None) == 200 and transporte.tentativas_extras == 1,
+             f"{resposta!r}, {transporte.tentativas_extras} tentativa(s) extra(s)")
+    await transporte.fechar()
+    runner_tardio = await subida
+
+    # Conexão sempre recusada: desiste na última tentativa
+    transporte = novo_transporte(max_tentativas=3)
+    resposta, _ = await cronometrar(transporte, f"http://127.0.0.1:{porta_livre()}/v1/ninguem")
+    conferir("Desiste após 3 conexões recusadas",
+             isinstance(resposta, httpx.ConnectError) and transporte.tentativas_extras == 2,
+             f"{type(resposta).__name__}, {transporte.tentativas_extras} tentativas extras")
+    await transporte.fechar()
+
+    await runner_tardio.cleanup()
+    await runner.cleanup()
+
+    print("=" * 60)
+    print("🔁 Verificação do transporte HTTP (servidor falso)")
+    print("=" * 60)
+    for nome, ok, detalhe in resultados:
+        print(f"{'✅' if ok else '❌'} {nome}: {detalhe}")
+    return 0 if all(ok for _, ok, _ in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(verificar()))
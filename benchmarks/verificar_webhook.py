@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação local do modo webhook com um Telegram falso
+Sobe uma Bot API falsa (aiohttp), inicia o servidor do webhook apontando
+para ela e confere que: updates com o segredo certo são processados pelos
+handlers, segredo errado é recusado e o /saude responde
+
+Uso: python benchmarks/verificar_webhook.py
+"""
+
+import os
+import sys
+import json
+import socket
+import asyncio
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telegram.ext import Application, MessageHandler, filters
+from servidor_webhook import CABECALHO_SEGREDO, servir_webhook
+
+TOKEN = "123456:TESTE"
+SEGREDO = "segredo-local"
+
+# ========== BOT API FALSA ==========
+
+class TelegramFalso:
+    """Responde getMe/setWebhook/sendMessage e guarda o que recebeu"""
+
+    def __init__(self):
+        self.webhook = None
+        self.enviadas = []
+
+    async def tratar(self, request):
+        metodo = request.match_info['metodo']
+        dados = dict(await request.post()) if request.can_read_body else {}
+
+        if metodo == 'getMe':
+            resultado = {"id": 123456, "is_bot": True, "first_name": "Teste", "username": "teste_bot"}
+        elif metodo == 'setWebhook':
+            self.webhook = dados
+            resultado = True
+        elif metodo == 'sendMessage':
+            self.enviadas.append(dados)
+            resultado = {
+                "message_id": len(self.enviadas), "date": 0,
+                "chat": {"id": int(dados['chat_id']), "type": "private"},
+                "text": dados.get('text', ''),
+            }
+        else:
+            resultado = True
+        return web.json_response({"ok": True, "result": resultado})
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def update_texto(update_id, chat_id, texto):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": texto,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Obra"},
+        },
+    }
+
+# ========== EXECUÇÃO ==========
+
+async def verificar():
+    falso = TelegramFalso()
+    app_falso = web.Application()
+    app_falso.router.add_post('/bot{token}/{metodo}', falso.tratar)
+    runner_falso = web.AppRunner(app_falso)
+    await runner_falso.setup()
+    porta_api = porta_livre()
+    await web.TCPSite(runner_falso, '127.0.0.1', porta_api).start()
+
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(f"http://127.0.0.1:{porta_api}/bot")
+        .updater(None)
+        .build()
+    )
+
+    async def eco(update, context):
+        await update.message.reply_text(f"recebido: {update.message.text}")
+
+    application.add_handler(MessageHandler(filters.TEXT, eco))
+
+    porta = porta_livre()
+    parar = asyncio.Event()
+    servidor = asyncio.create_task(servir_webhook(
+        application, url_publica=f"http://127.0.0.1:{porta}", porta=porta,
+        caminho='/telegram', segredo=SEGREDO, parar=parar,
+        estado=lambda: {"teste": True}
+    ))
+
+    falhas = []
+    base = f"http://127.0.0.1:{porta}"
+    async with aiohttp.ClientSession() as sessao:
+        for _ in range(50):
+            try:
+                async with sessao.get(f"{base}/saude") as resposta:
+                    saude = resposta.status, await resposta.json()
+                break
+            except aiohttp.ClientConnectionError:
+                await asyncio.sleep(0.1)
+        else:
+            falhas.append("servidor não subiu")
+            saude = None, {}
+
+        if saude[0] != 200 or not saude[1].get('teste'):
+            falhas.append(f"/saude inesperado: {saude}")
+        if not falso.webhook or falso.webhook.get('secret_token') != SEGREDO:
+            falhas.append(f"setWebhook sem o segredo: {falso.webhook}")
+
+        cabecalho = {CABECALHO_SEGREDO: SEGREDO}
+        for i in range(1, 4):
+            async with sessao.post(f"{base}/telegram", json=update_texto(i, 1000 + i, f"msg {i}"),
+                                   headers=cabecalho) as resposta:
+                if resposta.status != 200:
+                    falhas.append(f"update {i}: HTTP {resposta.status}")
+
+        async with sessao.post(f"{base}/telegram", json=update_texto(9, 9, "intruso"),
+                               headers={CABECALHO_SEGREDO: "errado"}) as resposta:
+            if resposta.status != 403:
+                falhas.append(f"segredo errado aceito: HTTP {resposta.status}")
+
+        for _ in range(50):
+            if len(falso.enviadas) >= 3:
+                break
+            await asyncio.sleep(0.1)
+
+    parar.set()
+    await servidor
+    await runner_falso.cleanup()
+
+    textos = sorted(m.get('text') for m in falso.enviadas)
+    if textos != ["recebido: msg 1", "recebido: msg 2", "recebido: msg 3"]:
+        falhas.append(f"respostas inesperadas: {json.dumps(textos, ensure_ascii=False)}")
+
+    print("=" * 50)
+    print("🌐 Verificação do modo webhook (Telegram falso)")
+    print("=" * 50)
+    print(f"Webhook registrado: {falso.webhook.get('url') if falso.webhook else '-'}")
+    print(f"Respostas enviadas: {len(falso.enviadas)}")
+    if falhas:
+        for falha in falhas:
+            print(f"❌ {falha}")
+        return 1
+    print("✅ Updates processados, segredo conferido e /saude ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(verificar()))
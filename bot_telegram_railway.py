@@ -10,16 +10,39 @@ import sys
 import json
 from datetime import datetime
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from openai import OpenAI
-import gspread
-from google.oauth2.service_account import Credentials
+from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters, ContextTypes
+from openai import AsyncOpenAI
+from cliente_google import GerenciadorClienteGoogle
+from limite_google import LimitadorGoogle
+from registro_obras import RegistroObras
+from catalogo_obras import CatalogoObras
+from modelo_planilha import MODELO_RAILWAY, ids_abas, provisionar_planilha
+from livro_lancamentos import LivroLancamentos
+from totais_obras import mensagem_resumo
+from resolvedor_obras import ResolvedorObras
+from servidor_webhook import executar
+from processos_bot import BOT_PROCESSOS, RoteadorUpdates, executar_trabalho
+from sincronizacao_planilhas import SincronizadorPlanilhas
+from execucao import em_thread
+from audio_memoria import baixar_audio
+from preprocessamento_audio import transcrever_em_trechos
+from cache_processamento import CacheProcessamento, hash_audio, hash_mensagem, hash_texto, chave_idempotencia
+from fila_processamento import FilaProcessamento, FilaCheia
+from progresso_mensagem import ProgressoMensagem, aguardar_progressos
+from importacao import IMPORTACAO_CONCORRENCIA, Importador, criar_comando_importar, listar_itens
+from extrator_regras import EXTRATOR_LIMIAR, extrair_por_regras, menciona_valor, parece_lancamento
+from extracao_agrupada import AgrupadorExtracoes, interpretar_lote, textos_numerados
+from metricas import RequisicaoTelegramMedida, coletor_componentes, mensagem_etapas, metricas
 
 # ========== CONFIGURAÇÕES ==========
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 GOOGLE_CREDENTIALS_JSON = os.environ.get('GOOGLE_CREDENTIALS_JSON', '')
 
+# Endereços das APIs (trocar só para um servidor local da Bot API ou testes)
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1').rstrip('/')
+
 # Verificar configurações
 if not TELEGRAM_BOT_TOKEN:
     print("❌ ERRO: TELEGRAM_BOT_TOKEN não configurado!")
@@ -33,8 +56,8 @@ if not GOOGLE_CREDENTIALS_JSON:
     print("❌ ERRO: GOOGLE_CREDENTIALS_JSON não configurado!")
     sys.exit(1)
 
-# Cliente OpenAI
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Cliente OpenAI (assíncrono, não bloqueia o event loop)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
 
 # Scopes do Google
 SCOPES = [
@@ -42,141 +65,121 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Limitador das cotas de leitura/escrita do Google
+limitador_google = LimitadorGoogle()
+
+# Cliente Google compartilhado (autoriza uma vez por processo)
+gerenciador_google = GerenciadorClienteGoogle(
+    GOOGLE_CREDENTIALS_JSON, SCOPES, limitador=limitador_google
+)
+
+# Registro obra → planilha (evita busca por título no Drive)
+registro_obras = RegistroObras()
+
+# Planilhas "Obra: ..." do Drive (leitura inicial das obras que o livro não conhece)
+catalogo_obras = CatalogoObras()
+
+# Livro local de lançamentos (registro oficial; a planilha é uma cópia)
+livro = LivroLancamentos()
+
+# Fila de processamento (ordem por chat e limite por etapa)
+fila = FilaProcessamento()
+
+# Cache de transcrições/extrações (áudio repetido não é processado de novo)
+cache = CacheProcessamento()
+
+def obras_conhecidas():
+    """Obras do livro e do registro de planilhas (base do resolvedor de nomes)"""
+    titulos = registro_obras.titulos()
+    return livro.obras() + [t[len("Obra: "):] for t in titulos if t.startswith("Obra: ")]
+
+# Nome falado → obra existente mais parecida (evita planilhas duplicadas)
+resolvedor_obras = ResolvedorObras(obras_conhecidas)
+
 # ========== FUNÇÕES DO GOOGLE SHEETS ==========
 
 def obter_cliente_google():
     """Obtém cliente autenticado do Google Sheets usando Service Account"""
     try:
-        # Carregar credenciais da variável de ambiente
-        creds_dict = json.loads(GOOGLE_CREDENTIALS_JSON)
-        creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-        return gspread.authorize(creds)
+        # Cliente reaproveitado entre mensagens, com token renovado automaticamente
+        return gerenciador_google.obter()
     except Exception as e:
         print(f"❌ Erro ao autenticar Google: {e}")
         return None
 
 def criar_planilha_obra(gc, nome_obra):
-    """Cria uma nova planilha no Google Sheets"""
-    nome_planilha = f"Obra: {nome_obra}"
-    
-    # Criar planilha
-    spreadsheet = gc.create(nome_planilha)
-    
-    # Configurar abas
-    sheet = spreadsheet.sheet1
-    sheet.update_title("Gastos")
-    
-    # Cabeçalho Gastos
-    sheet.update('A1', f"GASTOS - OBRA: {nome_obra.upper()}")
-    sheet.format('A1', {
-        "textFormat": {"bold": True, "fontSize": 14},
-        "horizontalAlignment": "CENTER"
-    })
-    
-    sheet.update('A2:E2', [['Data', 'Descrição', 'Categoria', 'Valor', 'Observações']])
-    sheet.format('A2:E2', {
-        "textFormat": {"bold": True},
-        "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8}
-    })
-    
-    # Ajustar larguras
-    sheet.set_column_width(1, 100)   # A - Data
-    sheet.set_column_width(2, 300)   # B - Descrição
-    sheet.set_column_width(3, 150)   # C - Categoria
-    sheet.set_column_width(4, 120)   # D - Valor
-    sheet.set_column_width(5, 300)   # E - Observações
-    
-    # Aba Pagamentos
-    ws_pag = spreadsheet.add_worksheet("Pagamentos", 1000, 5)
-    ws_pag.update('A1', f"PAGAMENTOS - OBRA: {nome_obra.upper()}")
-    ws_pag.format('A1', {
-        "textFormat": {"bold": True, "fontSize": 14},
-        "horizontalAlignment": "CENTER"
-    })
-    
-    ws_pag.update('A2:E2', [['Data', 'Funcionário', 'Função', 'Valor', 'Observações']])
-    ws_pag.format('A2:E2', {
-        "textFormat": {"bold": True},
-        "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8}
-    })
-    
-    # Ajustar larguras
-    ws_pag.set_column_width(1, 100)
-    ws_pag.set_column_width(2, 200)
-    ws_pag.set_column_width(3, 150)
-    ws_pag.set_column_width(4, 120)
-    ws_pag.set_column_width(5, 300)
-    
-    # Aba Resumo
-    ws_resumo = spreadsheet.add_worksheet("Resumo", 100, 5)
-    ws_resumo.update('A1', f"RESUMO - OBRA: {nome_obra.upper()}")
-    ws_resumo.format('A1', {
-        "textFormat": {"bold": True, "fontSize": 14},
-        "horizontalAlignment": "CENTER"
-    })
-    
-    ws_resumo.update('A3:B6', [
-        ['Total de Gastos:', '=SOMA(Gastos!D:D)'],
-        ['Total de Pagamentos:', '=SOMA(Pagamentos!D:D)'],
-        ['', ''],
-        ['TOTAL GERAL:', '=B3+B4']
-    ])
-    
-    ws_resumo.format('A3:A6', {"textFormat": {"bold": True}})
-    ws_resumo.format('B6', {
-        "textFormat": {"bold": True, "fontSize": 12},
-        "backgroundColor": {"red": 1, "green": 0.9, "blue": 0.6}
-    })
-    
-    return spreadsheet
+    """Cria uma nova planilha no Google Sheets (modelo aplicado num único lote)"""
+    return provisionar_planilha(gc, nome_obra, MODELO_RAILWAY)
+
+def obter_aba_obra(gc, nome_obra, nome_aba):
+    """Obtém a aba da obra pelo id registrado, criando a planilha se não existir"""
+    return registro_obras.obter_aba(
+        gc, f"Obra: {nome_obra}", nome_aba,
+        lambda: criar_planilha_obra(gc, nome_obra),
+        abas_novas=ids_abas(MODELO_RAILWAY)
+    )
 
-def adicionar_gasto(gc, nome_obra, data, descricao, categoria, valor, obs=""):
-    """Adiciona um gasto à planilha"""
-    nome_planilha = f"Obra: {nome_obra}"
-    
-    try:
-        spreadsheet = gc.open(nome_planilha)
-    except:
-        spreadsheet = criar_planilha_obra(gc, nome_obra)
-    
-    sheet = spreadsheet.worksheet("Gastos")
-    sheet.append_row([data, descricao, categoria, valor, obs])
-    
-    return spreadsheet.url
+def listar_planilhas_obras(gc):
+    """[(obra, spreadsheet_id)] de todas as planilhas de obra no Drive"""
+    return [(obra['nome'], obra['id']) for obra in catalogo_obras.listar(gc)]
+
+# Copia os lançamentos do livro para as abas Gastos/Pagamentos em segundo plano
+sincronizador = SincronizadorPlanilhas(livro, obter_cliente_google, obter_aba_obra, listar_planilhas_obras)
+
+def gravar_lancamento(nome_obra, tipo, valores, chave="", **campos):
+    """Grava no livro local (confirmação imediata) e avisa o sincronizador"""
+    with metricas.medir('bot_etapa_segundos', etapa='livro'):
+        id_lancamento, _ = livro.registrar(nome_obra, tipo, valores, chave or None, **campos)
+    sincronizador.acordar()
+    return registro_obras.url(f"Obra: {nome_obra}"), id_lancamento
+
+def adicionar_gasto(nome_obra, data, descricao, categoria, valor, obs="", chave=""):
+    """Adiciona um gasto ao livro (retorna URL da planilha e nº do lançamento)"""
+    return gravar_lancamento(
+        nome_obra, "gasto",
+        [data, descricao, categoria, f"R$ {valor}", obs],
+        chave, data=data, descricao=descricao, categoria=categoria,
+        valor=valor, observacoes=obs
+    )
 
-def adicionar_pagamento(gc, nome_obra, data, funcionario, funcao, valor, obs=""):
-    """Adiciona um pagamento à planilha"""
-    nome_planilha = f"Obra: {nome_obra}"
-    
-    try:
-        spreadsheet = gc.open(nome_planilha)
-    except:
-        spreadsheet = criar_planilha_obra(gc, nome_obra)
-    
-    sheet = spreadsheet.worksheet("Pagamentos")
-    sheet.append_row([data, funcionario, funcao, valor, obs])
-    
-    return spreadsheet.url
+def adicionar_pagamento(nome_obra, data, funcionario, funcao, valor, obs="", chave=""):
+    """Adiciona um pagamento ao livro (retorna URL da planilha e nº do lançamento)"""
+    return gravar_lancamento(
+        nome_obra, "pagamento",
+        [data, funcionario, funcao, f"R$ {valor}", obs],
+        chave, data=data, funcionario=funcionario, funcao=funcao,
+        valor=valor, observacoes=obs
+    )
 
 # ========== FUNÇÕES DE IA ==========
 
-def transcrever_audio(audio_path):
-    """Transcreve áudio usando Whisper da OpenAI"""
-    with open(audio_path, 'rb') as audio_file:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            language="pt"
-        )
+async def transcrever_arquivo(audio):
+    """Transcreve áudio (arquivo em memória) usando Whisper da OpenAI"""
+    transcript = await client.audio.transcriptions.create(
+        model="whisper-1",
+        file=("audio.ogg", audio),
+        language="pt"
+    )
     return transcript.text
 
-def extrair_informacoes(texto):
-    """Extrai informações do texto usando GPT"""
-    prompt = f"""
-Analise o seguinte texto sobre gastos ou pagamentos de uma obra de construção e extraia as informações:
+async def transcrever_audio(audio):
+    """Transcreve o áudio, pré-processado e em trechos paralelos se for longo"""
+    return await transcrever_em_trechos(audio, transcrever_arquivo)
 
-Texto: "{texto}"
+def extrair_localmente(texto):
+    """Tenta o extrator por regras; None se a confiança ficar abaixo do limiar"""
+    dados = extrair_por_regras(texto, obra_padrao="Obra Padrão")
+    if dados.pop("confianca") < EXTRATOR_LIMIAR:
+        return None
 
+    # Mesmo formato da resposta do GPT neste bot
+    if "nome_funcionario" in dados:
+        dados["funcionario"] = dados.pop("nome_funcionario")
+    dados["valor"] = f"{dados['valor']:.2f}"
+    dados.pop("data", None)
+    return dados
+
+INSTRUCOES_EXTRACAO = """
 Identifique:
 1. TIPO: É um "gasto" (compra de material/serviço) ou "pagamento" (pagamento a funcionário)?
 2. OBRA: Nome da obra mencionada (se não mencionar, use "Obra Padrão")
@@ -190,9 +193,9 @@ Identifique:
    - FUNÇÃO: Pedreiro, Ajudante, Eletricista, Encanador, Servente, ou Outros
    - VALOR: Valor em reais
    - OBSERVAÇÕES: Informações adicionais
+"""
 
-Responda APENAS no formato JSON:
-{{
+FORMATO_EXTRACAO = """{
   "tipo": "gasto" ou "pagamento",
   "obra": "nome da obra",
   "descricao": "descrição" (se gasto),
@@ -201,18 +204,33 @@ Responda APENAS no formato JSON:
   "funcao": "função" (se pagamento),
   "valor": "valor numérico",
   "observacoes": "observações"
-}}
+}"""
+
+async def chamar_gpt(prompt):
+    """Envia o prompt ao GPT (resposta em JSON) e retorna o conteúdo"""
+    async with fila.etapa('extracao'):
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+    return response.choices[0].message.content
+
+async def extrair_com_gpt(texto):
+    """Extrai as informações de um único texto usando GPT"""
+    prompt = f"""
+Analise o seguinte texto sobre gastos ou pagamentos de uma obra de construção e extraia as informações:
+
+Texto: "{texto}"
+{INSTRUCOES_EXTRACAO}
+Responda APENAS no formato JSON:
+{FORMATO_EXTRACAO}
 """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-        response_format={"type": "json_object"}
-    )
+    conteudo = await chamar_gpt(prompt)
     
     try:
-        conteudo = response.choices[0].message.content
         resultado = json.loads(conteudo)
         return resultado
     except json.JSONDecodeError as e:
@@ -228,6 +246,37 @@ Responda APENAS no formato JSON:
             "observacoes": "Erro ao processar - verifique manualmente"
         }
 
+async def extrair_lote_com_gpt(textos):
+    """Extrai vários textos numa única chamada; retorna {id: dados}"""
+    prompt = f"""
+Analise cada um dos textos abaixo sobre gastos ou pagamentos de uma obra de construção e extraia as informações de cada um:
+
+Textos:
+{textos_numerados(textos)}
+
+Para CADA texto:
+{INSTRUCOES_EXTRACAO}
+Responda APENAS no formato JSON, com exatamente um item por texto:
+{{"resultados": [{{"id": "id do texto", ...campos abaixo...}}]}}
+
+Campos de cada item:
+{FORMATO_EXTRACAO}
+"""
+    return interpretar_lote(await chamar_gpt(prompt), textos)
+
+# Transcrições pendentes extraídas juntas (uma chamada ao GPT por lote)
+agrupador_extracoes = AgrupadorExtracoes(extrair_lote_com_gpt, extrair_com_gpt)
+
+async def extrair_informacoes(texto):
+    """Extrai informações do texto (regras locais e, se preciso, GPT em lote)"""
+    dados = extrair_localmente(texto)
+    if dados is not None:
+        metricas.contar('bot_extracao_total', origem='regras')
+        return dados
+
+    metricas.contar('bot_extracao_total', origem='llm')
+    return await agrupador_extracoes.extrair(texto)
+
 # ========== HANDLERS DO BOT ==========
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -235,7 +284,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     mensagem = """
 🤖 *Bot de Controle de Gastos de Construção*
 
-Envie um áudio descrevendo:
+Envie um áudio (ou digite uma mensagem) descrevendo:
 • Gastos (materiais, ferramentas, etc.)
 • Pagamentos (funcionários)
 
@@ -244,95 +293,358 @@ _"Comprei cimento por 200 reais para a obra do João"_
 _"Paguei o pedreiro Pedro 350 reais da obra da Maria"_
 
 O bot vai criar/atualizar automaticamente uma planilha no Google Drive!
+
+Use /resumo <obra> para ver os totais de uma obra.
+Use /importar na legenda de um .zip de áudios ou .txt (um lançamento por linha) para importar vários de uma vez.
+Use /status para ver a fila, a sincronização e os tempos de cada etapa.
 """
     await update.message.reply_text(mensagem, parse_mode='Markdown')
 
-async def processar_audio(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Processa áudio enviado"""
+async def resumo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /resumo <obra> (totais em memória, sem consultar o Google)"""
+    if not context.args:
+        await update.message.reply_text("Use: /resumo <obra>\nExemplo: /resumo João")
+        return
+    
+    nome_obra = ' '.join(context.args)
+    nome_obra = resolvedor_obras.encontrar(nome_obra) or nome_obra
+    totais = livro.resumo(nome_obra)
+    if totais is None:
+        await update.message.reply_text(f"⚠️ Nenhum lançamento para a obra \"{nome_obra}\".")
+        return
+    
+    await update.message.reply_text(mensagem_resumo(totais), parse_mode='Markdown')
+
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /status (fila, livro local, cota do Google e tempos por etapa)"""
+    cota = limitador_google.contadores()
+    sinc = livro.estado_sincronizacao()
+    
+    mensagem = (
+        f"✅ *Bot funcionando*\n\n"
+        f"⏳ *Áudios na fila:* {fila.pendentes}\n"
+        f"📒 *Livro local:* {sinc['lancamentos']} lançamentos, "
+        f"{sinc['pendentes']} aguardando a planilha\n"
+        f"🚦 *Google:* {cota['leitura']['ultimo_minuto']}/{cota['leitura']['cota_minuto']} leituras, "
+        f"{cota['escrita']['ultimo_minuto']}/{cota['escrita']['cota_minuto']} escritas no último minuto, "
+        f"{cota['erros_429']} erros 429\n"
+        f"🤖 *Extração:* {agrupador_extracoes.itens_em_lote} em {agrupador_extracoes.lotes} lotes, "
+        f"{agrupador_extracoes.individuais} individuais\n"
+        f"♻️ *Cache:* {cache.acertos} acertos, {cache.falhas} falhas\n"
+    )
+    etapas = mensagem_etapas()
+    if etapas:
+        mensagem += f"\n{etapas}\n"
+    
+    await update.message.reply_text(mensagem, parse_mode='Markdown')
+
+async def enfileirar(update: Update, context: ContextTypes.DEFAULT_TYPE, pipeline):
+    """Coloca a mensagem na fila (ordem por chat) com a mensagem de progresso"""
+    # Uma mensagem só de resposta, editada a cada etapa
+    progresso = ProgressoMensagem(update.message)
     try:
-        await update.message.reply_text("🎤 Recebendo áudio...")
-        
-        # Baixar áudio
-        audio_file = await update.message.voice.get_file()
-        audio_path = f"audio_{update.message.voice.file_unique_id}.ogg"
-        await audio_file.download_to_drive(audio_path)
-        
-        await update.message.reply_text("📝 Transcrevendo...")
-        
-        # Transcrever
-        texto = transcrever_audio(audio_path)
-        os.remove(audio_path)
-        
-        await update.message.reply_text(f"✅ Transcrição: _{texto}_", parse_mode='Markdown')
-        await update.message.reply_text("🤖 Processando informações...")
-        
-        # Extrair informações
-        info = extrair_informacoes(texto)
-        
-        # Obter cliente Google
-        gc = obter_cliente_google()
-        if not gc:
-            await update.message.reply_text("❌ Erro ao conectar com Google Drive!")
-            return
-        
-        # Adicionar à planilha
-        data_hoje = datetime.now().strftime("%d/%m/%Y")
-        
-        if info['tipo'] == 'gasto':
-            url = adicionar_gasto(
-                gc,
-                info['obra'],
-                data_hoje,
-                info.get('descricao', ''),
-                info.get('categoria', 'Outros'),
-                f"R$ {info['valor']}",
-                info.get('observacoes', '')
-            )
-            
-            mensagem = f"""
+        posicao = fila.enviar(update.effective_chat.id, lambda: pipeline(update, context, progresso))
+    except FilaCheia:
+        await update.message.reply_text(
+            f"🚦 Bot ocupado ({fila.pendentes} áudios na fila). Tente novamente em alguns minutos."
+        )
+        return
+    
+    if posicao > 0:
+        progresso.atualizar(f"⏳ Bot ocupado, sua mensagem está na fila (posição {posicao}).")
+
+async def processar_audio(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Recebe o áudio e coloca na fila de processamento"""
+    await enfileirar(update, context, pipeline_audio)
+
+def chamou_bot(mensagem, bot):
+    """A mensagem menciona o bot (@usuario) ou responde a uma mensagem dele?"""
+    resposta = mensagem.reply_to_message
+    if resposta and resposta.from_user and resposta.from_user.id == bot.id:
+        return True
+    mencao = f"@{bot.username}".casefold()
+    return any(texto.casefold() == mencao for texto in mensagem.parse_entities(["mention"]).values())
+
+async def processar_texto(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Recebe um lançamento digitado (sem download nem transcrição)
+
+    Em grupo, só mensagens com cara de lançamento entram e o exemplo de uso
+    só é respondido a quem menciona o bot ou responde a ele
+    """
+    mensagem = update.message
+    direta = mensagem.chat.type == "private" or chamou_bot(mensagem, context.bot)
+    if menciona_valor(mensagem.text) and (direta or parece_lancamento(mensagem.text)):
+        await enfileirar(update, context, pipeline_texto)
+    elif direta:
+        await mensagem.reply_text(
+            "💬 Não encontrei um valor nessa mensagem.\n"
+            "Exemplo: _cimento 200 reais obra do João_",
+            parse_mode='Markdown'
+        )
+
+def link_planilha(url):
+    """Link da planilha na confirmação (obra nova ainda sem planilha: aviso)"""
+    if url:
+        return f"🔗 [Abrir Planilha]({url})"
+    return "🔄 A planilha desta obra será criada em instantes."
+
+def registrar_info(info, chave, data=None):
+    """Grava os dados extraídos no livro; retorna o resultado (url, lançamento, mensagem)
+
+    Livro local: confirmação imediata; a mesma chave nunca gera dois lançamentos
+    """
+    # "obra do João", "João"... → a mesma obra (nova só se nenhuma for parecida)
+    info['obra'] = resolvedor_obras.resolver(info.get('obra') or "Obra Padrão")
+    data = data or datetime.now().strftime("%d/%m/%Y")
+    
+    if info['tipo'] == 'gasto':
+        url, lancamento = adicionar_gasto(
+            info['obra'],
+            data,
+            info.get('descricao', ''),
+            info.get('categoria', 'Outros'),
+            info['valor'],
+            info.get('observacoes', ''),
+            chave
+        )
+    
+        mensagem = f"""
 ✅ *Gasto Registrado!*
 
 📊 *Obra:* {info['obra']}
 📦 *Item:* {info.get('descricao', '')}
 🏷️ *Categoria:* {info.get('categoria', '')}
 💰 *Valor:* R$ {info['valor']}
-📅 *Data:* {data_hoje}
+📅 *Data:* {data}
+✔️ *Lançamento:* #{lancamento}
 
-🔗 [Abrir Planilha]({url})
+{link_planilha(url)}
 """
-        else:  # pagamento
-            url = adicionar_pagamento(
-                gc,
-                info['obra'],
-                data_hoje,
-                info.get('funcionario', ''),
-                info.get('funcao', 'Outros'),
-                f"R$ {info['valor']}",
-                info.get('observacoes', '')
-            )
-            
-            mensagem = f"""
+    else:  # pagamento
+        url, lancamento = adicionar_pagamento(
+            info['obra'],
+            data,
+            info.get('funcionario', ''),
+            info.get('funcao', 'Outros'),
+            info['valor'],
+            info.get('observacoes', ''),
+            chave
+        )
+    
+        mensagem = f"""
 ✅ *Pagamento Registrado!*
 
 📊 *Obra:* {info['obra']}
 👷 *Funcionário:* {info.get('funcionario', '')}
 🔧 *Função:* {info.get('funcao', '')}
 💰 *Valor:* R$ {info['valor']}
-📅 *Data:* {data_hoje}
+📅 *Data:* {data}
+✔️ *Lançamento:* #{lancamento}
 
-🔗 [Abrir Planilha]({url})
+{link_planilha(url)}
 """
+    
+    return {"url": url, "lancamento": lancamento, "mensagem": mensagem, "obra": info['obra']}
+
+def responder_duplicado(progresso, anterior, aviso="♻️ Este áudio já foi registrado"):
+    """Responde a um áudio (ou mensagem) que já foi registrado (sem gravar de novo)"""
+    progresso.concluir(
+        f"{aviso}, nenhum lançamento novo foi gravado.\n" + anterior['resultado']['mensagem'],
+        parse_mode='Markdown'
+    )
+
+async def pipeline_audio(update: Update, context: ContextTypes.DEFAULT_TYPE, progresso):
+    """Processa áudio enviado (download → transcrição → extração → planilha)"""
+    try:
+        voice = update.message.voice
+        
+        # Áudio já registrado (reenviado ou reentregue pelo Telegram)
+        anterior = cache.buscar(file_unique_id=voice.file_unique_id)
+        if anterior and anterior['resultado']:
+            responder_duplicado(progresso, anterior)
+            return
         
-        await update.message.reply_text(mensagem, parse_mode='Markdown')
+        progresso.atualizar("🎤 Recebendo áudio...")
+        
+        # Baixar áudio
+        async with fila.etapa('download'):
+            audio = await baixar_audio(voice)
+        
+        # Transcrever (buffer descartado ao sair do bloco, mesmo com erro)
+        with audio:
+            hash_conteudo = hash_audio(audio)
+            anterior = cache.buscar(hash_conteudo=hash_conteudo)
+            if anterior and anterior['resultado']:
+                responder_duplicado(progresso, anterior)
+                return
+            
+            if anterior and anterior['transcricao']:
+                texto = anterior['transcricao']
+            else:
+                progresso.atualizar("📝 Transcrevendo...")
+                async with fila.etapa('transcricao'):
+                    texto = await transcrever_audio(audio)
+                cache.salvar(hash_conteudo, voice.file_unique_id, transcricao=texto)
+        
+        transcricao = f"✅ Transcrição: _{texto}_\n"
+        
+        # Extrair informações
+        if anterior and anterior['dados']:
+            info = anterior['dados']
+        else:
+            progresso.atualizar(f"{transcricao}\n🤖 Processando informações...", parse_mode='Markdown')
+            info = await extrair_informacoes(texto)
+            cache.salvar(hash_conteudo, voice.file_unique_id, dados=info)
+        
+        resultado = registrar_info(info, chave_idempotencia(hash_conteudo))
+        cache.salvar(hash_conteudo, voice.file_unique_id, resultado=resultado)
+        
+        # Edição final em segundo plano: o próximo áudio do chat não espera o Telegram
+        progresso.concluir(transcricao + resultado['mensagem'], parse_mode='Markdown')
+        
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        progresso.concluir(f"❌ Erro ao processar: {str(e)}")
+
+async def pipeline_texto(update: Update, context: ContextTypes.DEFAULT_TYPE, progresso):
+    """Processa lançamento digitado (extração → planilha, sem Whisper)"""
+    try:
+        mensagem = update.message
+        texto = mensagem.text.strip()
+        
+        # Mensagem já registrada (reentregue pelo Telegram)
+        hash_origem = hash_mensagem(mensagem.chat_id, mensagem.message_id)
+        anterior = cache.buscar(hash_conteudo=hash_origem)
+        if anterior and anterior['resultado']:
+            responder_duplicado(progresso, anterior, "♻️ Esta mensagem já foi registrada")
+            return
+        
+        # Mesmo texto no mesmo dia: reaproveita a extração (o lançamento é novo)
+        hash_conteudo = hash_texto(texto)
+        anterior = cache.buscar(hash_conteudo=hash_conteudo)
+        if anterior and anterior['dados']:
+            info = anterior['dados']
+        else:
+            info = await extrair_informacoes(texto)
+            cache.salvar(hash_conteudo, dados=info)
+        
+        resultado = registrar_info(info, chave_idempotencia(hash_origem))
+        cache.salvar(hash_origem, resultado=resultado)
+        
+        progresso.concluir(resultado['mensagem'], parse_mode='Markdown')
         
     except Exception as e:
         print(f"❌ Erro: {e}")
-        await update.message.reply_text(f"❌ Erro ao processar: {str(e)}")
+        progresso.concluir(f"❌ Erro ao processar: {str(e)}")
+
+# ========== IMPORTAÇÃO ==========
+
+async def importar(caminho, ao_progresso=None, concorrencia=IMPORTACAO_CONCORRENCIA):
+    """Importa uma pasta ou zip de áudios, ou um .txt com um lançamento por linha"""
+    async def transcrever(audio):
+        async with fila.etapa('transcricao'):
+            return await transcrever_audio(audio)
+    
+    def gravar(info, chave, data, texto):
+        return registrar_info(info, chave, data)
+    
+    itens = await em_thread(listar_itens, caminho)
+    importador = Importador(transcrever, extrair_informacoes, gravar, cache=cache, concorrencia=concorrencia)
+    return await importador.executar(itens, ao_progresso)
 
 # ========== MAIN ==========
 
+# Contadores dos componentes no /metricas
+metricas.coletor(coletor_componentes(
+    fila=fila, cache=cache, limitador=limitador_google, livro=livro, sincronizador=sincronizador,
+    agrupador=agrupador_extracoes, resolvedor=resolvedor_obras
+))
+
+def estado_saude():
+    """Informações extras do /saude (modo webhook)"""
+    estado = {
+        "audios_na_fila": fila.pendentes,
+        "livro": livro.estado_sincronizacao(),
+    }
+    if roteador is not None:
+        estado["updates_por_processo"] = roteador.enviados
+    return estado
+
+async def esvaziar_fila(app):
+    """Termina os áudios já aceitos (e entrega as respostas) antes de desligar"""
+    await fila.encerrar()
+    # Extrações ainda no lote (ou de áudios cortados pelo tempo máximo) antes de fechar a OpenAI
+    await agrupador_extracoes.descarregar_tudo()
+    await aguardar_progressos()
+
+async def iniciar(app):
+    """Inicia a sincronização do livro com as planilhas"""
+    sincronizador.iniciar()
+
+async def encerrar_processos(app):
+    """Processo de entrada: espera os processos de trabalho terminarem"""
+    await em_thread(roteador.encerrar)
+
+async def fechar_openai(app):
+    """Fecha as conexões com a OpenAI"""
+    await client.close()
+
+async def encerrar(app):
+    """Copia os lançamentos ainda pendentes para as planilhas antes de desligar"""
+    await em_thread(sincronizador.parar)
+    await client.close()
+
+# ========== PROCESSOS ==========
+
+# Processo de entrada com BOT_PROCESSOS > 1 (repassa updates por chat_id)
+roteador = None
+
+def criar_aplicacao(papel="unico"):
+    """Monta a aplicação: "unico" (faz tudo), "entrada" (só repassa) ou "trabalho" (só processa)"""
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .base_url(f"{TELEGRAM_API_URL}/bot")
+        .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+        .request(RequisicaoTelegramMedida())
+        .concurrent_updates(True)
+    )
+    
+    if papel == "trabalho":
+        # Recebe os updates do processo de entrada; a sincronização fica na entrada
+        builder = builder.updater(None).post_stop(esvaziar_fila).post_shutdown(fechar_openai)
+    elif papel == "entrada":
+        builder = builder.post_init(iniciar).post_stop(encerrar_processos).post_shutdown(encerrar)
+    else:
+        builder = builder.post_init(iniciar).post_stop(esvaziar_fila).post_shutdown(encerrar)
+    
+    app = builder.build()
+    
+    # Handlers
+    if papel == "entrada":
+        app.add_handler(TypeHandler(Update, roteador.rotear))
+    else:
+        app.add_handler(CommandHandler("start", start))
+        app.add_handler(CommandHandler("resumo", resumo))
+        app.add_handler(CommandHandler("status", status))
+        comando_importar = criar_comando_importar(importar)
+        app.add_handler(CommandHandler("importar", comando_importar))
+        app.add_handler(MessageHandler(
+            filters.Document.ALL & filters.CaptionRegex(r'^/importar\b'), comando_importar
+        ))
+        app.add_handler(MessageHandler(filters.VOICE, processar_audio))
+        app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, processar_texto))
+    
+    return app
+
+def processo_trabalho(indice, fila_updates):
+    """Corpo de cada processo de trabalho (iniciado pelo processo de entrada)"""
+    executar_trabalho(criar_aplicacao("trabalho"), indice, fila_updates)
+
 def main():
     """Função principal"""
+    global roteador
+    
     print("=" * 70)
     print("🤖 BOT DO TELEGRAM RAILWAY INICIADO!")
     print("=" * 70)
@@ -341,16 +653,19 @@ def main():
     print("🔐 Autenticação: Service Account")
     print("=" * 70)
     
-    # Criar aplicação
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
-    
-    # Handlers
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(MessageHandler(filters.VOICE, processar_audio))
+    # Criar aplicação (com BOT_PROCESSOS > 1, os chats são repartidos entre processos)
+    if BOT_PROCESSOS > 1:
+        # Só a entrada chama o Google (sincronizador): ela fica com a cota inteira
+        roteador = RoteadorUpdates(processo_trabalho, BOT_PROCESSOS)
+        roteador.iniciar()
+        print(f"⚙️ {BOT_PROCESSOS} processos de trabalho (repartidos por chat)")
+        app = criar_aplicacao("entrada")
+    else:
+        app = criar_aplicacao()
     
-    # Iniciar
+    # Iniciar (MODO_BOT=webhook usa o servidor embutido; o padrão é polling)
     print("🚀 Bot pronto para receber mensagens!")
-    app.run_polling(drop_pending_updates=True)
+    executar(app, estado=estado_saude, drop_pending_updates=True)
 
 if __name__ == "__main__":
     main()
@@ -10,11 +10,28 @@ Data: 14/10/2025
 import os
 import json
 import re
-import tempfile
-import requests
 from datetime import datetime
-import gspread
-from google.oauth2.service_account import Credentials
+from cliente_google import GerenciadorClienteGoogle
+from limite_google import LimitadorGoogle
+from registro_obras import RegistroObras
+from modelo_planilha import MODELO_V4, ids_abas, provisionar_planilha
+from livro_lancamentos import LivroLancamentos, ABAS
+from totais_obras import mensagem_resumo
+from catalogo_obras import CatalogoObras
+from resolvedor_obras import ResolvedorObras, titulo_obra
+from servidor_webhook import executar
+from sincronizacao_planilhas import SincronizadorPlanilhas
+from execucao import em_thread
+from fila_processamento import FilaProcessamento, FilaCheia
+from progresso_mensagem import ProgressoMensagem, aguardar_progressos
+from importacao import IMPORTACAO_CONCORRENCIA, Importador, criar_comando_importar, listar_itens
+from transporte_http import TransporteHTTP
+from audio_memoria import baixar_audio
+from preprocessamento_audio import transcrever_em_trechos
+from cache_processamento import CacheProcessamento, hash_audio, hash_mensagem, hash_texto, chave_idempotencia
+from extrator_regras import EXTRATOR_LIMIAR, extrair_por_regras, menciona_valor, parece_lancamento
+from extracao_agrupada import AgrupadorExtracoes, interpretar_lote, textos_numerados
+from metricas import RequisicaoTelegramMedida, coletor_componentes, mensagem_etapas, metricas
 
 # ============================================================
 # CONFIGURAÇÃO - Variáveis de Ambiente
@@ -22,6 +39,10 @@ from google.oauth2.service_account import Credentials
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 GOOGLE_CREDENTIALS_JSON = os.environ.get('GOOGLE_CREDENTIALS_JSON')
+
+# Endereços das APIs (trocar só para um servidor local da Bot API ou testes)
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1').rstrip('/')
 # ============================================================
 
 # Configurar Google Sheets
@@ -30,64 +51,77 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Limitador das cotas de leitura/escrita do Google
+limitador_google = LimitadorGoogle()
+
+# Cliente Google compartilhado (autoriza uma vez por processo)
+gerenciador_google = GerenciadorClienteGoogle(
+    GOOGLE_CREDENTIALS_JSON, SCOPES, limitador=limitador_google
+)
+
+# Registro obra → planilha (evita busca por título no Drive)
+registro_obras = RegistroObras()
+
+# Fila de processamento (ordem por chat e limite por etapa)
+fila = FilaProcessamento()
+
+# Cache de transcrições/extrações (áudio repetido não é processado de novo)
+cache = CacheProcessamento()
+
+# Transporte HTTP para a API da OpenAI (pool, timeouts e novas tentativas)
+transporte_openai = TransporteHTTP()
+
+# Livro local de lançamentos (registro oficial; a planilha é uma cópia)
+livro = LivroLancamentos()
+
+# Lista de obras do Drive em cache (consulta filtrada, renovada pela validade)
+catalogo_obras = CatalogoObras()
+
+def obras_conhecidas():
+    """Obras do livro e do registro de planilhas (base do resolvedor de nomes)"""
+    titulos = registro_obras.titulos()
+    return livro.obras() + [t[len("Obra: "):] for t in titulos if t.startswith("Obra: ")]
+
+# Nome falado → obra existente mais parecida (evita planilhas duplicadas)
+resolvedor_obras = ResolvedorObras(obras_conhecidas, formatar=titulo_obra)
+
 def get_google_client():
-    """Conecta ao Google Sheets"""
-    if not GOOGLE_CREDENTIALS_JSON:
-        raise Exception("GOOGLE_CREDENTIALS_JSON não configurado!")
-    
-    creds_dict = json.loads(GOOGLE_CREDENTIALS_JSON)
-    creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-    return gspread.authorize(creds)
+    """Conecta ao Google Sheets (cliente reaproveitado entre mensagens)"""
+    return gerenciador_google.obter()
 
 def normalizar_nome_obra(nome):
     """Normaliza o nome da obra para nome de planilha"""
-    nome = nome.lower()
-    nome = re.sub(r'[àáâãäå]', 'a', nome)
-    nome = re.sub(r'[èéêë]', 'e', nome)
-    nome = re.sub(r'[ìíîï]', 'i', nome)
-    nome = re.sub(r'[òóôõö]', 'o', nome)
-    nome = re.sub(r'[ùúûü]', 'u', nome)
-    nome = re.sub(r'[ç]', 'c', nome)
-    nome = re.sub(r'[^a-z0-9\s]', '', nome)
-    nome = re.sub(r'\s+', ' ', nome.strip())
-    return nome.title()
-
-def transcrever_audio(audio_path):
-    """Transcreve áudio usando Whisper via API HTTP"""
-    url = "https://api.openai.com/v1/audio/transcriptions"
+    return titulo_obra(nome)
+
+async def transcrever_arquivo(audio):
+    """Transcreve áudio (arquivo em memória) usando Whisper via API HTTP"""
+    url = f"{OPENAI_BASE_URL}/audio/transcriptions"
     
     headers = {
         "Authorization": f"Bearer {OPENAI_API_KEY}"
     }
     
-    with open(audio_path, 'rb') as audio_file:
-        files = {
-            'file': audio_file,
-            'model': (None, 'whisper-1'),
-            'language': (None, 'pt')
-        }
-        
-        response = requests.post(url, headers=headers, files=files)
-        
-        if response.status_code == 200:
-            return response.json()['text']
-        else:
-            raise Exception(f"Erro na transcrição: {response.text}")
-
-def extrair_informacoes(texto_transcrito):
-    """Extrai informações do texto transcrito usando LLM via API HTTP"""
-    url = "https://api.openai.com/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json"
+    # O buffer é enviado direto na requisição (sem gravar em disco)
+    files = {
+        'file': ('audio.ogg', audio, 'audio/ogg'),
+        'model': (None, 'whisper-1'),
+        'language': (None, 'pt')
     }
     
-    prompt = f"""Analise o seguinte texto sobre um gasto de construção e extraia as informações em formato JSON.
+    response = await transporte_openai.post(url, headers=headers, files=files)
+    
+    if response.status_code == 200:
+        return response.json()['text']
+    else:
+        raise Exception(f"Erro na transcrição: {response.text}")
 
-Texto: "{texto_transcrito}"
+async def transcrever_audio(audio):
+    """Transcreve o áudio, pré-processado e em trechos paralelos se for longo"""
+    return await transcrever_em_trechos(audio, transcrever_arquivo)
 
-IMPORTANTE: 
+def instrucoes_extracao():
+    """Regras e formato de resposta da extração (compartilhado pelo prompt individual e pelo lote)"""
+    return f"""IMPORTANTE: 
 1. Identifique o NOME DA OBRA (ex: "obra do João", "obra da rua 10", "obra do centro")
 2. Identifique se é PAGAMENTO DE FUNCIONÁRIO ou GASTO GERAL
 
@@ -121,9 +155,16 @@ Se for gasto geral:
 Se não conseguir identificar a obra, use "obra": "geral"
 
 Data de hoje: {datetime.now().strftime('%d/%m/%Y')}
-
-Responda APENAS com um objeto JSON válido, sem texto adicional.
 """
+
+async def chamar_llm(prompt):
+    """Envia o prompt ao LLM e retorna o JSON da resposta"""
+    url = f"{OPENAI_BASE_URL}/chat/completions"
+    
+    headers = {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
     
     data = {
         "model": "gpt-4.1-mini",
@@ -134,7 +175,8 @@ Responda APENAS com um objeto JSON válido, sem texto adicional.
         "temperature": 0.3
     }
     
-    response = requests.post(url, headers=headers, json=data)
+    async with fila.etapa('extracao'):
+        response = await transporte_openai.post(url, headers=headers, json=data)
     
     if response.status_code == 200:
         resposta = response.json()['choices'][0]['message']['content'].strip()
@@ -147,168 +189,171 @@ Responda APENAS com um objeto JSON válido, sem texto adicional.
     else:
         raise Exception(f"Erro na extração: {response.text}")
 
+async def extrair_com_llm(texto_transcrito):
+    """Extrai as informações de um único texto usando LLM via API HTTP"""
+    prompt = f"""Analise o seguinte texto sobre um gasto de construção e extraia as informações em formato JSON.
+
+Texto: "{texto_transcrito}"
+
+{instrucoes_extracao()}
+Responda APENAS com um objeto JSON válido, sem texto adicional.
+"""
+    return await chamar_llm(prompt)
+
+async def extrair_lote_com_llm(textos):
+    """Extrai vários textos numa única chamada; retorna {id: dados}"""
+    prompt = f"""Analise cada um dos textos abaixo sobre gastos de construção e extraia as informações de cada um em formato JSON.
+
+Textos:
+{textos_numerados(textos)}
+
+Para CADA texto, aplique as regras:
+
+{instrucoes_extracao()}
+Responda APENAS com um objeto JSON válido, sem texto adicional, no formato:
+{{"resultados": [{{"id": "id do texto", ...campos acima...}}]}}
+com exatamente um item por texto.
+"""
+    return interpretar_lote(await chamar_llm(prompt), textos)
+
+# Transcrições pendentes extraídas juntas (uma chamada ao LLM por lote)
+agrupador_extracoes = AgrupadorExtracoes(extrair_lote_com_llm, extrair_com_llm)
+
+async def extrair_informacoes(texto_transcrito):
+    """Extrai informações do texto transcrito (regras locais e, se preciso, LLM em lote)"""
+    # Frases comuns resolvidas localmente, sem chamar o LLM
+    dados = extrair_por_regras(texto_transcrito, obra_padrao="geral")
+    if dados.pop('confianca') >= EXTRATOR_LIMIAR:
+        metricas.contar('bot_extracao_total', origem='regras')
+        return dados
+    
+    metricas.contar('bot_extracao_total', origem='llm')
+    return await agrupador_extracoes.extrair(texto_transcrito)
+
 def criar_planilha_obra(gc, nome_obra):
-    """Cria uma nova planilha no Google Sheets"""
-    nome_planilha = f"Obra: {nome_obra}"
-    
-    # Criar planilha
-    spreadsheet = gc.create(nome_planilha)
+    """Cria uma nova planilha no Google Sheets (modelo aplicado num único lote)"""
+    spreadsheet = provisionar_planilha(gc, nome_obra, MODELO_V4)
+    catalogo_obras.adicionar(f"Obra: {nome_obra}", spreadsheet.id)
     
     # Compartilhar com o usuário (tornar editável)
     # Nota: Você pode adicionar seu email aqui para ter acesso direto
     # spreadsheet.share('seu_email@gmail.com', perm_type='user', role='writer')
     
-    # Configurar abas
-    sheet = spreadsheet.sheet1
-    sheet.update_title("Gastos")
-    
-    # Aba Gastos - Cabeçalho
-    sheet.update('A1', f"GASTOS - OBRA: {nome_obra.upper()}")
-    sheet.format('A1', {
-        "textFormat": {"bold": True, "fontSize": 14},
-        "backgroundColor": {"red": 0.2, "green": 0.38, "blue": 0.57}
-    })
-    sheet.merge_cells('A1:E1')
-    
-    headers_gastos = [["Data", "Descrição do Item", "Categoria", "Valor (R$)", "Observações"]]
-    sheet.update('A2:E2', headers_gastos)
-    sheet.format('A2:E2', {
-        "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}},
-        "backgroundColor": {"red": 0.2, "green": 0.38, "blue": 0.57},
-        "horizontalAlignment": "CENTER"
-    })
-    
-    # Ajustar larguras
-    sheet.set_column_width(1, 100)   # A - Data
-    sheet.set_column_width(2, 300)   # B - Descrição
-    sheet.set_column_width(3, 150)   # C - Categoria
-    sheet.set_column_width(4, 120)   # D - Valor
-    sheet.set_column_width(5, 300)   # E - Observações
-    
-    # Aba Pagamentos
-    ws_pag = spreadsheet.add_worksheet("Pagamentos", 1000, 5)
-    ws_pag.update('A1', f"PAGAMENTOS - OBRA: {nome_obra.upper()}")
-    ws_pag.format('A1', {
-        "textFormat": {"bold": True, "fontSize": 14},
-        "backgroundColor": {"red": 0.2, "green": 0.38, "blue": 0.57}
-    })
-    ws_pag.merge_cells('A1:E1')
-    
-    headers_pag = [["Data", "Nome do Funcionário", "Função", "Valor (R$)", "Observações"]]
-    ws_pag.update('A2:E2', headers_pag)
-    ws_pag.format('A2:E2', {
-        "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}},
-        "backgroundColor": {"red": 0.2, "green": 0.38, "blue": 0.57},
-        "horizontalAlignment": "CENTER"
-    })
-    
-    ws_pag.set_column_width(1, 100)   # A - Data
-    ws_pag.set_column_width(2, 200)   # B - Nome
-    ws_pag.set_column_width(3, 150)   # C - Função
-    ws_pag.set_column_width(4, 120)   # D - Valor
-    ws_pag.set_column_width(5, 300)   # E - Observações
-    
-    # Aba Resumo
-    ws_resumo = spreadsheet.add_worksheet("Resumo", 100, 2)
-    ws_resumo.update('A1', f"RESUMO - OBRA: {nome_obra.upper()}")
-    ws_resumo.format('A1', {
-        "textFormat": {"bold": True, "fontSize": 14},
-        "backgroundColor": {"red": 0.2, "green": 0.38, "blue": 0.57}
-    })
-    ws_resumo.merge_cells('A1:B1')
-    
-    ws_resumo.update('A3', "Total Gastos:")
-    ws_resumo.update('B3', "=SOMA(Gastos!D:D)")
-    ws_resumo.format('B3', {
-        "textFormat": {"bold": True},
-        "numberFormat": {"type": "CURRENCY", "pattern": "R$ #,##0.00"}
-    })
-    
-    ws_resumo.update('A4', "Total Pagamentos:")
-    ws_resumo.update('B4', "=SOMA(Pagamentos!D:D)")
-    ws_resumo.format('B4', {
-        "textFormat": {"bold": True},
-        "numberFormat": {"type": "CURRENCY", "pattern": "R$ #,##0.00"}
-    })
-    
-    ws_resumo.update('A6', "TOTAL GERAL:")
-    ws_resumo.update('B6', "=B3+B4")
-    ws_resumo.format('A6:B6', {
-        "textFormat": {"bold": True},
-        "backgroundColor": {"red": 1, "green": 0.75, "blue": 0}
-    })
-    ws_resumo.format('B6', {
-        "numberFormat": {"type": "CURRENCY", "pattern": "R$ #,##0.00"}
-    })
-    
-    ws_resumo.set_column_width(1, 200)
-    ws_resumo.set_column_width(2, 150)
-    
     return spreadsheet
 
-def obter_planilha_obra(gc, nome_obra):
-    """Obtém a planilha da obra, criando se não existir"""
+def obter_aba_obra(gc, nome_obra, nome_aba):
+    """Obtém a aba da obra pelo id registrado, criando a planilha se não existir"""
     nome_planilha = f"Obra: {nome_obra}"
     
-    try:
-        # Tentar abrir planilha existente
-        spreadsheet = gc.open(nome_planilha)
-        return spreadsheet
-    except gspread.SpreadsheetNotFound:
-        # Criar nova planilha
-        return criar_planilha_obra(gc, nome_obra)
-
-def adicionar_na_planilha(gc, dados):
-    """Adiciona os dados na planilha Google Sheets"""
-    nome_obra = normalizar_nome_obra(dados.get('obra', 'geral'))
-    spreadsheet = obter_planilha_obra(gc, nome_obra)
+    return registro_obras.obter_aba(
+        gc, nome_planilha, nome_aba, lambda: criar_planilha_obra(gc, nome_obra),
+        abas_novas=ids_abas(MODELO_V4)
+    )
+
+def adicionar_na_planilha(dados, chave=''):
+    """Grava os dados no livro local (a planilha é atualizada em segundo plano)"""
+    nome_obra = resolvedor_obras.resolver(dados.get('obra', 'geral'))
     
     tipo = dados.get('tipo', 'gasto')
+    data = dados.get('data', datetime.now().strftime('%d/%m/%Y'))
+    valor = float(dados.get('valor', 0))
     
     if tipo == 'pagamento':
-        sheet = spreadsheet.worksheet("Pagamentos")
-        nova_linha = [
-            dados.get('data', datetime.now().strftime('%d/%m/%Y')),
-            dados.get('nome_funcionario', ''),
-            dados.get('funcao', ''),
-            float(dados.get('valor', 0)),
-            dados.get('observacoes', '')
-        ]
+        campos = {
+            'funcionario': dados.get('nome_funcionario', ''),
+            'funcao': dados.get('funcao', ''),
+        }
+        nova_linha = [data, campos['funcionario'], campos['funcao'], valor, dados.get('observacoes', '')]
     else:
-        sheet = spreadsheet.worksheet("Gastos")
-        nova_linha = [
-            dados.get('data', datetime.now().strftime('%d/%m/%Y')),
-            dados.get('descricao', ''),
-            dados.get('categoria', 'Outros'),
-            float(dados.get('valor', 0)),
-            dados.get('observacoes', '')
-        ]
-    
-    # Adicionar linha
-    sheet.append_row(nova_linha)
-    
-    # Formatar valor como moeda
-    ultima_linha = len(sheet.get_all_values())
-    sheet.format(f'D{ultima_linha}', {
-        "numberFormat": {"type": "CURRENCY", "pattern": "R$ #,##0.00"}
-    })
-    
-    return ultima_linha, sheet.title, nome_obra, spreadsheet.url
-
-def listar_obras(gc):
-    """Lista todas as obras cadastradas"""
-    obras = []
-    spreadsheets = gc.openall()
+        tipo = 'gasto'
+        campos = {
+            'descricao': dados.get('descricao', ''),
+            'categoria': dados.get('categoria', 'Outros'),
+        }
+        nova_linha = [data, campos['descricao'], campos['categoria'], valor, dados.get('observacoes', '')]
     
-    for sheet in spreadsheets:
-        if sheet.title.startswith("Obra: "):
-            nome = sheet.title.replace("Obra: ", "")
-            obras.append({"nome": nome, "url": sheet.url})
+    # Chave repetida (tentativa anterior) devolve o lançamento já gravado
+    with metricas.medir('bot_etapa_segundos', etapa='livro'):
+        id_lancamento, _ = livro.registrar(
+            nome_obra, tipo, nova_linha, chave or None,
+            data=data, valor=valor, observacoes=dados.get('observacoes', ''), **campos
+        )
+    sincronizador.acordar()
     
+    return id_lancamento, ABAS[tipo], nome_obra, registro_obras.url(f"Obra: {nome_obra}")
+
+def listar_planilhas_obras(gc):
+    """[(obra, spreadsheet_id)] de todas as planilhas de obra no Drive"""
+    return [(obra['nome'], obra['id']) for obra in catalogo_obras.listar(gc)]
+
+# Copia os lançamentos do livro para as abas Gastos/Pagamentos em segundo plano
+sincronizador = SincronizadorPlanilhas(livro, get_google_client, obter_aba_obra, listar_planilhas_obras)
+
+# Contadores dos componentes no /metricas
+metricas.coletor(coletor_componentes(
+    fila=fila, cache=cache, limitador=limitador_google, livro=livro, sincronizador=sincronizador,
+    agrupador=agrupador_extracoes, resolvedor=resolvedor_obras, transporte=transporte_openai
+))
+
+def listar_obras(gc):
+    """Lista todas as obras cadastradas (cache + consulta filtrada ao Drive)"""
+    return catalogo_obras.listar(gc)
+
+async def listar_obras_async():
+    """Lista de obras direto da memória; vai ao Drive só com o cache vencido"""
+    obras = catalogo_obras.em_cache()
+    if obras is None:
+        gc = await em_thread(get_google_client)
+        obras = await em_thread(listar_obras, gc)
     return obras
 
-def processar_audio_telegram(file_path):
-    """Processa áudio do Telegram"""
+def estado_saude():
+    """Informações extras do /saude (modo webhook)"""
+    return {
+        "audios_na_fila": fila.pendentes,
+        "livro": livro.estado_sincronizacao(),
+    }
+
+def rodape_registro(resultado):
+    """Número do lançamento e link da planilha para a confirmação"""
+    if 'lancamento' in resultado:
+        rodape = f"✔️ Lançamento #{resultado['lancamento']} registrado!\n"
+    else:
+        # Resultado em cache de antes do livro local
+        rodape = f"✔️ Adicionado na linha {resultado['linha']}!\n"
+    
+    if resultado.get('url'):
+        return rodape + f"\n🔗 Abrir planilha: {resultado['url']}"
+    return rodape + "\n🔄 A planilha da obra será criada em instantes (/obras)."
+
+def registrar_dados(dados, chave, data=None, texto=''):
+    """Grava no livro local e monta o resultado da confirmação (guardado no cache)"""
+    if data:
+        dados['data'] = data
+    lancamento, aba, obra, url = adicionar_na_planilha(dados, chave)
+    
+    return {
+        'sucesso': True,
+        'transcricao': texto,
+        'dados': dados,
+        'lancamento': lancamento,
+        'aba': aba,
+        'obra': obra,
+        'url': url
+    }
+
+async def importar(caminho, ao_progresso=None, concorrencia=IMPORTACAO_CONCORRENCIA):
+    """Importa uma pasta ou zip de áudios, ou um .txt com um lançamento por linha"""
+    async def transcrever(audio):
+        async with fila.etapa('transcricao'):
+            return await transcrever_audio(audio)
+    
+    itens = await em_thread(listar_itens, caminho)
+    importador = Importador(transcrever, extrair_informacoes, registrar_dados, cache=cache, concorrencia=concorrencia)
+    return await importador.executar(itens, ao_progresso)
+
+async def processar_audio_telegram(audio, file_unique_id=None):
+    """Processa áudio do Telegram (reaproveita o cache se o áudio já foi visto)"""
     try:
         if not OPENAI_API_KEY:
             return {
@@ -322,38 +367,80 @@ def processar_audio_telegram(file_path):
                 'erro': 'Credenciais do Google não configuradas.'
             }
         
-        gc = get_google_client()
-        texto = transcrever_audio(file_path)
-        dados = extrair_informacoes(texto)
-        linha, aba, obra, url = adicionar_na_planilha(gc, dados)
+        hash_conteudo = hash_audio(audio)
+        anterior = cache.buscar(hash_conteudo=hash_conteudo)
+        if anterior and anterior['resultado']:
+            return dict(anterior['resultado'], duplicado=True)
+        
+        if anterior and anterior['transcricao']:
+            texto = anterior['transcricao']
+        else:
+            async with fila.etapa('transcricao'):
+                texto = await transcrever_audio(audio)
+            cache.salvar(hash_conteudo, file_unique_id, transcricao=texto)
+        
+        if anterior and anterior['dados']:
+            dados = anterior['dados']
+        else:
+            dados = await extrair_informacoes(texto)
+            cache.salvar(hash_conteudo, file_unique_id, dados=dados)
+        
+        # Livro local: confirmação imediata; a mesma chave nunca gera dois lançamentos
+        resultado = registrar_dados(dados, chave_idempotencia(hash_conteudo), texto=texto)
+        cache.salvar(hash_conteudo, file_unique_id, resultado=resultado)
         
+        return resultado
+    except Exception as e:
         return {
-            'sucesso': True,
-            'transcricao': texto,
-            'dados': dados,
-            'linha': linha,
-            'aba': aba,
-            'obra': obra,
-            'url': url
+            'sucesso': False,
+            'erro': str(e)
         }
+
+async def processar_texto_telegram(texto, chat_id, message_id):
+    """Processa um lançamento digitado (sem Whisper), com o mesmo cache dos áudios"""
+    try:
+        if not GOOGLE_CREDENTIALS_JSON:
+            return {
+                'sucesso': False,
+                'erro': 'Credenciais do Google não configuradas.'
+            }
+        
+        # Mensagem já registrada (reentregue pelo Telegram)
+        hash_origem = hash_mensagem(chat_id, message_id)
+        anterior = cache.buscar(hash_conteudo=hash_origem)
+        if anterior and anterior['resultado']:
+            return dict(anterior['resultado'], duplicado=True)
+        
+        # Mesmo texto no mesmo dia: reaproveita a extração (o lançamento é novo)
+        hash_conteudo = hash_texto(texto)
+        anterior = cache.buscar(hash_conteudo=hash_conteudo)
+        if anterior and anterior['dados']:
+            dados = anterior['dados']
+        else:
+            dados = await extrair_informacoes(texto)
+            cache.salvar(hash_conteudo, dados=dados)
+        
+        resultado = registrar_dados(dados, chave_idempotencia(hash_origem), texto=texto)
+        cache.salvar(hash_origem, resultado=resultado)
+        
+        return resultado
     except Exception as e:
         return {
             'sucesso': False,
             'erro': str(e)
         }
 
-def main():
-    """Função principal do bot"""
-    try:
-        import telegram
-        from telegram.ext import Application, MessageHandler, CommandHandler, filters
-    except ImportError:
-        print("❌ Biblioteca python-telegram-bot não encontrada!")
-        return
-    
-    if not TELEGRAM_BOT_TOKEN:
-        print("❌ ERRO: TELEGRAM_BOT_TOKEN não configurado!")
-        return
+def chamou_bot(mensagem, bot):
+    """A mensagem menciona o bot (@usuario) ou responde a uma mensagem dele?"""
+    resposta = mensagem.reply_to_message
+    if resposta and resposta.from_user and resposta.from_user.id == bot.id:
+        return True
+    mencao = f"@{bot.username}".casefold()
+    return any(texto.casefold() == mencao for texto in mensagem.parse_entities(["mention"]).values())
+
+def criar_aplicacao():
+    """Monta a aplicação do Telegram com os handlers (sem iniciar)"""
+    from telegram.ext import Application, MessageHandler, CommandHandler, filters
     
     async def start(update, context):
         """Comando /start"""
@@ -365,7 +452,7 @@ def main():
             "• Acesse de qualquer lugar\n"
             "• Sem precisar deixar PC ligado\n\n"
             "🎤 *Como usar:*\n"
-            "Envie um áudio mencionando:\n"
+            "Envie um áudio (ou digite uma mensagem) mencionando:\n"
             "• Nome da obra\n"
             "• O que comprou ou pagou\n"
             "• Valor\n\n"
@@ -373,6 +460,7 @@ def main():
             "\"Comprei cimento por 200 reais para a obra do João\"\n"
             "\"Paguei o pedreiro na obra da rua 10, 350 reais\"\n\n"
             "Use /obras para ver suas planilhas\n"
+            "Use /resumo <obra> para ver os totais\n"
             "Use /ajuda para mais informações",
             parse_mode='Markdown'
         )
@@ -381,7 +469,7 @@ def main():
         """Comando /ajuda"""
         await update.message.reply_text(
             "📚 *Como usar o bot v4.0:*\n\n"
-            "1️⃣ Grave um áudio de voz\n"
+            "1️⃣ Grave um áudio de voz (ou digite)\n"
             "2️⃣ Mencione o nome da obra\n"
             "3️⃣ Descreva o gasto ou pagamento\n"
             "4️⃣ Envie para mim\n\n"
@@ -397,6 +485,8 @@ def main():
             "*Comandos:*\n"
             "/start - Iniciar bot\n"
             "/obras - Ver todas as obras\n"
+            "/resumo <obra> - Totais da obra\n"
+            "/importar - Na legenda de um .zip de áudios ou .txt, importa vários lançamentos\n"
             "/ajuda - Ver esta mensagem\n"
             "/status - Ver status do sistema",
             parse_mode='Markdown'
@@ -405,8 +495,7 @@ def main():
     async def obras(update, context):
         """Comando /obras"""
         try:
-            gc = get_google_client()
-            lista_obras = listar_obras(gc)
+            lista_obras = await listar_obras_async()
             
             if lista_obras:
                 mensagem = f"🏗️ *Obras Cadastradas ({len(lista_obras)}):*\n\n"
@@ -420,90 +509,234 @@ def main():
         except Exception as e:
             await update.message.reply_text(f"❌ Erro ao listar obras: {str(e)}")
     
+    async def resumo(update, context):
+        """Comando /resumo <obra> (totais em memória, sem consultar o Google)"""
+        if not context.args:
+            await update.message.reply_text(
+                "Use: /resumo <obra>\nExemplo: /resumo joão"
+            )
+            return
+        
+        nome_obra = ' '.join(context.args)
+        nome_obra = resolvedor_obras.encontrar(nome_obra) or normalizar_nome_obra(nome_obra)
+        totais = livro.resumo(nome_obra)
+        if totais is None:
+            await update.message.reply_text(f"⚠️ Nenhum lançamento para a obra \"{nome_obra}\".")
+            return
+        
+        await update.message.reply_text(mensagem_resumo(totais), parse_mode='Markdown')
+    
     async def status(update, context):
         """Comando /status"""
         try:
-            gc = get_google_client()
-            lista_obras = listar_obras(gc)
+            lista_obras = await listar_obras_async()
             total_obras = len(lista_obras)
             
+            cota = limitador_google.contadores()
+            sinc = livro.estado_sincronizacao()
+            
             status_msg = (
                 f"✅ Sistema funcionando - v4.0 CLOUD\n\n"
                 f"🏗️ *Obras cadastradas:* {total_obras}\n"
                 f"☁️ *Hospedagem:* Nuvem (24h)\n"
-                f"📊 *Armazenamento:* Google Planilhas\n"
+                f"📊 *Armazenamento:* Livro local + Google Planilhas\n\n"
+                f"🚦 *Cota Google (último minuto):*\n"
+                f"• Leituras: {cota['leitura']['ultimo_minuto']}/{cota['leitura']['cota_minuto']}"
+                f" (aguardando: {cota['leitura']['aguardando']})\n"
+                f"• Escritas: {cota['escrita']['ultimo_minuto']}/{cota['escrita']['cota_minuto']}"
+                f" (aguardando: {cota['escrita']['aguardando']})\n"
+                f"• Erros 429: {cota['erros_429']}\n\n"
+                f"🤖 *Extração:* {agrupador_extracoes.itens_em_lote} em "
+                f"{agrupador_extracoes.lotes} lotes, {agrupador_extracoes.individuais} individuais\n"
+                f"🧭 *Nomes de obra:* {resolvedor_obras.resolvidas} reconhecidos, "
+                f"{resolvedor_obras.novas} obras novas\n\n"
+                f"📒 *Livro local:* {sinc['lancamentos']} lançamentos\n"
+                f"• Aguardando envio à planilha: {sinc['pendentes']}\n"
             )
+            if sinc['ultimo_erro']:
+                status_msg += f"• Último erro de sincronização: {sinc['ultimo_erro'][:200]}\n"
+            
+            etapas = mensagem_etapas()
+            if etapas:
+                status_msg += f"\n{etapas}\n"
             
             await update.message.reply_text(status_msg, parse_mode='Markdown')
         except Exception as e:
             await update.message.reply_text(f"❌ Erro: {str(e)}")
     
+    async def enfileirar(update, context, pipeline):
+        """Coloca a mensagem na fila (ordem por chat) com a mensagem de progresso"""
+        # Uma mensagem só de resposta, editada a cada etapa
+        progresso = ProgressoMensagem(update.message)
+        try:
+            posicao = fila.enviar(update.effective_chat.id, lambda: pipeline(update, context, progresso))
+        except FilaCheia:
+            await update.message.reply_text(
+                f"🚦 Bot ocupado ({fila.pendentes} áudios na fila). Tente novamente em alguns minutos."
+            )
+            return
+        
+        if posicao > 0:
+            progresso.atualizar(f"⏳ Bot ocupado, sua mensagem está na fila (posição {posicao}).")
+    
     async def processar_audio(update, context):
+        """Recebe o áudio e coloca na fila de processamento"""
+        await enfileirar(update, context, pipeline_audio)
+    
+    async def processar_texto(update, context):
+        """Recebe um lançamento digitado (sem download nem transcrição)
+
+        Em grupo, só mensagens com cara de lançamento entram e o exemplo de uso
+        só é respondido a quem menciona o bot ou responde a ele
+        """
+        mensagem = update.message
+        direta = mensagem.chat.type == "private" or chamou_bot(mensagem, context.bot)
+        if menciona_valor(mensagem.text) and (direta or parece_lancamento(mensagem.text)):
+            await enfileirar(update, context, pipeline_texto)
+        elif direta:
+            await mensagem.reply_text(
+                "💬 Não encontrei um valor nessa mensagem.\n"
+                "Exemplo: _cimento 200 reais obra do João_",
+                parse_mode='Markdown'
+            )
+    
+    async def pipeline_audio(update, context, progresso):
         """Processa áudio recebido"""
-        await update.message.reply_text("⏳ Processando seu áudio...")
+        progresso.atualizar("⏳ Processando seu áudio...")
         
         try:
-            audio = await update.message.voice.get_file()
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.ogg') as temp_file:
-                await audio.download_to_drive(temp_file.name)
-                temp_path = temp_file.name
+            voice = update.message.voice
             
-            resultado = processar_audio_telegram(temp_path)
-            os.unlink(temp_path)
-            
-            if resultado['sucesso']:
-                dados = resultado['dados']
-                tipo = dados.get('tipo', 'gasto')
-                obra = resultado['obra']
-                
-                if tipo == 'pagamento':
-                    mensagem = (
-                        "✅ *Pagamento registrado com sucesso!*\n\n"
-                        f"🏗️ *Obra:* {obra}\n"
-                        f"📝 *Transcrição:*\n{resultado['transcricao']}\n\n"
-                        f"📅 *Data:* {dados['data']}\n"
-                        f"👤 *Funcionário:* {dados['nome_funcionario']}\n"
-                        f"🔧 *Função:* {dados['funcao']}\n"
-                        f"💰 *Valor:* R$ {dados['valor']:.2f}\n"
-                        f"📌 *Observações:* {dados.get('observacoes', '-')}\n\n"
-                        f"📊 *Aba:* {resultado['aba']}\n"
-                        f"✔️ Adicionado na linha {resultado['linha']}!\n\n"
-                        f"🔗 Abrir planilha: {resultado['url']}"
-                    )
-                else:
-                    mensagem = (
-                        "✅ *Gasto registrado com sucesso!*\n\n"
-                        f"🏗️ *Obra:* {obra}\n"
-                        f"📝 *Transcrição:*\n{resultado['transcricao']}\n\n"
-                        f"📅 *Data:* {dados['data']}\n"
-                        f"🏷️ *Descrição:* {dados['descricao']}\n"
-                        f"📦 *Categoria:* {dados['categoria']}\n"
-                        f"💰 *Valor:* R$ {dados['valor']:.2f}\n"
-                        f"📌 *Observações:* {dados.get('observacoes', '-')}\n\n"
-                        f"📊 *Aba:* {resultado['aba']}\n"
-                        f"✔️ Adicionado na linha {resultado['linha']}!\n\n"
-                        f"🔗 Abrir planilha: {resultado['url']}"
-                    )
-                
-                await update.message.reply_text(mensagem, parse_mode='Markdown')
+            # Áudio já registrado (reenviado ou reentregue pelo Telegram)
+            anterior = cache.buscar(file_unique_id=voice.file_unique_id)
+            if anterior and anterior['resultado']:
+                resultado = dict(anterior['resultado'], duplicado=True)
             else:
-                await update.message.reply_text(
-                    f"❌ Erro ao processar: {resultado['erro']}"
-                )
+                async with fila.etapa('download'):
+                    audio = await baixar_audio(voice)
+                
+                with audio:
+                    resultado = await processar_audio_telegram(audio, voice.file_unique_id)
+            
+            concluir(progresso, resultado)
         
         except Exception as e:
-            await update.message.reply_text(
-                f"❌ Erro inesperado: {str(e)}"
-            )
+            progresso.concluir(f"❌ Erro inesperado: {str(e)}")
     
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    async def pipeline_texto(update, context, progresso):
+        """Processa lançamento digitado (extração → planilha, sem Whisper)"""
+        try:
+            mensagem = update.message
+            resultado = await processar_texto_telegram(
+                mensagem.text.strip(), mensagem.chat_id, mensagem.message_id
+            )
+            concluir(progresso, resultado, "Mensagem", "♻️ Esta mensagem já foi registrada")
+        
+        except Exception as e:
+            progresso.concluir(f"❌ Erro inesperado: {str(e)}")
+    
+    def concluir(progresso, resultado, rotulo="Transcrição", aviso="♻️ Este áudio já foi registrado"):
+        """Confirmação (ou erro) na mensagem de progresso"""
+        if resultado['sucesso']:
+            dados = resultado['dados']
+            tipo = dados.get('tipo', 'gasto')
+            obra = resultado['obra']
+            
+            if tipo == 'pagamento':
+                mensagem = (
+                    "✅ *Pagamento registrado com sucesso!*\n\n"
+                    f"🏗️ *Obra:* {obra}\n"
+                    f"📝 *{rotulo}:*\n{resultado['transcricao']}\n\n"
+                    f"📅 *Data:* {dados['data']}\n"
+                    f"👤 *Funcionário:* {dados['nome_funcionario']}\n"
+                    f"🔧 *Função:* {dados['funcao']}\n"
+                    f"💰 *Valor:* R$ {dados['valor']:.2f}\n"
+                    f"📌 *Observações:* {dados.get('observacoes', '-')}\n\n"
+                    f"📊 *Aba:* {resultado['aba']}\n"
+                    f"{rodape_registro(resultado)}"
+                )
+            else:
+                mensagem = (
+                    "✅ *Gasto registrado com sucesso!*\n\n"
+                    f"🏗️ *Obra:* {obra}\n"
+                    f"📝 *{rotulo}:*\n{resultado['transcricao']}\n\n"
+                    f"📅 *Data:* {dados['data']}\n"
+                    f"🏷️ *Descrição:* {dados['descricao']}\n"
+                    f"📦 *Categoria:* {dados['categoria']}\n"
+                    f"💰 *Valor:* R$ {dados['valor']:.2f}\n"
+                    f"📌 *Observações:* {dados.get('observacoes', '-')}\n\n"
+                    f"📊 *Aba:* {resultado['aba']}\n"
+                    f"{rodape_registro(resultado)}"
+                )
+            
+            if resultado.get('duplicado'):
+                mensagem = (
+                    f"{aviso}, nenhum lançamento novo foi gravado.\n\n"
+                    + mensagem
+                )
+            
+            # Edição final em segundo plano: a próxima mensagem do chat não espera o Telegram
+            progresso.concluir(mensagem, parse_mode='Markdown')
+        else:
+            progresso.concluir(f"❌ Erro ao processar: {resultado['erro']}")
+    
+    async def iniciar(app):
+        """Inicia a sincronização do livro com as planilhas"""
+        sincronizador.iniciar()
+    
+    async def esvaziar_fila(app):
+        """Termina os áudios já aceitos (e entrega as respostas) antes de desligar"""
+        await fila.encerrar()
+        # Extrações ainda no lote (ou de áudios cortados pelo tempo máximo) antes de fechar a OpenAI
+        await agrupador_extracoes.descarregar_tudo()
+        await aguardar_progressos()
+    
+    async def encerrar(app):
+        """Copia os lançamentos ainda pendentes para as planilhas antes de desligar"""
+        await em_thread(sincronizador.parar)
+        await transporte_openai.fechar()
+    
+    app = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .base_url(f"{TELEGRAM_API_URL}/bot")
+        .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+        .request(RequisicaoTelegramMedida())
+        .concurrent_updates(True)
+        .post_init(iniciar)
+        .post_stop(esvaziar_fila)
+        .post_shutdown(encerrar)
+        .build()
+    )
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("ajuda", ajuda))
     app.add_handler(CommandHandler("obras", obras))
+    app.add_handler(CommandHandler("resumo", resumo))
     app.add_handler(CommandHandler("status", status))
+    comando_importar = criar_comando_importar(importar)
+    app.add_handler(CommandHandler("importar", comando_importar))
+    app.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r'^/importar\b'), comando_importar
+    ))
     app.add_handler(MessageHandler(filters.VOICE, processar_audio))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, processar_texto))
+    
+    return app
+
+def main():
+    """Função principal do bot"""
+    try:
+        import telegram
+    except ImportError:
+        print("❌ Biblioteca python-telegram-bot não encontrada!")
+        return
+    
+    if not TELEGRAM_BOT_TOKEN:
+        print("❌ ERRO: TELEGRAM_BOT_TOKEN não configurado!")
+        return
+    
+    app = criar_aplicacao()
     
     print("=" * 60)
     print("🤖 BOT DO TELEGRAM V4.0 CLOUD INICIADO!")
@@ -516,7 +749,8 @@ def main():
     print("=" * 60)
     print("\n")
     
-    app.run_polling()
+    # MODO_BOT=webhook usa o servidor embutido; o padrão continua sendo polling
+    executar(app, estado=estado_saude)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de transcrições e extrações, endereçado pelo conteúdo do áudio
+Um áudio reenviado (ou reentregue pelo Telegram após reinício) reaproveita
+a transcrição, o JSON extraído e a linha já gravada, sem pagar Whisper/GPT
+de novo e sem duplicar a linha na planilha. Textos digitados usam duas
+chaves: a da mensagem (reentrega não duplica) e a do texto no dia (a
+mesma frase reaproveita a extração, mas vira outro lançamento)
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# ========== CONFIGURAÇÕES ==========
+CACHE_PROCESSAMENTO_DB = os.environ.get('CACHE_PROCESSAMENTO_DB', 'cache_processamento.db')
+CACHE_MAX_ITENS = int(os.environ.get('CACHE_MAX_ITENS', '5000'))
+CACHE_TTL_DIAS = float(os.environ.get('CACHE_TTL_DIAS', '30'))
+
+
+def hash_audio(buffer):
+    """SHA-256 do conteúdo do buffer (volta a posição para o início)"""
+    sha = hashlib.sha256()
+    buffer.seek(0)
+    for bloco in iter(lambda: buffer.read(64 * 1024), b''):
+        sha.update(bloco)
+    buffer.seek(0)
+    return sha.hexdigest()
+
+
+def hash_texto(texto, dia=None):
+    """Chave da extração de um texto digitado no dia ("ontem" depende da data)"""
+    dia = dia or time.strftime('%Y-%m-%d')
+    normalizado = ' '.join(texto.casefold().split())
+    return hashlib.sha256(f"texto:{dia}:{normalizado}".encode('utf-8')).hexdigest()
+
+
+def hash_mensagem(chat_id, message_id):
+    """Chave de uma mensagem do Telegram (a mesma mensagem reentregue não duplica)"""
+    return hashlib.sha256(f"mensagem:{chat_id}:{message_id}".encode('utf-8')).hexdigest()
+
+
+def chave_idempotencia(hash_conteudo):
+    """Chave curta gravada ao lado da linha na planilha (coluna ID)"""
+    return hash_conteudo[:16]
+
+
+class CacheProcessamento:
+    """Cache LRU com validade, persistido em SQLite"""
+
+    def __init__(self, caminho=CACHE_PROCESSAMENTO_DB,
+                 max_itens=CACHE_MAX_ITENS, ttl_dias=CACHE_TTL_DIAS):
+        self.max_itens = max_itens
+        self.ttl = ttl_dias * 86400
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        # hash -> último acesso ainda não gravado (vai junto com o próximo salvar)
+        self._acessos = {}
+        self._conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                hash TEXT PRIMARY KEY,
+                file_unique_id TEXT,
+                transcricao TEXT,
+                dados TEXT,
+                resultado TEXT,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_arquivo ON cache (file_unique_id)"
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_acesso ON cache (acessado_em)"
+        )
+        self._conexao.commit()
+        self._expirar()
+
+    def buscar(self, hash_conteudo=None, file_unique_id=None):
+        """Procura pelo hash do conteúdo ou pelo file_unique_id do Telegram"""
+        if hash_conteudo:
+            filtro, valor = "hash = ?", hash_conteudo
+        elif file_unique_id:
+            filtro, valor = "file_unique_id = ?", file_unique_id
+        else:
+            return None
+
+        with self._lock:
+            linha = self._conexao.execute(
+                f"SELECT hash, file_unique_id, transcricao, dados, resultado, criado_em "
+                f"FROM cache WHERE {filtro} ORDER BY acessado_em DESC LIMIT 1",
+                (valor,)
+            ).fetchone()
+
+            if linha is None or time.time() - linha[5] > self.ttl:
+                self.falhas += 1
+                return None
+
+            # Sem UPDATE/commit aqui: buscar roda no event loop a cada mensagem
+            self.acertos += 1
+            self._acessos[linha[0]] = time.time()
+
+        return {
+            "hash": linha[0],
+            "file_unique_id": linha[1],
+            "transcricao": linha[2],
+            "dados": json.loads(linha[3]) if linha[3] else None,
+            "resultado": json.loads(linha[4]) if linha[4] else None,
+        }
+
+    def salvar(self, hash_conteudo, file_unique_id=None, **campos):
+        """Grava/atualiza transcricao, dados e/ou resultado de um áudio"""
+        agora = time.time()
+        valores = {
+            nome: (valor if nome == 'transcricao' else json.dumps(valor, ensure_ascii=False))
+            for nome, valor in campos.items()
+            if nome in ('transcricao', 'dados', 'resultado')
+        }
+
+        with self._lock:
+            self._gravar_acessos()
+            self._conexao.execute(
+                "INSERT OR IGNORE INTO cache (hash, file_unique_id, criado_em, acessado_em) "
+                "VALUES (?, ?, ?, ?)",
+                (hash_conteudo, file_unique_id, agora, agora)
+            )
+            for nome, valor in valores.items():
+                self._conexao.execute(
+                    f"UPDATE cache SET {nome} = ?, acessado_em = ? WHERE hash = ?",
+                    (valor, agora, hash_conteudo)
+                )
+            self._conexao.commit()
+            self._aplicar_limite()
+
+    def _gravar_acessos(self):
+        """Grava os acessos acumulados por buscar (na transação de quem chamou)"""
+        if self._acessos:
+            self._conexao.executemany(
+                "UPDATE cache SET acessado_em = ? WHERE hash = ?",
+                [(acessado_em, hash_conteudo) for hash_conteudo, acessado_em in self._acessos.items()]
+            )
+            self._acessos.clear()
+
+    def _aplicar_limite(self):
+        """Remove os itens menos usados acima do limite (LRU)"""
+        total = self._conexao.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if total > self.max_itens:
+            self._conexao.execute(
+                "DELETE FROM cache WHERE hash IN "
+                "(SELECT hash FROM cache ORDER BY acessado_em ASC LIMIT ?)",
+                (total - self.max_itens,)
+            )
+            self._conexao.commit()
+
+    def _expirar(self):
+        """Remove itens mais antigos que a validade"""
+        with self._lock:
+            self._conexao.execute(
+                "DELETE FROM cache WHERE criado_em < ?", (time.time() - self.ttl,)
+            )
+            self._conexao.commit()
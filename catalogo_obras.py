@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catálogo das planilhas de obra ("Obra: ...") no Drive
+Uma consulta filtrada pelo prefixo do nome e pelo tipo de arquivo, só com
+id/nome e paginada, guardada em memória com validade; planilhas criadas
+pelo bot entram no catálogo na hora
+"""
+
+import os
+import time
+import threading
+from gspread.urls import DRIVE_FILES_API_V3_URL
+
+# ========== CONFIGURAÇÕES ==========
+# Segundos que a lista de obras fica em memória antes de consultar o Drive de novo
+OBRAS_CACHE_TTL = float(os.environ.get('OBRAS_CACHE_TTL', '300'))
+
+PREFIXO_OBRA = "Obra: "
+TIPO_PLANILHA = "application/vnd.google-apps.spreadsheet"
+
+
+def url_planilha(spreadsheet_id):
+    return f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
+
+
+class CatalogoObras:
+    """Lista de obras em cache, com consulta filtrada ao Drive"""
+
+    def __init__(self, ttl=OBRAS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._obras = None          # spreadsheet_id -> nome da obra
+        self._atualizado_em = 0.0
+        self.consultas = 0
+
+    def em_cache(self):
+        """Lista de obras se o cache ainda vale; None se precisa consultar o Drive"""
+        with self._lock:
+            if self._obras is None or time.monotonic() - self._atualizado_em > self.ttl:
+                return None
+            return self._lista()
+
+    def listar(self, gc):
+        """Lista de obras [{"nome", "id", "url"}], consultando o Drive só se o cache venceu"""
+        obras = self.em_cache()
+        if obras is not None:
+            return obras
+
+        encontradas = self._consultar(gc)
+        with self._lock:
+            self._obras = encontradas
+            self._atualizado_em = time.monotonic()
+            return self._lista()
+
+    def adicionar(self, titulo, spreadsheet_id):
+        """Inclui uma planilha recém-criada (sem esperar o cache vencer)"""
+        if not titulo.startswith(PREFIXO_OBRA):
+            return
+        with self._lock:
+            if self._obras is not None:
+                self._obras[spreadsheet_id] = titulo[len(PREFIXO_OBRA):]
+
+    def invalidar(self):
+        """Força nova consulta ao Drive na próxima listagem"""
+        with self._lock:
+            self._obras = None
+
+    def _consultar(self, gc):
+        """files.list filtrado por nome e tipo, só com id/nome, página a página"""
+        params = {
+            "q": (
+                f"name contains '{PREFIXO_OBRA}' and mimeType = '{TIPO_PLANILHA}'"
+                " and trashed = false"
+            ),
+            "fields": "nextPageToken, files(id, name)",
+            "pageSize": 1000,
+            "supportsAllDrives": True,
+            "includeItemsFromAllDrives": True,
+        }
+
+        obras = {}
+        while True:
+            self.consultas += 1
+            resposta = gc.request("get", DRIVE_FILES_API_V3_URL, params=params).json()
+            for arquivo in resposta.get("files", []):
+                # "contains" casa em qualquer posição do nome; conferir o prefixo
+                if arquivo["name"].startswith(PREFIXO_OBRA):
+                    obras[arquivo["id"]] = arquivo["name"][len(PREFIXO_OBRA):]
+
+            token = resposta.get("nextPageToken")
+            if not token:
+                return obras
+            params["pageToken"] = token
+
+    def _lista(self):
+        return [
+            {"nome": nome, "id": spreadsheet_id, "url": url_planilha(spreadsheet_id)}
+            for spreadsheet_id, nome in sorted(self._obras.items(), key=lambda item: item[1].casefold())
+        ]
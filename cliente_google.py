@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente Google compartilhado pelos bots
+Autoriza uma única vez por processo, renova o token antes de expirar
+e reaproveita as conexões HTTP entre mensagens
+Toda requisição passa pelo limitador de cota (quando configurado)
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+import gspread
+import requests
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from metricas import metricas
+
+# ========== CONFIGURAÇÕES ==========
+# Renovar o token quando faltar menos que isso para expirar (segundos)
+MARGEM_RENOVACAO_TOKEN = int(os.environ.get('GOOGLE_MARGEM_RENOVACAO', '300'))
+
+# Conexões HTTP mantidas abertas para a API do Google
+TAMANHO_POOL_GOOGLE = int(os.environ.get('GOOGLE_POOL_CONEXOES', '10'))
+
+# Tentativas quando o Google responde 429 (cota estourada)
+GOOGLE_MAX_TENTATIVAS_429 = int(os.environ.get('GOOGLE_MAX_TENTATIVAS_429', '5'))
+
+
+def operacao_google(metodo, url):
+    """Nome curto da chamada para as métricas (drive.list, sheets.append, sheets.get...)"""
+    metodo = metodo.upper()
+    caminho = urlsplit(url).path
+    if '/drive/' in caminho:
+        return {'GET': 'drive.list', 'POST': 'drive.create'}.get(metodo, f'drive.{metodo.lower()}')
+    if 'token' in caminho:
+        return 'token'
+    ultimo = caminho.rsplit('/', 1)[-1]
+    if ':' in ultimo:
+        acao = ultimo.rsplit(':', 1)[-1]
+        # values:batchUpdate / values:batchGet (em lote) x /values/<intervalo>:append
+        return f'sheets.values.{acao}' if ultimo.startswith('values:') else f'sheets.{acao}'
+    if '/values/' in caminho:
+        return 'sheets.values.get'
+    return f'sheets.{metodo.lower()}'
+
+
+class SessaoLimitada(AuthorizedSession):
+    """Sessão autorizada que respeita o limitador e repete em caso de 429
+
+    ao_negar(sessao): chamada quando o Google recusa as credenciais (401)
+    mesmo depois da renovação automática do token
+    """
+
+    def __init__(self, credenciais, limitador, max_tentativas=GOOGLE_MAX_TENTATIVAS_429, ao_negar=None):
+        super().__init__(credenciais)
+        self.limitador = limitador
+        self.max_tentativas = max(1, max_tentativas)
+        self.ao_negar = ao_negar
+
+    def request(self, method, url, *args, **kwargs):
+        balde = self.limitador.balde(method)
+        operacao = operacao_google(method, url)
+
+        for tentativa in range(1, self.max_tentativas + 1):
+            chegada = time.perf_counter()
+            balde.adquirir()
+            metricas.observar('bot_google_espera_cota_segundos', time.perf_counter() - chegada)
+            with metricas.medir('bot_google_segundos', operacao=operacao):
+                resposta = super().request(method, url, *args, **kwargs)
+            if resposta.status_code == 401 and self.ao_negar is not None:
+                print(f"⚠️ Google recusou as credenciais ({method} {url}), autorizando de novo")
+                self.ao_negar(self)
+            if resposta.status_code != 429 or tentativa == self.max_tentativas:
+                return resposta
+
+            # Cota estourada mesmo assim: segurar o balde e tentar de novo
+            retry_after = resposta.headers.get('Retry-After', '')
+            espera = float(retry_after) if retry_after.isdigit() else random.uniform(1, 2 ** tentativa)
+            print(f"⚠️ Google 429 ({method} {url}), nova tentativa em {espera:.1f}s")
+            self.limitador.registrar_429(method, espera)
+
+
+class GerenciadorClienteGoogle:
+    """Mantém um cliente gspread autorizado e compartilhado entre handlers"""
+
+    def __init__(self, credenciais_json, scopes,
+                 margem_renovacao=MARGEM_RENOVACAO_TOKEN,
+                 tamanho_pool=TAMANHO_POOL_GOOGLE,
+                 limitador=None):
+        self.credenciais_json = credenciais_json
+        self.scopes = scopes
+        self.margem_renovacao = timedelta(seconds=margem_renovacao)
+        self.tamanho_pool = tamanho_pool
+        self.limitador = limitador
+        self._lock = threading.Lock()
+        self._credenciais = None
+        self._sessao = None
+        self._sessao_token = requests.Session()
+        self._cliente = None
+
+    def obter(self):
+        """Retorna o cliente autorizado, renovando o token se necessário"""
+        with self._lock:
+            if self._cliente is None:
+                self._autorizar()
+            elif self._precisa_renovar():
+                try:
+                    self._renovar()
+                except RefreshError:
+                    # Credenciais revogadas/trocadas: a próxima chamada autoriza do zero
+                    self._descartar()
+                    raise
+            return self._cliente
+
+    def invalidar(self, sessao=None):
+        """Descarta o cliente atual (próxima chamada autoriza de novo)
+
+        sessao: só descarta se o cliente ainda for o dessa sessão (um 401
+        atrasado não derruba o cliente que outra thread acabou de montar)
+        """
+        with self._lock:
+            if sessao is None or sessao is self._sessao:
+                self._descartar()
+
+    def _descartar(self):
+        if self._sessao is not None:
+            self._sessao.close()
+        self._credenciais = None
+        self._sessao = None
+        self._cliente = None
+
+    def _autorizar(self):
+        """Carrega as credenciais e monta a sessão com pool de conexões"""
+        if not self.credenciais_json:
+            raise Exception("GOOGLE_CREDENTIALS_JSON não configurado!")
+
+        creds_dict = json.loads(self.credenciais_json)
+        credenciais = Credentials.from_service_account_info(creds_dict, scopes=self.scopes)
+
+        if self.limitador is not None:
+            sessao = SessaoLimitada(credenciais, self.limitador, ao_negar=self.invalidar)
+        else:
+            sessao = AuthorizedSession(credenciais)
+        adaptador = HTTPAdapter(
+            pool_connections=self.tamanho_pool,
+            pool_maxsize=self.tamanho_pool
+        )
+        sessao.mount('https://', adaptador)
+
+        self._credenciais = credenciais
+        self._sessao = sessao
+        self._renovar()
+        self._cliente = gspread.Client(auth=credenciais, session=sessao)
+
+    def _precisa_renovar(self):
+        """Verifica se o token expira dentro da margem de renovação"""
+        if not self._credenciais.valid or self._credenciais.expiry is None:
+            return True
+        return self._credenciais.expiry - datetime.utcnow() < self.margem_renovacao
+
+    def _renovar(self):
+        """Troca o token reaproveitando a conexão com o endpoint de token"""
+        self._credenciais.refresh(Request(session=self._sessao_token))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Execução de código bloqueante fora do event loop
+Chamadas do gspread (síncronas) rodam num pool de threads limitado para
+não congelar o bot enquanto esperam a API do Google
+"""
+
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# ========== CONFIGURAÇÕES ==========
+# Máximo de chamadas ao Google Sheets em paralelo
+GOOGLE_MAX_THREADS = int(os.environ.get('GOOGLE_MAX_THREADS', '8'))
+
+executor_google = ThreadPoolExecutor(
+    max_workers=GOOGLE_MAX_THREADS,
+    thread_name_prefix='google'
+)
+
+
+async def em_thread(funcao, *args, **kwargs):
+    """Executa uma função bloqueante no pool e aguarda o resultado"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor_google,
+        functools.partial(funcao, *args, **kwargs)
+    )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extração agrupada (micro-lotes) das transcrições pelo LLM
+As transcrições que chegam dentro de uma janela curta vão juntas numa
+única chamada, que responde um JSON com um resultado por id; se a
+resposta do lote vier incompleta ou inválida, os itens faltantes são
+extraídos um a um
+"""
+
+import os
+import json
+import asyncio
+
+# ========== CONFIGURAÇÕES ==========
+# Quantidade de transcrições que dispara a chamada imediata do lote
+EXTRACAO_LOTE_MAX = int(os.environ.get('EXTRACAO_LOTE_MAX', '8'))
+
+# Tempo máximo (segundos) que uma transcrição espera por companhia no lote
+EXTRACAO_LOTE_ESPERA = float(os.environ.get('EXTRACAO_LOTE_ESPERA', '0.3'))
+
+
+def textos_numerados(textos):
+    """Lista os textos do lote com seus ids, para montar o prompt"""
+    return '\n'.join(f'[{id_item}] "{texto}"' for id_item, texto in textos.items())
+
+
+def interpretar_lote(conteudo, ids):
+    """Lê {"resultados": [{"id": ..., ...}]} e retorna {id: dados} (ValueError se inválido)"""
+    resposta = json.loads(conteudo) if isinstance(conteudo, str) else conteudo
+    if isinstance(resposta, dict):
+        resposta = resposta.get('resultados')
+    if not isinstance(resposta, list):
+        raise ValueError("resposta do lote sem a lista 'resultados'")
+
+    resultados = {}
+    for item in resposta:
+        if not isinstance(item, dict):
+            continue
+        id_item = str(item.pop('id', ''))
+        if id_item in ids:
+            resultados[id_item] = item
+    return resultados
+
+
+class AgrupadorExtracoes:
+    """Junta extrações pendentes num único pedido ao LLM"""
+
+    def __init__(self, extrair_lote, extrair_um,
+                 tamanho_lote=EXTRACAO_LOTE_MAX, espera=EXTRACAO_LOTE_ESPERA):
+        # extrair_lote({id: texto}) -> {id: dados}; extrair_um(texto) -> dados
+        self.extrair_lote = extrair_lote
+        self.extrair_um = extrair_um
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.espera = espera
+        self._pendentes = []   # [(texto, Future)]
+        self._timer = None
+        self._tarefas = set()
+
+        # Contadores
+        self.lotes = 0
+        self.itens_em_lote = 0
+        self.individuais = 0
+
+    async def extrair(self, texto):
+        """Enfileira um texto e aguarda os dados extraídos"""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((texto, futuro))
+
+        if len(self._pendentes) >= self.tamanho_lote:
+            self._disparar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.espera, self._disparar)
+
+        return await futuro
+
+    async def descarregar_tudo(self):
+        """Dispara o lote pendente e aguarda as chamadas em andamento"""
+        self._disparar()
+        if self._tarefas:
+            await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+    def _disparar(self):
+        """Tira os itens pendentes da fila e processa em segundo plano"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        itens, self._pendentes = self._pendentes, []
+        if not itens:
+            return
+
+        tarefa = asyncio.get_running_loop().create_task(self._processar(itens))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _processar(self, itens):
+        """Uma chamada para o lote; chamadas individuais para o que faltar"""
+        ids = {str(i): item for i, item in enumerate(itens, 1)}
+        resultados = {}
+
+        if len(itens) > 1:
+            try:
+                resultados = await self.extrair_lote({i: texto for i, (texto, _) in ids.items()})
+                self.lotes += 1
+                self.itens_em_lote += len(resultados)
+            except Exception as e:
+                print(f"⚠️ Lote de extração inválido ({e}), extraindo um a um")
+
+        faltantes = [i for i in ids if not isinstance(resultados.get(i), dict)]
+        if faltantes:
+            self.individuais += len(faltantes)
+            respostas = await asyncio.gather(
+                *(self.extrair_um(ids[i][0]) for i in faltantes),
+                return_exceptions=True
+            )
+            resultados.update(zip(faltantes, respostas))
+
+        for i, (_, futuro) in ids.items():
+            if futuro.done():
+                continue
+            if isinstance(resultados[i], BaseException):
+                futuro.set_exception(resultados[i])
+            else:
+                futuro.set_result(resultados[i])
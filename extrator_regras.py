@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extrator local (por regras) das frases mais comuns
+Reconhece valores em número ou por extenso, "obra do/da X", funções e
+categorias; devolve o mesmo formato do LLM com uma nota de confiança
+(frases com outra data que não hoje ficam abaixo do limiar).
+O LLM só é chamado quando a confiança fica abaixo do limiar.
+"""
+
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+# ========== CONFIGURAÇÕES ==========
+# Confiança mínima para dispensar o LLM (0 a 1; acima de 1 desliga o extrator)
+EXTRATOR_LIMIAR = float(os.environ.get('EXTRATOR_LIMIAR', '0.85'))
+
+# ========== VOCABULÁRIO ==========
+NUMEROS = {
+    'zero': 0, 'um': 1, 'uma': 1, 'dois': 2, 'duas': 2, 'tres': 3, 'quatro': 4,
+    'cinco': 5, 'seis': 6, 'sete': 7, 'oito': 8, 'nove': 9, 'dez': 10,
+    'onze': 11, 'doze': 12, 'treze': 13, 'catorze': 14, 'quatorze': 14,
+    'quinze': 15, 'dezesseis': 16, 'dezessete': 17, 'dezoito': 18, 'dezenove': 19,
+    'vinte': 20, 'trinta': 30, 'quarenta': 40, 'cinquenta': 50, 'sessenta': 60,
+    'setenta': 70, 'oitenta': 80, 'noventa': 90, 'cem': 100, 'cento': 100,
+    'duzentos': 200, 'duzentas': 200, 'trezentos': 300, 'trezentas': 300,
+    'quatrocentos': 400, 'quatrocentas': 400, 'quinhentos': 500, 'quinhentas': 500,
+    'seiscentos': 600, 'seiscentas': 600, 'setecentos': 700, 'setecentas': 700,
+    'oitocentos': 800, 'oitocentas': 800, 'novecentos': 900, 'novecentas': 900,
+}
+
+MOEDA_DEPOIS = {'reais', 'real', 'conto', 'contos', 'pila', 'pilas'}
+MOEDA_ANTES = {'r$', 'por', 'valor', 'custou', 'deu', 'total'}
+
+# Antes do valor, indicam que ele é o total mesmo havendo quantidade ("50 sacos por 1500")
+TOTAL_ANTES = {'por', 'total', 'tudo', 'deu', 'custou', 'ficou', 'todo'}
+
+# Unidades que indicam quantidade (não valor)
+QUANTIDADES = {
+    'saco', 'sacos', 'metro', 'metros', 'm', 'm2', 'm3', 'kg', 'quilo', 'quilos',
+    'unidade', 'unidades', 'lata', 'latas', 'caminhao', 'caminhoes', 'tijolos',
+    'telhas', 'blocos', 'barras', 'barra', 'litro', 'litros', 'peca', 'pecas',
+    'dia', 'dias', 'diaria', 'diarias', 'hora', 'horas', 'semana', 'semanas',
+    'caixa', 'caixas', 'rolo', 'rolos', 'galao', 'galoes', 'milheiro',
+}
+
+FUNCOES = {
+    'pedreiro': 'Pedreiro', 'pedreiros': 'Pedreiro',
+    'ajudante': 'Ajudante', 'ajudantes': 'Ajudante',
+    'servente': 'Servente', 'serventes': 'Servente',
+    'eletricista': 'Eletricista', 'encanador': 'Encanador',
+    'mestre': 'Mestre de Obras',
+}
+
+PAGAMENTO_CHAVES = {'paguei', 'pagamento', 'pagar', 'pago', 'salario', 'diaria', 'diarias', 'funcionario'}
+GASTO_CHAVES = {'comprei', 'compra', 'compramos', 'comprado', 'gastei', 'gasto', 'gastamos'}
+
+CATEGORIAS = {
+    'Materiais': {
+        'cimento', 'areia', 'brita', 'tijolo', 'tijolos', 'bloco', 'blocos', 'cal',
+        'argamassa', 'ferro', 'vergalhao', 'tinta', 'madeira', 'telha', 'telhas',
+        'piso', 'azulejo', 'rejunte', 'cano', 'canos', 'fio', 'fios', 'tubo',
+        'tubos', 'prego', 'pregos', 'material', 'materiais', 'pedra', 'concreto',
+        'massa', 'gesso', 'porcelanato', 'janela', 'porta', 'torneira',
+    },
+    'Ferramentas': {
+        'martelo', 'furadeira', 'serra', 'serrote', 'pa', 'enxada', 'ferramenta',
+        'ferramentas', 'trena', 'nivel', 'colher', 'desempenadeira', 'alicate',
+        'chave', 'broca', 'brocas', 'carrinho', 'escada', 'esmerilhadeira',
+    },
+    'Transporte': {
+        'frete', 'gasolina', 'combustivel', 'diesel', 'uber', 'transporte',
+        'carreto', 'pedagio', 'onibus',
+    },
+    'Aluguel': {'aluguel', 'alugar', 'aluguei', 'locacao', 'betoneira', 'andaime', 'cacamba'},
+}
+
+# Datas que as regras não resolvem (só "hoje" vira a data de hoje): ficam para o LLM
+DIAS_SEMANA = {'segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado', 'domingo'}
+DATAS = {'ontem', 'anteontem', 'retrasada', 'retrasado'} | DIAS_SEMANA
+PERIODOS = {'semana', 'mes', 'ano'}
+DATA_NUMERICA = re.compile(r'\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b')
+
+# Palavras que encerram o nome da obra, do funcionário ou a descrição
+PARADAS = {
+    'por', 'com', 'no', 'na', 'nos', 'nas', 'pra', 'para', 'pro', 'e', 'que',
+    'hoje', 'ontem', 'anteontem', 'semana', 'mes', 'passada', 'passado', 'feira',
+    'dia', 'paguei', 'comprei', 'gastei', 'valor', 'reais', 'real',
+    'r$', 'de', 'do', 'da', 'em', 'foi', 'deu', 'custou', 'ao', 'a', 'o', 'os',
+    'as', 'um', 'uma', 'obra', 'total', 'mais', 'pelo', 'pela', 'referente',
+} | DIAS_SEMANA
+
+ARTIGOS = {'o', 'a', 'os', 'as', 'seu', 'dona', 'do', 'da', 'ao'}
+ANTES_DE_NUMERO = {'rua', 'quadra', 'lote', 'casa', 'numero', 'avenida', 'av', 'predio', 'bloco'}
+
+TOKEN = re.compile(r"R\$|\d+(?:[.,]\d+)*|[^\W\d_]+|[,.;:!?]")
+
+
+def dobrar(texto):
+    """Minúsculas sem acento (para comparar palavras)"""
+    texto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _numero_digitos(token):
+    """Converte '1.500', '1500,50' ou '200.5' em float"""
+    if ',' in token:
+        return float(token.replace('.', '').replace(',', '.'))
+    if re.fullmatch(r'\d{1,3}(\.\d{3})+', token):
+        return float(token.replace('.', ''))
+    return float(token)
+
+
+def _eh_numero(dobrado):
+    return dobrado[0].isdigit() or dobrado in NUMEROS or dobrado == 'mil'
+
+
+def _numeros(tokens):
+    """Encontra expressões numéricas: [(valor, inicio, fim)]"""
+    encontrados = []
+    i = 0
+    while i < len(tokens):
+        if not _eh_numero(tokens[i][1]):
+            i += 1
+            continue
+
+        inicio, total, atual = i, 0.0, 0.0
+        while i < len(tokens):
+            palavra = tokens[i][1]
+            if palavra[0].isdigit():
+                atual += _numero_digitos(palavra)
+            elif palavra in NUMEROS:
+                atual += NUMEROS[palavra]
+            elif palavra == 'mil':
+                total += (atual or 1) * 1000
+                atual = 0.0
+            elif palavra == 'e' and i + 1 < len(tokens) and tokens[i + 1][1] in NUMEROS:
+                pass
+            else:
+                break
+            i += 1
+
+        encontrados.append((total + atual, inicio, i))
+    return encontrados
+
+
+def _valor(tokens):
+    """Escolhe o valor em reais; retorna (valor, pontos de confiança)"""
+    fortes, fracos, soltos = [], [], []
+
+    for valor, inicio, fim in _numeros(tokens):
+        antes = tokens[inicio - 1][1] if inicio > 0 else ''
+        depois = tokens[fim][1] if fim < len(tokens) else ''
+
+        # "... reais e cinquenta centavos"
+        if depois in MOEDA_DEPOIS and fim + 1 < len(tokens) and tokens[fim + 1][1] == 'e':
+            centavos = _numeros(tokens[fim + 2:fim + 6])
+            if centavos and centavos[0][1] == 0:
+                fim_centavos = fim + 2 + centavos[0][2]
+                if fim_centavos < len(tokens) and tokens[fim_centavos][1] == 'centavos':
+                    valor += centavos[0][0] / 100
+
+        if depois in QUANTIDADES:
+            continue
+        if antes == 'r$' or depois in MOEDA_DEPOIS:
+            fortes.append(valor)
+        elif antes in MOEDA_ANTES:
+            fracos.append(valor)
+        elif antes != 'centavos' and depois != 'centavos':
+            soltos.append(valor)
+
+    for candidatos, pontos in ((fortes, 0.35), (fracos, 0.3), (soltos, 0.2)):
+        distintos = set(candidatos)
+        if len(distintos) == 1:
+            return candidatos[0], pontos
+        if len(distintos) > 1:
+            return None, 0.0
+    return None, 0.0
+
+
+def _preco_unitario(tokens, valor):
+    """O valor parece preço por unidade e não o total?
+
+    "150 reais cada", "a 40 reais", "40 reais o saco", "150 por dia" ou uma
+    quantidade antes do valor ("2 diárias ... 150 reais") sem marca de total
+    """
+    palavras = [p for _, p in tokens]
+    if 'cada' in palavras:
+        return True
+    for numero, inicio, fim in _numeros(tokens):
+        if numero != valor:
+            continue
+        antes = palavras[inicio - 1] if inicio > 0 else ''
+        seguinte = fim + 1 if fim < len(palavras) and palavras[fim] in MOEDA_DEPOIS else fim
+        depois = palavras[seguinte:seguinte + 2]
+        if antes == 'a':
+            return True
+        if len(depois) == 2 and depois[0] in ('o', 'a', 'por') and depois[1] in QUANTIDADES:
+            return True
+        quantidade = any(
+            q > 1 and f < inicio and palavras[f] in QUANTIDADES
+            for q, _, f in _numeros(tokens[:inicio])
+        )
+        if quantidade and antes not in TOTAL_ANTES and not {'total', 'todo'} & set(palavras):
+            return True
+    return False
+
+
+def _nome(tokens, inicio, maximo=4, permitir_numero=True):
+    """Junta as palavras de um nome a partir de `inicio` até uma parada"""
+    partes = []
+    i = inicio
+    while i < len(tokens) and len(partes) < maximo:
+        original, palavra = tokens[i]
+        if palavra in PARADAS or palavra in FUNCOES or palavra in ',.;:!?':
+            break
+        if _eh_numero(palavra):
+            anterior = partes[-1][1] if partes else ''
+            if not (permitir_numero and palavra[0].isdigit() and anterior in ANTES_DE_NUMERO):
+                break
+        partes.append((original, palavra))
+        i += 1
+    return ' '.join(p[0][:1].upper() + p[0][1:] for p in partes)
+
+
+def _obra(tokens):
+    """Procura 'obra do/da/de X' (ou 'obra X')"""
+    for i, (_, palavra) in enumerate(tokens):
+        if palavra != 'obra':
+            continue
+        if i >= 2 and tokens[i - 2][1] == 'mao' and tokens[i - 1][1] == 'de':
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j][1] in ('do', 'da', 'de', 'dos', 'das'):
+            j += 1
+        nome = _nome(tokens, j)
+        if nome:
+            return nome
+    return None
+
+
+def _categoria(palavras):
+    """Primeira categoria cuja palavra-chave aparece no texto"""
+    for categoria, chaves in CATEGORIAS.items():
+        if chaves & palavras:
+            return categoria
+    return None
+
+
+def _funcionario(tokens):
+    """Função e nome do funcionário ('pedreiro Pedro', 'Pedro pedreiro', 'paguei o Pedro')"""
+    for i, (_, palavra) in enumerate(tokens):
+        if palavra not in FUNCOES:
+            continue
+        funcao = FUNCOES[palavra]
+        j = i + 1
+        if palavra == 'mestre' and j + 1 < len(tokens) and tokens[j + 1][1] == 'obras':
+            j += 2
+        while j < len(tokens) and tokens[j][1] in ARTIGOS:
+            j += 1
+        nome = _nome(tokens, j, maximo=2, permitir_numero=False)
+        if not nome and i > 0 and tokens[i - 1][0][:1].isupper() and tokens[i - 1][1] not in PARADAS:
+            nome = tokens[i - 1][0]
+        return funcao, nome
+
+    for i, (_, palavra) in enumerate(tokens):
+        if palavra == 'paguei':
+            j = i + 1
+            while j < len(tokens) and tokens[j][1] in ARTIGOS:
+                j += 1
+            if j < len(tokens) and tokens[j][0][:1].isupper() and tokens[j][1] not in PARADAS:
+                return None, _nome(tokens, j, maximo=2, permitir_numero=False)
+    return None, None
+
+
+def _descricao(tokens, numeros_valor):
+    """O que foi comprado: palavras depois de 'comprei'/'gastei' (ou do início)"""
+    verbos = [i for i, (_, palavra) in enumerate(tokens) if palavra in GASTO_CHAVES | {'paguei'}]
+    for i in verbos or [-1]:
+        partes = []
+        j = i + 1
+        while j < len(tokens):
+            original, atual = tokens[j]
+            if j in numeros_valor or not partes and atual in (
+                    'com', 'em', 'de', 'uns', 'umas', 'o', 'a', 'os', 'as', 'r$', 'reais', 'real'):
+                j += 1
+                continue
+            if atual in ('por', 'para', 'pra', 'pro', 'obra', 'r$', 'reais', 'no', 'na', 'dia') \
+                    or atual in DATAS or atual in ',.;:!?' or (partes and j in numeros_valor):
+                break
+            partes.append(original)
+            j += 1
+        while partes and dobrar(partes[-1]) in ('de', 'da', 'do', 'e', 'com', 'a'):
+            partes.pop()
+        if partes:
+            return ' '.join(partes)
+    return None
+
+
+def _menciona_data(texto, tokens):
+    """Fala de outro dia ("ontem", "dia 10", "semana passada", "05/03", "sexta")?"""
+    if DATA_NUMERICA.search(texto):
+        return True
+    palavras = [p for _, p in tokens]
+    for i, palavra in enumerate(palavras):
+        seguinte = palavras[i + 1] if i + 1 < len(palavras) else ''
+        if palavra in DATAS:
+            return True
+        if palavra == 'dia' and seguinte[:1].isdigit():
+            return True
+        if palavra in PERIODOS and seguinte in ('passada', 'passado'):
+            return True
+    return False
+
+
+def menciona_valor(texto):
+    """O texto tem algum número (em dígitos ou por extenso)? Sem valor não há lançamento"""
+    return any(_eh_numero(dobrar(token)) for token in TOKEN.findall(texto))
+
+
+def parece_lancamento(texto):
+    """Tem valor em reais ("200 reais", "R$ 50") ou "paguei"/"comprei" e um número?
+
+    Critério para grupos: um número solto ("chego às 8") não vira lançamento
+    """
+    if not menciona_valor(texto):
+        return False
+    tokens = [(t, dobrar(t)) for t in TOKEN.findall(texto)]
+    if {p for _, p in tokens} & (GASTO_CHAVES | PAGAMENTO_CHAVES):
+        return True
+    return _valor(tokens)[1] >= 0.3
+
+
+def extrair_por_regras(texto, obra_padrao="geral"):
+    """Extrai tipo/obra/valor/detalhes por regras; inclui 'confianca' (0 a 1)"""
+    tokens = [(t, dobrar(t)) for t in TOKEN.findall(texto)]
+    palavras = {p for _, p in tokens}
+    confianca = 0.0
+
+    # Tipo
+    pagamento = bool(palavras & PAGAMENTO_CHAVES) or 'mao' in palavras and 'obra' in palavras
+    gasto = bool(palavras & GASTO_CHAVES)
+    categoria = _categoria(palavras)
+    funcao, funcionario = _funcionario(tokens)
+
+    if gasto and not pagamento:
+        tipo, confianca = 'gasto', confianca + 0.25
+    elif pagamento and funcao and not gasto:
+        tipo, confianca = 'pagamento', confianca + 0.25
+    elif pagamento and categoria and not funcao:
+        # "paguei o frete", "paguei o aluguel da betoneira"
+        tipo, confianca = 'gasto', confianca + 0.15
+    elif pagamento and not gasto:
+        tipo, confianca = 'pagamento', confianca + 0.1
+    elif categoria and not pagamento:
+        # "Materiais diversos, 300 reais"
+        tipo, confianca = 'gasto', confianca + 0.15
+    else:
+        tipo = 'gasto'
+
+    # Valor
+    valor, pontos = _valor(tokens)
+    confianca += pontos
+    # Preço por unidade: o total depende da quantidade, fica para o LLM
+    unitario = valor is not None and _preco_unitario(tokens, valor)
+    if valor is None:
+        valor, confianca = 0.0, min(confianca, 0.3)
+
+    # Obra
+    obra = _obra(tokens)
+    if obra:
+        confianca += 0.2
+    else:
+        obra = obra_padrao
+
+    dados = {
+        "tipo": tipo,
+        "obra": obra,
+        "data": datetime.now().strftime('%d/%m/%Y'),
+        "valor": valor,
+        "observacoes": "",
+    }
+
+    if tipo == 'pagamento':
+        dados["nome_funcionario"] = funcionario or ''
+        dados["funcao"] = funcao or 'Outros'
+        confianca += 0.2 if (funcionario and funcao) else 0.1 if (funcionario or funcao) else 0.0
+    else:
+        numeros_valor = {
+            k for v, ini, fim in _numeros(tokens) if v == valor for k in range(ini, fim)
+        }
+        descricao = _descricao(tokens, numeros_valor)
+        dados["descricao"] = descricao or texto.strip()[:100]
+        dados["categoria"] = categoria or 'Outros'
+        confianca += 0.2 if (descricao and categoria) else 0.1 if descricao else 0.0
+
+    # Preço unitário ou data diferente de hoje: quem resolve é o LLM
+    if unitario or _menciona_data(texto, tokens):
+        confianca = min(confianca, 0.5, EXTRATOR_LIMIAR - 0.01)
+    dados["confianca"] = round(min(confianca, 1.0), 2)
+    return dados
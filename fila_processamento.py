@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de processamento dos áudios
+Cada etapa (download, transcrição, extração) tem seu próprio
+limite de concorrência, os áudios de um mesmo chat são processados na
+ordem de chegada e a fila tem tamanho máximo. O tempo de cada áudio,
+da entrada na fila ao fim, vai para as métricas como a etapa "total"
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from metricas import metricas
+
+# ========== CONFIGURAÇÕES ==========
+LIMITES_PADRAO = {
+    'download': 8,
+    'transcricao': 4,
+    'extracao': 4,
+}
+
+# Máximo de áudios aceitos e ainda não concluídos (somando todos os chats)
+FILA_PROFUNDIDADE_MAX = int(os.environ.get('FILA_PROFUNDIDADE_MAX', '100'))
+
+# Tempo máximo (segundos) para esvaziar a fila ao desligar
+FILA_TEMPO_ENCERRAMENTO = float(os.environ.get('FILA_TEMPO_ENCERRAMENTO', '60'))
+
+
+def limites_do_ambiente():
+    """Lê os limites por etapa (FILA_LIMITE_DOWNLOAD, FILA_LIMITE_TRANSCRICAO, ...)"""
+    return {
+        etapa: int(os.environ.get(f'FILA_LIMITE_{etapa.upper()}', padrao))
+        for etapa, padrao in LIMITES_PADRAO.items()
+    }
+
+
+class FilaCheia(Exception):
+    """A fila atingiu a profundidade máxima"""
+
+
+class FilaProcessamento:
+    """Fila com ordem por chat, limite por etapa e contrapressão"""
+
+    def __init__(self, limites=None, profundidade_max=FILA_PROFUNDIDADE_MAX):
+        self.limites = limites or limites_do_ambiente()
+        self.profundidade_max = profundidade_max
+        self._semaforos = {etapa: asyncio.Semaphore(n) for etapa, n in self.limites.items()}
+        self._filas = {}       # chat_id -> deque de (trabalho, instante de chegada)
+        self._tarefas = {}     # chat_id -> tarefa que consome a fila do chat
+        self._pendentes = 0
+        self._encerrando = False
+
+    @property
+    def pendentes(self):
+        """Quantidade de áudios aceitos e ainda não concluídos"""
+        return self._pendentes
+
+    @property
+    def capacidade(self):
+        """Quantos áudios podem estar em andamento ao mesmo tempo"""
+        return min(self.limites.values())
+
+    def enviar(self, chat_id, trabalho):
+        """Enfileira um trabalho (função async sem argumentos)
+
+        Retorna a posição de espera (0 = começa já) ou levanta FilaCheia
+        """
+        if self._encerrando or self._pendentes >= self.profundidade_max:
+            raise FilaCheia(f"{self._pendentes} áudios na fila")
+
+        posicao = max(0, self._pendentes - self.capacidade + 1)
+        fila_chat = self._filas.setdefault(chat_id, deque())
+        posicao = max(posicao, len(fila_chat) + (chat_id in self._tarefas))
+
+        fila_chat.append((trabalho, time.perf_counter()))
+        self._pendentes += 1
+
+        if chat_id not in self._tarefas:
+            self._tarefas[chat_id] = asyncio.create_task(self._consumir(chat_id))
+
+        return posicao
+
+    @asynccontextmanager
+    async def etapa(self, nome):
+        """Context manager que respeita o limite de concorrência da etapa
+
+        Registra nas métricas o tempo de espera pela vaga e a duração da etapa
+        """
+        chegada = time.perf_counter()
+        async with self._semaforos[nome]:
+            metricas.observar('bot_fila_espera_segundos', time.perf_counter() - chegada, etapa=nome)
+            with metricas.medir('bot_etapa_segundos', etapa=nome):
+                yield
+
+    async def encerrar(self, tempo_max=FILA_TEMPO_ENCERRAMENTO):
+        """Para de aceitar trabalhos e espera a fila esvaziar"""
+        self._encerrando = True
+        tarefas = list(self._tarefas.values())
+        if not tarefas:
+            return
+
+        print(f"⏳ Aguardando {self._pendentes} áudio(s) na fila...")
+        _, restantes = await asyncio.wait(tarefas, timeout=tempo_max)
+        for tarefa in restantes:
+            tarefa.cancel()
+        if restantes:
+            print(f"⚠️ {self._pendentes} áudio(s) descartados no encerramento")
+
+    async def _consumir(self, chat_id):
+        """Processa, em ordem, todos os trabalhos de um chat"""
+        fila_chat = self._filas[chat_id]
+        try:
+            while fila_chat:
+                trabalho, chegada = fila_chat.popleft()
+                try:
+                    await trabalho()
+                except Exception as e:
+                    print(f"❌ Erro na fila (chat {chat_id}): {e}")
+                finally:
+                    self._pendentes -= 1
+                    metricas.observar('bot_etapa_segundos', time.perf_counter() - chegada, etapa='total')
+        finally:
+            del self._tarefas[chat_id]
+            if not fila_chat:
+                del self._filas[chat_id]
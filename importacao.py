@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importação em lote de áudios e listas de lançamentos
+Aceita uma pasta ou um zip de áudios (.ogg/.opus, como os exportados do
+WhatsApp) ou um arquivo de texto com um lançamento por linha. Os itens
+passam pelas mesmas funções do bot (transcrição → extração → livro) com
+transcrições em paralelo, extrações agrupadas pelo AgrupadorExtracoes e
+linhas enviadas às planilhas em lote pelo sincronizador. Os lançamentos
+são gravados na ordem dos arquivos e o mesmo item importado de novo não
+gera outro lançamento
+
+Uso: python importacao.py <pasta|arquivo.zip|arquivo.txt> [--bot railway|v4]
+(pela linha de comando só grava no livro; o bot em execução envia às planilhas)
+No Telegram: /importar na legenda (ou em resposta) de um .zip ou .txt
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import importlib
+from datetime import datetime
+from collections import Counter
+from audio_memoria import novo_buffer
+from cache_processamento import hash_audio, chave_idempotencia
+from execucao import em_thread
+from progresso_mensagem import ProgressoMensagem
+
+# ========== CONFIGURAÇÕES ==========
+# Itens processados ao mesmo tempo (a transcrição ainda respeita o limite da fila)
+IMPORTACAO_CONCORRENCIA = int(os.environ.get('IMPORTACAO_CONCORRENCIA', '16'))
+
+# Tamanho máximo (bytes) de cada áudio (limite da API de transcrição)
+IMPORTACAO_TAMANHO_MAX = int(os.environ.get('IMPORTACAO_TAMANHO_MAX', str(25 * 1024 * 1024)))
+
+EXTENSOES_AUDIO = ('.ogg', '.opus')
+
+# Data no nome dos áudios do WhatsApp (PTT-20240115-WA0003.opus)
+PADRAO_DATA_ARQUIVO = re.compile(r'(20\d{2})(\d{2})(\d{2})')
+
+# Data no começo da linha de texto ("15/01/2024 - cimento 200 reais", "15/01 cimento...")
+PADRAO_DATA_LINHA = re.compile(r'^\s*(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\s*[-–:]?\s+')
+
+# Limite de download de arquivos pela Bot API (bytes)
+TELEGRAM_TAMANHO_MAX_ARQUIVO = 20 * 1024 * 1024
+
+MODULOS_BOT = {'railway': 'bot_telegram_railway', 'v4': 'bot_telegram_v4'}
+
+
+def _data(dia, mes, ano):
+    """dd/mm/aaaa, ou None se não for uma data válida"""
+    try:
+        return datetime(int(ano), int(mes), int(dia)).strftime('%d/%m/%Y')
+    except ValueError:
+        return None
+
+
+def data_do_arquivo(nome):
+    """Data de gravação pelo nome do arquivo (None se não houver)"""
+    achado = PADRAO_DATA_ARQUIVO.search(os.path.basename(nome))
+    return achado and _data(achado.group(3), achado.group(2), achado.group(1))
+
+
+def data_da_linha(linha):
+    """Separa a data do começo da linha: (data ou None, resto do texto)"""
+    achado = PADRAO_DATA_LINHA.match(linha)
+    if not achado:
+        return None, linha.strip()
+    dia, mes, ano = achado.groups()
+    if ano is None:
+        ano = datetime.now().year
+    elif len(ano) == 2:
+        ano = f"20{ano}"
+    data = _data(dia, mes, ano)
+    if data is None:
+        return None, linha.strip()
+    return data, linha[achado.end():].strip()
+
+
+class ItemImportacao:
+    """Um áudio (aberto só na hora de processar) ou uma linha de texto"""
+
+    def __init__(self, nome, data=None, texto=None, abrir=None, tamanho=0, repeticao=0):
+        self.nome = nome
+        self.data = data
+        self.texto = texto
+        self.abrir = abrir
+        self.tamanho = tamanho
+        self.repeticao = repeticao      # linhas iguais (mesma data e texto) antes desta
+
+    @property
+    def audio(self):
+        return self.abrir is not None
+
+
+def _buffer(origem, tamanho):
+    """Copia um arquivo aberto para um buffer em memória (disco só acima do limite)"""
+    buffer = novo_buffer(tamanho)
+    with origem:
+        for bloco in iter(lambda: origem.read(64 * 1024), b''):
+            buffer.write(bloco)
+    buffer.seek(0)
+    return buffer
+
+
+def listar_itens(caminho):
+    """Itens de uma pasta, de um zip de áudios ou de um arquivo de texto (ordem do nome)"""
+    if os.path.isdir(caminho):
+        nomes = sorted(
+            nome for nome in os.listdir(caminho)
+            if nome.lower().endswith(EXTENSOES_AUDIO) and os.path.isfile(os.path.join(caminho, nome))
+        )
+        itens = []
+        for nome in nomes:
+            arquivo = os.path.join(caminho, nome)
+            tamanho = os.path.getsize(arquivo)
+            itens.append(ItemImportacao(
+                nome, data_do_arquivo(nome), tamanho=tamanho,
+                abrir=lambda arquivo=arquivo, tamanho=tamanho: _buffer(open(arquivo, 'rb'), tamanho)
+            ))
+        return itens
+
+    if zipfile.is_zipfile(caminho):
+        arquivo_zip = zipfile.ZipFile(caminho)
+        membros = sorted(
+            (m for m in arquivo_zip.infolist()
+             if not m.is_dir() and m.filename.lower().endswith(EXTENSOES_AUDIO)),
+            key=lambda m: m.filename
+        )
+        return [
+            ItemImportacao(
+                m.filename, data_do_arquivo(m.filename), tamanho=m.file_size,
+                abrir=lambda m=m: _buffer(arquivo_zip.open(m), m.file_size)
+            )
+            for m in membros
+        ]
+
+    with open(caminho, encoding='utf-8-sig', errors='replace') as arquivo:
+        linhas = arquivo.read().splitlines()
+    itens = []
+    vistas = Counter()
+    for numero, linha in enumerate(linhas, 1):
+        if not linha.strip() or linha.lstrip().startswith('#'):
+            continue
+        data, texto = data_da_linha(linha)
+        if texto:
+            itens.append(ItemImportacao(f"linha {numero}", data, texto=texto, repeticao=vistas[data, texto]))
+            vistas[data, texto] += 1
+    return itens
+
+
+class RelatorioImportacao:
+    """Andamento e resultado de uma importação"""
+
+    def __init__(self, total):
+        self.total = total
+        self.importados = 0
+        self.duplicados = 0
+        self.transcritos = 0
+        self.falhas = []            # (nome do item, erro)
+        self.obras = Counter()
+        self.inicio = time.perf_counter()
+        self.fim = None
+
+    @property
+    def concluidos(self):
+        return self.importados + self.duplicados + len(self.falhas)
+
+    @property
+    def segundos(self):
+        return (self.fim or time.perf_counter()) - self.inicio
+
+    @property
+    def vazao(self):
+        return self.concluidos / self.segundos if self.segundos > 0 else 0.0
+
+    def linha_progresso(self):
+        return (f"📥 {self.concluidos}/{self.total} itens | {self.importados} importados, "
+                f"{self.duplicados} já registrados, {len(self.falhas)} falhas | {self.vazao:.1f} itens/s")
+
+    def texto(self, max_falhas=20):
+        """Relatório final (texto puro: nomes de arquivo podem ter "_" e "*")"""
+        linhas = [
+            f"✅ Importação concluída: {self.concluidos}/{self.total} itens em {self.segundos:.1f}s "
+            f"({self.vazao:.1f} itens/s)",
+            f"• Importados: {self.importados} ({self.transcritos} áudios transcritos)",
+            f"• Já registrados antes: {self.duplicados}",
+            f"• Falhas: {len(self.falhas)}",
+        ]
+        if self.obras:
+            linhas.append("🏗️ Obras: " + ", ".join(f"{obra} ({n})" for obra, n in self.obras.most_common()))
+        if self.falhas:
+            linhas.append("❌ Itens com falha:")
+            linhas += [f"• {nome}: {erro[:150]}" for nome, erro in self.falhas[:max_falhas]]
+            if len(self.falhas) > max_falhas:
+                linhas.append(f"• ... e mais {len(self.falhas) - max_falhas}")
+        return '\n'.join(linhas)
+
+
+class Importador:
+    """Processa os itens em paralelo e grava na ordem da lista
+
+    transcrever(buffer) -> texto e extrair(texto) -> dados são as funções
+    assíncronas do bot; gravar(dados, chave, data, texto) grava no livro e
+    retorna o resultado guardado no cache (com "obra")
+    """
+
+    def __init__(self, transcrever, extrair, gravar, cache=None, concorrencia=IMPORTACAO_CONCORRENCIA):
+        self.transcrever = transcrever
+        self.extrair = extrair
+        self.gravar = gravar
+        self.cache = cache
+        self.concorrencia = max(1, concorrencia)
+
+    async def executar(self, itens, ao_progresso=None):
+        """Importa todos os itens; ao_progresso(relatorio) é chamado a cada item"""
+        relatorio = RelatorioImportacao(len(itens))
+        prontos = {}        # índice -> (hash, texto, dados, anterior) ou exceção, aguardando a vez
+        proximo = 0
+
+        def entregar(indice, pronto):
+            nonlocal proximo
+            prontos[indice] = pronto
+            # Grava em ordem: um item lento segura só a gravação dos seguintes
+            while proximo in prontos:
+                self._gravar(itens[proximo], prontos.pop(proximo), relatorio)
+                proximo += 1
+                if ao_progresso is not None:
+                    ao_progresso(relatorio)
+
+        pendentes = iter(enumerate(itens))
+
+        async def trabalhador():
+            for indice, item in pendentes:
+                try:
+                    pronto = await self._preparar(item, relatorio)
+                except Exception as e:
+                    pronto = e
+                entregar(indice, pronto)
+
+        await asyncio.gather(*(trabalhador() for _ in range(min(self.concorrencia, len(itens)) or 1)))
+        relatorio.fim = time.perf_counter()
+        return relatorio
+
+    async def _preparar(self, item, relatorio):
+        """Transcrição e extração (com cache); retorna (hash, texto, dados, anterior)"""
+        if item.audio:
+            if item.tamanho > IMPORTACAO_TAMANHO_MAX:
+                raise ValueError(f"áudio grande demais ({item.tamanho // 1024} KB)")
+            with await em_thread(item.abrir) as audio:
+                hash_conteudo = hash_audio(audio)
+                anterior = self._buscar(hash_conteudo)
+                if anterior and anterior['resultado']:
+                    return hash_conteudo, None, None, anterior
+                if anterior and anterior['transcricao']:
+                    texto = anterior['transcricao']
+                else:
+                    texto = await self.transcrever(audio)
+                    relatorio.transcritos += 1
+                    self._salvar(hash_conteudo, transcricao=texto)
+        else:
+            # Linha de texto: a mesma frase repetida na lista é outro lançamento
+            texto = item.texto
+            hash_conteudo = hashlib.sha256(f"{item.data}\n{texto}\n{item.repeticao}".encode('utf-8')).hexdigest()
+            anterior = self._buscar(hash_conteudo)
+            if anterior and anterior['resultado']:
+                return hash_conteudo, None, None, anterior
+
+        if anterior and anterior['dados']:
+            dados = anterior['dados']
+        else:
+            dados = await self.extrair(texto)
+            self._salvar(hash_conteudo, dados=dados)
+        return hash_conteudo, texto, dados, None
+
+    def _gravar(self, item, pronto, relatorio):
+        if isinstance(pronto, Exception):
+            relatorio.falhas.append((item.nome, str(pronto) or type(pronto).__name__))
+            return
+        hash_conteudo, texto, dados, anterior = pronto
+        if anterior is not None:
+            relatorio.duplicados += 1
+            return
+        try:
+            resultado = self.gravar(dict(dados), chave_idempotencia(hash_conteudo), item.data, texto)
+        except Exception as e:
+            relatorio.falhas.append((item.nome, str(e) or type(e).__name__))
+            return
+        self._salvar(hash_conteudo, resultado=resultado)
+        relatorio.importados += 1
+        relatorio.obras[resultado.get('obra', '?')] += 1
+
+    def _buscar(self, hash_conteudo):
+        return self.cache.buscar(hash_conteudo=hash_conteudo) if self.cache is not None else None
+
+    def _salvar(self, hash_conteudo, **campos):
+        if self.cache is not None:
+            self.cache.salvar(hash_conteudo, **campos)
+
+
+def criar_comando_importar(importar):
+    """Handler do /importar: na legenda de um .zip/.txt ou em resposta a um deles
+
+    importar(caminho, ao_progresso) é a função de importação do bot
+    """
+
+    async def comando_importar(update, context):
+        mensagem = update.message
+        documento = mensagem.document
+        if documento is None and mensagem.reply_to_message is not None:
+            documento = mensagem.reply_to_message.document
+        nome = os.path.basename((documento.file_name if documento else None) or 'importacao')
+        if documento is None or not nome.lower().endswith(('.zip', '.txt')):
+            await mensagem.reply_text(
+                "Use /importar na legenda de um arquivo .zip com áudios (.ogg/.opus) ou de um "
+                ".txt com um lançamento por linha, ou responda a um desses arquivos com /importar."
+            )
+            return
+        if documento.file_size and documento.file_size > TELEGRAM_TAMANHO_MAX_ARQUIVO:
+            await mensagem.reply_text(
+                "❌ Arquivo grande demais para o Telegram (máximo 20 MB). "
+                "Divida em partes ou use: python importacao.py <arquivo>"
+            )
+            return
+
+        progresso = ProgressoMensagem(mensagem)
+        progresso.atualizar(f"📥 Recebendo {nome}...")
+        try:
+            with tempfile.TemporaryDirectory(prefix='importacao_') as pasta:
+                caminho = os.path.join(pasta, nome)
+                arquivo = await documento.get_file()
+                await arquivo.download_to_drive(caminho)
+                relatorio = await importar(
+                    caminho, ao_progresso=lambda r: progresso.atualizar(r.linha_progresso())
+                )
+            progresso.concluir(relatorio.texto())
+        except Exception as e:
+            print(f"❌ Erro na importação: {e}")
+            progresso.concluir(f"❌ Erro na importação: {str(e)}")
+
+    return comando_importar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa áudios (.ogg/.opus) ou uma lista de lançamentos")
+    parser.add_argument('caminho', help="pasta ou zip de áudios, ou arquivo de texto (um lançamento por linha)")
+    parser.add_argument('--bot', choices=sorted(MODULOS_BOT), default='railway',
+                        help="bot cujas funções, livro e planilhas são usados")
+    parser.add_argument('--concorrencia', type=int, default=IMPORTACAO_CONCORRENCIA)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.caminho):
+        print(f"❌ Não encontrado: {args.caminho}")
+        return 1
+
+    bot = importlib.import_module(MODULOS_BOT[args.bot])
+    ultima = 0.0
+
+    def mostrar(relatorio):
+        nonlocal ultima
+        if time.perf_counter() - ultima >= 1 or relatorio.concluidos == relatorio.total:
+            ultima = time.perf_counter()
+            print(relatorio.linha_progresso(), flush=True)
+
+    # Só grava no livro: quem envia às planilhas é o sincronizador do bot em
+    # execução (um segundo sincronizador no mesmo livro poderia anexar em dobro)
+    relatorio = asyncio.run(bot.importar(args.caminho, ao_progresso=mostrar, concorrencia=args.concorrencia))
+
+    print(relatorio.texto(max_falhas=len(relatorio.falhas)))
+    pendentes = bot.livro.estado_sincronizacao()['pendentes']
+    if pendentes:
+        print(f"📤 {pendentes} lançamentos no livro aguardando o bot enviá-los às planilhas "
+              f"(o bot em execução envia em segundos; parado, envia ao iniciar)")
+    return 1 if relatorio.falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limitador de requisições para as cotas do Google Sheets/Drive
+Baldes de tokens separados para leitura e escrita: quem chega espera a
+sua vez (ordem de chegada) em vez de receber erro 429
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+# ========== CONFIGURAÇÕES ==========
+# Cota padrão do Sheets: 60 leituras e 60 escritas por minuto por usuário
+GOOGLE_LEITURAS_POR_MINUTO = int(os.environ.get('GOOGLE_LEITURAS_POR_MINUTO', '60'))
+GOOGLE_ESCRITAS_POR_MINUTO = int(os.environ.get('GOOGLE_ESCRITAS_POR_MINUTO', '60'))
+
+# Requisições que podem sair de uma vez antes do ritmo constante
+GOOGLE_RAJADA = int(os.environ.get('GOOGLE_RAJADA', '10'))
+
+# Métodos HTTP que consomem a cota de escrita
+METODOS_ESCRITA = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+class BaldeTokens:
+    """Balde de tokens com fila justa (atende na ordem de chegada)"""
+
+    def __init__(self, por_minuto, rajada=GOOGLE_RAJADA):
+        self.por_minuto = por_minuto
+        self.taxa = por_minuto / 60.0
+        self.capacidade = max(1, min(rajada, por_minuto))
+        self._tokens = float(self.capacidade)
+        self._ultima_reposicao = time.monotonic()
+        self._livre_em = 0.0
+        self._cond = threading.Condition()
+        self._proximo_ticket = 0
+        self._ticket_atendido = 0
+
+        # Contadores
+        self.concedidos = 0
+        self.esperas = 0
+        self.tempo_espera = 0.0
+        self.aguardando = 0
+        self._ultimo_minuto = deque()
+
+    def adquirir(self):
+        """Bloqueia até haver um token disponível para este chamador"""
+        inicio = time.monotonic()
+
+        with self._cond:
+            ticket = self._proximo_ticket
+            self._proximo_ticket += 1
+            self.aguardando += 1
+
+            while True:
+                if ticket == self._ticket_atendido:
+                    agora = time.monotonic()
+                    self._repor(agora)
+                    if self._tokens >= 1 and agora >= self._livre_em:
+                        break
+                    faltam = max((1 - self._tokens) / self.taxa, self._livre_em - agora)
+                    self._cond.wait(timeout=faltam)
+                else:
+                    self._cond.wait()
+
+            self._tokens -= 1
+            self._ticket_atendido += 1
+            self.aguardando -= 1
+            self.concedidos += 1
+            espera = time.monotonic() - inicio
+            if espera > 0.001:
+                self.esperas += 1
+                self.tempo_espera += espera
+            self._ultimo_minuto.append(time.monotonic())
+            self._cond.notify_all()
+
+    def pausar(self, segundos):
+        """Segura o balde por um tempo (ex: após um 429 com Retry-After)"""
+        with self._cond:
+            self._livre_em = max(self._livre_em, time.monotonic() + segundos)
+            self._tokens = min(self._tokens, 0.0)
+
+    def uso_ultimo_minuto(self):
+        """Requisições concedidas nos últimos 60 segundos"""
+        with self._cond:
+            limite = time.monotonic() - 60
+            while self._ultimo_minuto and self._ultimo_minuto[0] < limite:
+                self._ultimo_minuto.popleft()
+            return len(self._ultimo_minuto)
+
+    def _repor(self, agora):
+        """Repõe os tokens proporcionalmente ao tempo decorrido"""
+        decorrido = agora - self._ultima_reposicao
+        self._tokens = min(self.capacidade, self._tokens + decorrido * self.taxa)
+        self._ultima_reposicao = agora
+
+
+class LimitadorGoogle:
+    """Baldes de leitura e escrita para todas as chamadas ao Google"""
+
+    def __init__(self,
+                 leituras_por_minuto=GOOGLE_LEITURAS_POR_MINUTO,
+                 escritas_por_minuto=GOOGLE_ESCRITAS_POR_MINUTO):
+        self.leitura = BaldeTokens(leituras_por_minuto)
+        self.escrita = BaldeTokens(escritas_por_minuto)
+        self.erros_429 = 0
+
+    def balde(self, metodo):
+        """Escolhe o balde pelo método HTTP da requisição"""
+        return self.escrita if metodo.upper() in METODOS_ESCRITA else self.leitura
+
+    def registrar_429(self, metodo, segundos):
+        """Conta um 429 e pausa o balde correspondente"""
+        self.erros_429 += 1
+        self.balde(metodo).pausar(segundos)
+
+    def contadores(self):
+        """Resumo do uso das cotas (para /status e logs)"""
+        resumo = {"erros_429": self.erros_429}
+        for nome, balde in (("leitura", self.leitura), ("escrita", self.escrita)):
+            resumo[nome] = {
+                "ultimo_minuto": balde.uso_ultimo_minuto(),
+                "cota_minuto": balde.por_minuto,
+                "concedidos": balde.concedidos,
+                "esperas": balde.esperas,
+                "tempo_espera": round(balde.tempo_espera, 2),
+                "aguardando": balde.aguardando,
+            }
+        return resumo
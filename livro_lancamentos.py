@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Livro local de lançamentos (gastos e pagamentos) em SQLite
+É o registro oficial: cada áudio é gravado aqui primeiro e a confirmação
+sai na hora; as abas Gastos/Pagamentos do Google são uma cópia mantida
+pelo sincronizador em segundo plano
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from registro_obras import chave_obra
+from totais_obras import TotaisObras
+
+# ========== CONFIGURAÇÕES ==========
+LIVRO_LANCAMENTOS_DB = os.environ.get('LIVRO_LANCAMENTOS_DB', 'lancamentos.db')
+
+# Aba de destino de cada tipo de lançamento
+ABAS = {'gasto': 'Gastos', 'pagamento': 'Pagamentos'}
+
+CAMPOS = ('data', 'descricao', 'categoria', 'funcionario', 'funcao', 'valor', 'observacoes')
+
+# Pendente: depois do cursor da aba e ainda não copiado (as linhas lidas das
+# planilhas já entram sincronizadas, mesmo depois de pendentes mais antigos)
+PENDENTES = "LEFT JOIN cursores c ON c.chave_obra = l.chave_obra AND c.aba = l.aba"
+PENDENTE = "l.id > COALESCE(c.ultimo_id, 0) AND l.sincronizado_em IS NULL"
+
+
+def data_iso(data):
+    """Converte DD/MM/AAAA em AAAA-MM-DD (para ordenar e filtrar por data)"""
+    try:
+        return datetime.strptime(data, '%d/%m/%Y').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def valor_numerico(valor):
+    """Converte 200, "200.50", "R$ 1.500,00" etc. em float (0 se ilegível)"""
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = re.sub(r'[^\d,.-]', '', str(valor or ''))
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    elif re.fullmatch(r'\d{1,3}(\.\d{3})+', texto):
+        texto = texto.replace('.', '')
+    try:
+        return float(texto)
+    except ValueError:
+        return 0.0
+
+
+def disco_efemero(caminho):
+    """True no Railway quando o arquivo não está no volume montado (some a cada deploy)"""
+    if not os.environ.get('RAILWAY_ENVIRONMENT'):
+        return False
+    volume = os.environ.get('RAILWAY_VOLUME_MOUNT_PATH')
+    if not volume:
+        return True
+    volume = os.path.abspath(volume)
+    return os.path.commonpath([os.path.abspath(caminho), volume]) != volume
+
+
+class LivroLancamentos:
+    """Lançamentos por obra, com cursor de sincronização por aba"""
+
+    def __init__(self, caminho=LIVRO_LANCAMENTOS_DB):
+        self.caminho = caminho
+        arquivo_novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        marcas_novas = not self._conexao.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'importacoes'").fetchone()
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS lancamentos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chave TEXT NOT NULL UNIQUE,
+                obra TEXT NOT NULL,
+                chave_obra TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                aba TEXT NOT NULL,
+                data TEXT,
+                data_iso TEXT,
+                descricao TEXT,
+                categoria TEXT,
+                funcionario TEXT,
+                funcao TEXT,
+                valor REAL NOT NULL DEFAULT 0,
+                observacoes TEXT,
+                linha_planilha TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                sincronizado_em REAL,
+                linha INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_lanc_obra ON lancamentos (chave_obra, aba, id);
+            CREATE INDEX IF NOT EXISTS idx_lanc_data ON lancamentos (data_iso);
+            CREATE INDEX IF NOT EXISTS idx_lanc_tipo ON lancamentos (tipo);
+            CREATE INDEX IF NOT EXISTS idx_lanc_categoria ON lancamentos (categoria);
+            CREATE INDEX IF NOT EXISTS idx_lanc_funcionario ON lancamentos (funcionario);
+
+            CREATE TABLE IF NOT EXISTS cursores (
+                chave_obra TEXT NOT NULL,
+                aba TEXT NOT NULL,
+                ultimo_id INTEGER NOT NULL DEFAULT 0,
+                falhas INTEGER NOT NULL DEFAULT 0,
+                ultimo_erro TEXT,
+                atualizado_em REAL,
+                PRIMARY KEY (chave_obra, aba)
+            );
+
+            CREATE TABLE IF NOT EXISTS importacoes (
+                chave_obra TEXT NOT NULL,
+                aba TEXT NOT NULL,
+                linhas INTEGER NOT NULL DEFAULT 0,
+                importado_em REAL NOT NULL,
+                PRIMARY KEY (chave_obra, aba)
+            );
+        """)
+        if marcas_novas:
+            # Livro de antes das marcas: as obras que ele já tem contam como lidas
+            self._conexao.executemany(
+                "INSERT OR IGNORE INTO importacoes (chave_obra, aba, importado_em) "
+                "SELECT DISTINCT chave_obra, ?, ? FROM lancamentos",
+                [(aba, time.time()) for aba in ABAS.values()]
+            )
+        self._conexao.commit()
+        self.vazio = arquivo_novo or not self._conexao.execute("SELECT 1 FROM lancamentos LIMIT 1").fetchone()
+        self._avisar_armazenamento()
+
+        # Totais por obra em memória (uma consulta agora, atualização a cada lançamento)
+        self.totais = TotaisObras()
+        self.totais.carregar(self._conexao)
+
+    def _avisar_armazenamento(self):
+        """Avisa no log quando o livro pode ter perdido lançamentos ainda não sincronizados"""
+        if disco_efemero(self.caminho):
+            print(f"🚨 ATENÇÃO: o livro de lançamentos ({os.path.abspath(self.caminho)}) está no disco "
+                  "temporário do Railway e é apagado a cada deploy, junto com os lançamentos ainda não "
+                  "copiados para as planilhas. Crie um volume e aponte LIVRO_LANCAMENTOS_DB, "
+                  "CACHE_PROCESSAMENTO_DB e REGISTRO_OBRAS_DB para ele (ex: /data/lancamentos.db)")
+        if self.vazio:
+            print(f"🚨 ATENÇÃO: livro de lançamentos novo ou vazio em {os.path.abspath(self.caminho)}. "
+                  "Se o bot já estava em uso, o arquivo anterior se perdeu: lançamentos que ainda "
+                  "estavam pendentes não chegaram às planilhas e precisam ser enviados de novo")
+
+    def registrar(self, obra, tipo, linha_planilha, chave=None, **campos):
+        """Grava um lançamento; retorna (id, novo) — chave repetida não duplica
+
+        linha_planilha: valores da linha como vão para a aba (sem a coluna ID)
+        campos: data, descricao, categoria, funcionario, funcao, valor, observacoes
+        """
+        chave = chave or uuid.uuid4().hex[:16]
+        dados = {campo: campos.get(campo) for campo in CAMPOS}
+        dados['valor'] = valor_numerico(dados['valor'])
+
+        with self._lock:
+            cursor = self._conexao.execute(
+                "INSERT OR IGNORE INTO lancamentos (chave, obra, chave_obra, tipo, aba, data, data_iso, "
+                "descricao, categoria, funcionario, funcao, valor, observacoes, linha_planilha, criado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave, obra, chave_obra(obra), tipo, ABAS[tipo], dados['data'], data_iso(dados['data']),
+                 dados['descricao'], dados['categoria'], dados['funcionario'], dados['funcao'],
+                 dados['valor'], dados['observacoes'],
+                 json.dumps(linha_planilha, ensure_ascii=False), time.time())
+            )
+            self._conexao.commit()
+            if cursor.rowcount:
+                self.totais.atualizar(self._conexao)
+                return cursor.lastrowid, True
+
+            existente = self._conexao.execute(
+                "SELECT id FROM lancamentos WHERE chave = ?", (chave,)
+            ).fetchone()
+            return existente['id'], False
+
+    def importar(self, obra, linhas):
+        """Copia para o livro, já como sincronizadas, as linhas que estão nas abas da obra
+
+        Cada aba é lida uma vez só (marca em `importacoes`), mesmo que o livro já
+        tenha lançamentos da obra gravados antes da leitura: esses continuam
+        pendentes e IDs (coluna F) que o livro já conhece são pulados.
+        linhas: {tipo: [(número da linha, [data, nome, grupo, valor,
+        observações, ID])]}. Retorna quantos lançamentos entraram
+        """
+        destino = chave_obra(obra)
+        agora = time.time()
+        importados = 0
+        with self._lock:
+            # Trava a escrita (outros processos também gravam no livro) antes de conferir
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                lidas = {aba for (aba,) in self._conexao.execute(
+                    "SELECT aba FROM importacoes WHERE chave_obra = ?", (destino,))}
+
+                for tipo, linhas_aba in linhas.items():
+                    aba = ABAS[tipo]
+                    if aba in lidas:
+                        continue
+                    ultimo_id, linhas_lidas = 0, 0
+                    for numero, valores in linhas_aba:
+                        valores = [v if isinstance(v, (int, float)) else str(v).strip()
+                                   for v in (list(valores) + [''] * 6)[:6]]
+                        data, nome, grupo, valor, observacoes, chave = valores
+                        if not (data or nome or valor):
+                            continue
+                        campos = ('descricao', 'categoria') if tipo == 'gasto' else ('funcionario', 'funcao')
+                        dados = dict(zip(campos, (nome, grupo)))
+                        cursor = self._conexao.execute(
+                            "INSERT OR IGNORE INTO lancamentos (chave, obra, chave_obra, tipo, aba, data, "
+                            "data_iso, descricao, categoria, funcionario, funcao, valor, observacoes, "
+                            "linha_planilha, criado_em, sincronizado_em, linha) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (chave or f"planilha:{destino}:{aba}:{numero}", obra, destino, tipo, aba,
+                             data, data_iso(data), dados.get('descricao'), dados.get('categoria'),
+                             dados.get('funcionario'), dados.get('funcao'), valor_numerico(valor),
+                             observacoes, json.dumps(valores[:5], ensure_ascii=False), agora, agora, numero)
+                        )
+                        if cursor.rowcount:
+                            linhas_lidas += 1
+                            ultimo_id = cursor.lastrowid
+                    importados += linhas_lidas
+                    self._conexao.execute(
+                        "INSERT INTO importacoes (chave_obra, aba, linhas, importado_em) VALUES (?, ?, ?, ?)",
+                        (destino, aba, linhas_lidas, agora)
+                    )
+
+                    # Nada pendente nessa aba: o cursor já fica depois das linhas importadas
+                    # (com pendentes, ele espera por eles; as importadas não são reenviadas)
+                    if ultimo_id and not self._conexao.execute(f"""
+                            SELECT 1 FROM lancamentos l {PENDENTES}
+                            WHERE l.chave_obra = ? AND l.aba = ? AND {PENDENTE} LIMIT 1
+                            """, (destino, aba)).fetchone():
+                        self._conexao.execute("""
+                            INSERT INTO cursores (chave_obra, aba, ultimo_id, falhas, atualizado_em)
+                            VALUES (?, ?, ?, 0, ?)
+                            ON CONFLICT (chave_obra, aba) DO UPDATE SET
+                                ultimo_id = MAX(ultimo_id, excluded.ultimo_id),
+                                atualizado_em = excluded.atualizado_em
+                        """, (destino, aba, ultimo_id, agora))
+                self._conexao.commit()
+            except Exception:
+                self._conexao.rollback()
+                raise
+            self.totais.atualizar(self._conexao)
+        return importados
+
+    def importado(self, obra):
+        """As abas da obra já foram lidas para o livro (ou o livro já a tinha)?"""
+        with self._lock:
+            lidas = self._conexao.execute(
+                "SELECT COUNT(*) FROM importacoes WHERE chave_obra = ?", (chave_obra(obra),)
+            ).fetchone()[0]
+        return lidas >= len(ABAS)
+
+    def resumo(self, obra):
+        """Totais da obra em memória, incluindo lançamentos de outros processos"""
+        with self._lock:
+            self.totais.atualizar(self._conexao)
+        return self.totais.resumo(obra)
+
+    def obras(self):
+        """Nomes das obras com lançamentos (também as gravadas por outros processos)"""
+        with self._lock:
+            self.totais.atualizar(self._conexao)
+        return self.totais.obras()
+
+    def buscar(self, chave):
+        """Lançamento com a chave de idempotência informada (ou None)"""
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT * FROM lancamentos WHERE chave = ?", (chave,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    # ========== SINCRONIZAÇÃO ==========
+
+    def destinos_pendentes(self):
+        """Abas (obra, aba) com lançamentos depois do cursor: [(chave_obra, obra, aba)]"""
+        with self._lock:
+            return [tuple(linha) for linha in self._conexao.execute(f"""
+                SELECT l.chave_obra, MAX(l.obra), l.aba
+                FROM lancamentos l
+                {PENDENTES}
+                WHERE {PENDENTE}
+                GROUP BY l.chave_obra, l.aba
+                ORDER BY MIN(l.id)
+            """)]
+
+    def pendentes(self, chave_obra_destino, aba, limite):
+        """Lançamentos ainda não copiados para a aba: [(id, chave, linha)]"""
+        with self._lock:
+            linhas = self._conexao.execute(f"""
+                SELECT l.id, l.chave, l.linha_planilha
+                FROM lancamentos l {PENDENTES}
+                WHERE l.chave_obra = ? AND l.aba = ? AND {PENDENTE}
+                ORDER BY l.id LIMIT ?
+            """, (chave_obra_destino, aba, limite)).fetchall()
+        return [(linha['id'], linha['chave'], json.loads(linha['linha_planilha'])) for linha in linhas]
+
+    def marcar_sincronizados(self, chave_obra_destino, aba, linhas):
+        """Grava a linha da planilha de cada lançamento e avança o cursor
+
+        linhas: [(id, numero_da_linha)]
+        """
+        if not linhas:
+            return
+        agora = time.time()
+        with self._lock:
+            self._conexao.executemany(
+                "UPDATE lancamentos SET sincronizado_em = ?, linha = ? WHERE id = ?",
+                [(agora, numero, id_lanc) for id_lanc, numero in linhas]
+            )
+            self._conexao.execute("""
+                INSERT INTO cursores (chave_obra, aba, ultimo_id, falhas, ultimo_erro, atualizado_em)
+                VALUES (?, ?, ?, 0, NULL, ?)
+                ON CONFLICT (chave_obra, aba) DO UPDATE SET
+                    ultimo_id = MAX(ultimo_id, excluded.ultimo_id),
+                    falhas = 0, ultimo_erro = NULL, atualizado_em = excluded.atualizado_em
+            """, (chave_obra_destino, aba, max(id_lanc for id_lanc, _ in linhas), agora))
+            self._conexao.commit()
+
+    def marcar_falha(self, chave_obra_destino, aba, erro):
+        """Registra uma falha de sincronização (o cursor não anda)"""
+        with self._lock:
+            self._conexao.execute("""
+                INSERT INTO cursores (chave_obra, aba, ultimo_id, falhas, ultimo_erro, atualizado_em)
+                VALUES (?, ?, 0, 1, ?, ?)
+                ON CONFLICT (chave_obra, aba) DO UPDATE SET
+                    falhas = falhas + 1, ultimo_erro = excluded.ultimo_erro,
+                    atualizado_em = excluded.atualizado_em
+            """, (chave_obra_destino, aba, str(erro)[:500], time.time()))
+            self._conexao.commit()
+
+    def estado_sincronizacao(self):
+        """Resumo para /status: lançamentos, pendentes e último erro"""
+        with self._lock:
+            total = self._conexao.execute("SELECT COUNT(*) FROM lancamentos").fetchone()[0]
+            pendentes = self._conexao.execute(f"""
+                SELECT COUNT(*) FROM lancamentos l {PENDENTES}
+                WHERE {PENDENTE}
+            """).fetchone()[0]
+            erro = self._conexao.execute(
+                "SELECT ultimo_erro FROM cursores WHERE ultimo_erro IS NOT NULL "
+                "ORDER BY atualizado_em DESC LIMIT 1"
+            ).fetchone()
+        return {
+            "lancamentos": total,
+            "pendentes": pendentes,
+            "ultimo_erro": erro[0] if erro else None,
+        }
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas de desempenho do bot
+Histogramas por etapa (download, transcrição, extração, livro, chamadas
+ao Google e ao Telegram) com as amostras recentes para p50/p95, mais os
+contadores que cada componente já mantém (cache, novas tentativas, 429,
+fila), expostos no formato texto do Prometheus em /metricas
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telegram.request import HTTPXRequest
+
+# ========== CONFIGURAÇÕES ==========
+# Amostras recentes guardadas por série para o p50/p95 do /status
+METRICAS_JANELA = int(os.environ.get('METRICAS_JANELA', '500'))
+
+# Porta do /metricas no modo polling (vazio = desligado; no webhook usa a porta do servidor)
+METRICAS_PORTA = int(os.environ.get('METRICAS_PORTA', '0') or 0)
+
+# Limites (segundos) dos baldes dos histogramas
+LIMITES_HISTOGRAMA = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Nome das etapas no /status
+NOMES_ETAPAS = {
+    'download': 'Download',
+    'transcricao': 'Transcrição',
+    'extracao': 'Extração (LLM)',
+    'livro': 'Livro local',
+    'total': 'Total',
+}
+
+
+def percentil(ordenados, p):
+    """Percentil por posição de uma lista já ordenada"""
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def _rotulos(rotulos, extra=None):
+    itens = dict(rotulos)
+    if extra:
+        itens.update(extra)
+    if not itens:
+        return ''
+    conteudo = ','.join(
+        f'{nome}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for nome, valor in sorted(itens.items())
+    )
+    return '{' + conteudo + '}'
+
+
+class Histograma:
+    """Baldes acumulados (Prometheus) e as últimas amostras (percentis recentes)"""
+
+    def __init__(self, janela=METRICAS_JANELA):
+        self.baldes = [0] * len(LIMITES_HISTOGRAMA)
+        self.soma = 0.0
+        self.quantidade = 0
+        self.recentes = deque(maxlen=janela)
+
+    def observar(self, valor):
+        self.soma += valor
+        self.quantidade += 1
+        self.recentes.append(valor)
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if valor <= limite:
+                self.baldes[i] += 1
+
+
+class Cronometro:
+    """Mede um trecho com `with` ou `async with` e registra no histograma"""
+
+    def __init__(self, metricas, nome, rotulos):
+        self.metricas = metricas
+        self.nome = nome
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        self.metricas.observar(self.nome, time.perf_counter() - self.inicio, **self.rotulos)
+        if tipo is not None:
+            self.metricas.contar(f"{self.nome.removesuffix('_segundos')}_erros_total", **self.rotulos)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, tipo, erro, rastro):
+        return self.__exit__(tipo, erro, rastro)
+
+
+class Metricas:
+    """Histogramas e contadores do processo, mais coletores dos componentes"""
+
+    def __init__(self, janela=METRICAS_JANELA):
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._histogramas = {}   # (nome, rótulos) -> Histograma
+        self._contadores = {}    # (nome, rótulos) -> valor
+        self._coletores = []
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma(self.janela)
+            histograma.observar(segundos)
+
+    def contar(self, nome, quantidade=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + quantidade
+
+    def medir(self, nome, **rotulos):
+        """Cronômetro para `with`/`async with`: metricas.medir('bot_etapa_segundos', etapa='livro')"""
+        return Cronometro(self, nome, rotulos)
+
+    def coletor(self, funcao):
+        """Registra funcao() -> [(nome, valor, rótulos)], lida a cada /metricas
+
+        Nomes terminados em _total viram counter; os demais, gauge
+        """
+        self._coletores.append(funcao)
+        return funcao
+
+    def recentes(self, nome, rotulo):
+        """{valor do rótulo: {"quantidade", "p50", "p95"}} das amostras recentes"""
+        with self._lock:
+            series = [(dict(r).get(rotulo), sorted(h.recentes))
+                      for (n, r), h in self._histogramas.items() if n == nome]
+        return {
+            valor: {"quantidade": len(amostras), "p50": percentil(amostras, 50), "p95": percentil(amostras, 95)}
+            for valor, amostras in series if amostras
+        }
+
+    def texto_prometheus(self):
+        """Todas as séries no formato de exposição texto do Prometheus"""
+        linhas = []
+        with self._lock:
+            histogramas = sorted(self._histogramas.items())
+            contadores = sorted(self._contadores.items())
+            baldes = {chave: (list(h.baldes), h.soma, h.quantidade) for chave, h in histogramas}
+
+        vistos = set()
+        for (nome, rotulos), (contagens, soma, quantidade) in baldes.items():
+            if nome not in vistos:
+                linhas.append(f"# TYPE {nome} histogram")
+                vistos.add(nome)
+            for limite, contagem in zip(LIMITES_HISTOGRAMA, contagens):
+                linhas.append(f"{nome}_bucket{_rotulos(rotulos, {'le': limite})} {contagem}")
+            linhas.append(f"{nome}_bucket{_rotulos(rotulos, {'le': '+Inf'})} {quantidade}")
+            linhas.append(f"{nome}_sum{_rotulos(rotulos)} {soma:.6f}")
+            linhas.append(f"{nome}_count{_rotulos(rotulos)} {quantidade}")
+
+        series = [(nome, valor, dict(rotulos)) for (nome, rotulos), valor in contadores]
+        for coletor in self._coletores:
+            try:
+                series.extend(coletor())
+            except Exception as e:
+                print(f"⚠️ Erro ao coletar métricas: {e}")
+        for nome, valor, rotulos in sorted(series, key=lambda s: s[0]):
+            if nome not in vistos:
+                linhas.append(f"# TYPE {nome} {'counter' if nome.endswith('_total') else 'gauge'}")
+                vistos.add(nome)
+            linhas.append(f"{nome}{_rotulos(rotulos)} {valor}")
+        return '\n'.join(linhas) + '\n'
+
+
+# Registro único do processo (importado pelos bots e pelos componentes)
+metricas = Metricas()
+
+
+class RequisicaoTelegramMedida(HTTPXRequest):
+    """Requisições à Bot API com o tempo de cada método (e do download de arquivos)"""
+
+    def __init__(self, connection_pool_size=256, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+
+    async def do_request(self, url, method, *args, **kwargs):
+        metodo = 'download' if '/file/' in url else url.rsplit('/', 1)[-1]
+        with metricas.medir('bot_telegram_segundos', metodo=metodo):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+def coletor_componentes(fila=None, cache=None, limitador=None, livro=None, sincronizador=None,
+                        agrupador=None, resolvedor=None, transporte=None):
+    """Coletor com os contadores que os componentes do bot já mantêm"""
+
+    def coletar():
+        series = []
+        if fila is not None:
+            series.append(('bot_fila_pendentes', fila.pendentes, {}))
+        if cache is not None:
+            series += [('bot_cache_acertos_total', cache.acertos, {}),
+                       ('bot_cache_falhas_total', cache.falhas, {})]
+        if limitador is not None:
+            cota = limitador.contadores()
+            series.append(('bot_google_429_total', cota['erros_429'], {}))
+            for tipo in ('leitura', 'escrita'):
+                series += [('bot_google_cota_ultimo_minuto', cota[tipo]['ultimo_minuto'], {'tipo': tipo}),
+                           ('bot_google_cota_aguardando', cota[tipo]['aguardando'], {'tipo': tipo}),
+                           ('bot_google_cota_esperas_total', cota[tipo]['esperas'], {'tipo': tipo})]
+        if livro is not None:
+            sinc = livro.estado_sincronizacao()
+            series += [('bot_livro_lancamentos', sinc['lancamentos'], {}),
+                       ('bot_livro_pendentes', sinc['pendentes'], {})]
+        if sincronizador is not None:
+            series += [('bot_sincronizacao_linhas_total', sincronizador.linhas_gravadas, {}),
+                       ('bot_sincronizacao_reconciliadas_total', sincronizador.linhas_reconciliadas, {}),
+                       ('bot_sincronizacao_importadas_total', sincronizador.linhas_importadas, {})]
+        if agrupador is not None:
+            series += [('bot_extracao_lotes_total', agrupador.lotes, {}),
+                       ('bot_extracao_em_lote_total', agrupador.itens_em_lote, {}),
+                       ('bot_extracao_individuais_total', agrupador.individuais, {})]
+        if resolvedor is not None:
+            series += [('bot_obras_resolvidas_total', resolvedor.resolvidas, {}),
+                       ('bot_obras_novas_total', resolvedor.novas, {})]
+        if transporte is not None:
+            series.append(('bot_openai_tentativas_extras_total', transporte.tentativas_extras, {}))
+        return series
+
+    return coletar
+
+
+def mensagem_etapas():
+    """Linhas do /status com p50/p95 recentes por etapa, Google e Telegram (Markdown)"""
+    linhas = []
+    etapas = metricas.recentes('bot_etapa_segundos', 'etapa')
+    espera = metricas.recentes('bot_fila_espera_segundos', 'etapa')
+    if etapas:
+        linhas.append(f"⏱️ *Etapas (últimos {metricas.janela}):* p50 / p95")
+        for etapa in sorted(etapas, key=lambda e: list(NOMES_ETAPAS).index(e) if e in NOMES_ETAPAS else 99):
+            dados = etapas[etapa]
+            linha = (f"• {NOMES_ETAPAS.get(etapa, etapa)}: {dados['p50']:.2f}s / {dados['p95']:.2f}s"
+                     f" ({dados['quantidade']})")
+            if etapa in espera and espera[etapa]['p95'] >= 0.05:
+                linha += f", fila {espera[etapa]['p50']:.2f}s / {espera[etapa]['p95']:.2f}s"
+            linhas.append(linha)
+
+    for titulo, nome, rotulo in (("☁️ *Google:*", 'bot_google_segundos', 'operacao'),
+                                 ("✈️ *Telegram:*", 'bot_telegram_segundos', 'metodo')):
+        series = metricas.recentes(nome, rotulo)
+        if series:
+            linhas.append(titulo)
+            linhas += [
+                f"• `{chave}`: {dados['p50']:.2f}s / {dados['p95']:.2f}s ({dados['quantidade']})"
+                for chave, dados in sorted(series.items())
+            ]
+    return '\n'.join(linhas)
+
+
+def servir_metricas(porta=METRICAS_PORTA):
+    """/metricas numa thread à parte (modo polling, que não tem servidor HTTP)"""
+
+    class Tratador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metricas':
+                self.send_error(404)
+                return
+            corpo = metricas.texto_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', TIPO_CONTEUDO)
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('0.0.0.0', porta), Tratador)
+    threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+    print(f"📈 Métricas em http://0.0.0.0:{porta}/metricas")
+    return servidor
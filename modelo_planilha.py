@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo declarativo das planilhas de obra
+Abas, cabeçalhos, larguras, formatos e fórmulas do Resumo descritos como
+dados e aplicados num único spreadsheet.batch_update
+"""
+
+import re
+
+# ========== CORES E FORMATOS ==========
+CINZA = {"red": 0.8, "green": 0.8, "blue": 0.8}
+AZUL = {"red": 0.2, "green": 0.38, "blue": 0.57}
+BRANCO = {"red": 1, "green": 1, "blue": 1}
+MOEDA = {"type": "CURRENCY", "pattern": "R$ #,##0.00"}
+
+# ========== MODELOS ==========
+# Cada aba recebe um sheetId fixo: a primeira reaproveita a "Sheet1" (id 0)
+# criada junto com a planilha, as outras são adicionadas no mesmo lote.
+# Fórmulas usam nomes em inglês (SUM), aceitos pela API em qualquer idioma.
+# A coluna ID guarda a chave de idempotência do áudio que gerou a linha.
+
+MODELO_RAILWAY = {
+    "abas": [
+        {
+            "titulo": "Gastos",
+            "linhas": 1000,
+            "colunas": 6,
+            "valores": [
+                ("A1", "GASTOS - OBRA: {obra}"),
+                ("A2:F2", [["Data", "Descrição", "Categoria", "Valor", "Observações", "ID"]]),
+            ],
+            "formatos": [
+                ("A1", {"textFormat": {"bold": True, "fontSize": 14}, "horizontalAlignment": "CENTER"}),
+                ("A2:F2", {"textFormat": {"bold": True}, "backgroundColor": CINZA}),
+            ],
+            "larguras": [100, 300, 150, 120, 300, 130],
+        },
+        {
+            "titulo": "Pagamentos",
+            "linhas": 1000,
+            "colunas": 6,
+            "valores": [
+                ("A1", "PAGAMENTOS - OBRA: {obra}"),
+                ("A2:F2", [["Data", "Funcionário", "Função", "Valor", "Observações", "ID"]]),
+            ],
+            "formatos": [
+                ("A1", {"textFormat": {"bold": True, "fontSize": 14}, "horizontalAlignment": "CENTER"}),
+                ("A2:F2", {"textFormat": {"bold": True}, "backgroundColor": CINZA}),
+            ],
+            "larguras": [100, 200, 150, 120, 300, 130],
+        },
+        {
+            "titulo": "Resumo",
+            "linhas": 100,
+            "colunas": 5,
+            "valores": [
+                ("A1", "RESUMO - OBRA: {obra}"),
+                ("A3:B6", [
+                    ["Total de Gastos:", "=SUM(Gastos!D:D)"],
+                    ["Total de Pagamentos:", "=SUM(Pagamentos!D:D)"],
+                    ["", ""],
+                    ["TOTAL GERAL:", "=B3+B4"],
+                ]),
+            ],
+            "formatos": [
+                ("A1", {"textFormat": {"bold": True, "fontSize": 14}, "horizontalAlignment": "CENTER"}),
+                ("A3:A6", {"textFormat": {"bold": True}}),
+                ("B6", {"textFormat": {"bold": True, "fontSize": 12},
+                        "backgroundColor": {"red": 1, "green": 0.9, "blue": 0.6}}),
+            ],
+        },
+    ]
+}
+
+MODELO_V4 = {
+    "abas": [
+        {
+            "titulo": "Gastos",
+            "linhas": 1000,
+            "colunas": 6,
+            "valores": [
+                ("A1", "GASTOS - OBRA: {obra}"),
+                ("A2:F2", [["Data", "Descrição do Item", "Categoria", "Valor (R$)", "Observações", "ID"]]),
+            ],
+            "formatos": [
+                ("A1", {"textFormat": {"bold": True, "fontSize": 14}, "backgroundColor": AZUL}),
+                ("A2:F2", {"textFormat": {"bold": True, "foregroundColor": BRANCO},
+                           "backgroundColor": AZUL, "horizontalAlignment": "CENTER"}),
+                # Coluna de valor já nasce como moeda: o append não formata mais
+                ("D3:D", {"numberFormat": MOEDA}),
+            ],
+            "mesclar": ["A1:F1"],
+            "larguras": [100, 300, 150, 120, 300, 130],
+        },
+        {
+            "titulo": "Pagamentos",
+            "linhas": 1000,
+            "colunas": 6,
+            "valores": [
+                ("A1", "PAGAMENTOS - OBRA: {obra}"),
+                ("A2:F2", [["Data", "Nome do Funcionário", "Função", "Valor (R$)", "Observações", "ID"]]),
+            ],
+            "formatos": [
+                ("A1", {"textFormat": {"bold": True, "fontSize": 14}, "backgroundColor": AZUL}),
+                ("A2:F2", {"textFormat": {"bold": True, "foregroundColor": BRANCO},
+                           "backgroundColor": AZUL, "horizontalAlignment": "CENTER"}),
+                # Coluna de valor já nasce como moeda: o append não formata mais
+                ("D3:D", {"numberFormat": MOEDA}),
+            ],
+            "mesclar": ["A1:F1"],
+            "larguras": [100, 200, 150, 120, 300, 130],
+        },
+        {
+            "titulo": "Resumo",
+            "linhas": 100,
+            "colunas": 2,
+            "valores": [
+                ("A1", "RESUMO - OBRA: {obra}"),
+                ("A3:B4", [
+                    ["Total Gastos:", "=SUM(Gastos!D:D)"],
+                    ["Total Pagamentos:", "=SUM(Pagamentos!D:D)"],
+                ]),
+                ("A6:B6", [["TOTAL GERAL:", "=B3+B4"]]),
+            ],
+            "formatos": [
+                ("A1", {"textFormat": {"bold": True, "fontSize": 14}, "backgroundColor": AZUL}),
+                ("B3:B4", {"textFormat": {"bold": True}, "numberFormat": MOEDA}),
+                ("A6:B6", {"textFormat": {"bold": True},
+                           "backgroundColor": {"red": 1, "green": 0.75, "blue": 0}}),
+                ("B6", {"numberFormat": MOEDA}),
+            ],
+            "mesclar": ["A1:B1"],
+            "larguras": [200, 150],
+        },
+    ]
+}
+
+# ========== MONTAGEM DO LOTE ==========
+
+def ids_abas(modelo):
+    """Retorna o sheetId que cada aba do modelo recebe ao ser criada"""
+    return {aba['titulo']: indice for indice, aba in enumerate(modelo['abas'])}
+
+def _coluna(letras):
+    """Converte letras de coluna (A, B, ..., AA) em índice começando em 0"""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - ord('A') + 1)
+    return indice - 1
+
+def intervalo(sheet_id, a1):
+    """Converte notação A1 (ex: A2:E2, D3:D, B6) em GridRange"""
+    inicio, _, fim = a1.partition(':')
+    fim = fim or inicio
+
+    col_ini, lin_ini = re.fullmatch(r'([A-Z]+)(\d*)', inicio).groups()
+    col_fim, lin_fim = re.fullmatch(r'([A-Z]+)(\d*)', fim).groups()
+
+    grid = {
+        "sheetId": sheet_id,
+        "startColumnIndex": _coluna(col_ini),
+        "endColumnIndex": _coluna(col_fim) + 1,
+    }
+    if lin_ini:
+        grid["startRowIndex"] = int(lin_ini) - 1
+    if lin_fim:
+        grid["endRowIndex"] = int(lin_fim)
+    return grid
+
+def _celula(valor):
+    """Monta o userEnteredValue de uma célula"""
+    if isinstance(valor, str) and valor.startswith('='):
+        return {"userEnteredValue": {"formulaValue": valor}}
+    if isinstance(valor, (int, float)):
+        return {"userEnteredValue": {"numberValue": valor}}
+    return {"userEnteredValue": {"stringValue": str(valor)}}
+
+def montar_requisicoes(modelo, nome_obra):
+    """Gera a lista de requests do batch_update para provisionar a planilha"""
+    requisicoes = []
+    obra = nome_obra.upper()
+
+    for sheet_id, aba in enumerate(modelo['abas']):
+        propriedades = {
+            "sheetId": sheet_id,
+            "title": aba['titulo'],
+            "gridProperties": {"rowCount": aba['linhas'], "columnCount": aba['colunas']}
+        }
+        if sheet_id == 0:
+            requisicoes.append({"updateSheetProperties": {
+                "properties": propriedades,
+                "fields": "title,gridProperties(rowCount,columnCount)"
+            }})
+        else:
+            requisicoes.append({"addSheet": {"properties": propriedades}})
+
+        for a1, valores in aba.get('valores', []):
+            if not isinstance(valores, list):
+                valores = [[valores]]
+            linhas = [
+                {"values": [_celula(v.format(obra=obra) if isinstance(v, str) else v) for v in linha]}
+                for linha in valores
+            ]
+            requisicoes.append({"updateCells": {
+                "range": intervalo(sheet_id, a1),
+                "rows": linhas,
+                "fields": "userEnteredValue"
+            }})
+
+        for a1 in aba.get('mesclar', []):
+            requisicoes.append({"mergeCells": {
+                "range": intervalo(sheet_id, a1),
+                "mergeType": "MERGE_ALL"
+            }})
+
+        for a1, formato in aba.get('formatos', []):
+            requisicoes.append({"repeatCell": {
+                "range": intervalo(sheet_id, a1),
+                "cell": {"userEnteredFormat": formato},
+                "fields": f"userEnteredFormat({','.join(formato)})"
+            }})
+
+        for coluna, largura in enumerate(aba.get('larguras', [])):
+            requisicoes.append({"updateDimensionProperties": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "COLUMNS",
+                    "startIndex": coluna,
+                    "endIndex": coluna + 1
+                },
+                "properties": {"pixelSize": largura},
+                "fields": "pixelSize"
+            }})
+
+    return requisicoes
+
+def provisionar_planilha(gc, nome_obra, modelo):
+    """Cria a planilha da obra e aplica o modelo inteiro num único lote"""
+    spreadsheet = gc.create(f"Obra: {nome_obra}")
+    spreadsheet.batch_update({"requests": montar_requisicoes(modelo, nome_obra)})
+    return spreadsheet
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pré-processamento dos áudios antes do Whisper
+Com o ffmpeg instalado, os áudios longos perdem as pausas compridas, viram
+mono com bitrate de voz e, acima do tamanho de trecho configurado, são
+cortados nos silêncios em trechos transcritos em paralelo e juntados na
+ordem. O ffmpeg lê pelo stdin, sem arquivo temporário: num Ogg/Opus cada
+processo recebe só as páginas do seu trecho. Sem ffmpeg o áudio vai ao
+Whisper como chegou; se ele falhar num trecho, vai o original só daquele
+trecho
+"""
+
+import io
+import os
+import re
+import shutil
+import asyncio
+from execucao import em_thread
+from metricas import metricas
+
+# ========== CONFIGURAÇÕES ==========
+# Liga o pré-processamento (só tem efeito com o ffmpeg instalado)
+AUDIO_PREPROCESSAR = os.environ.get('AUDIO_PREPROCESSAR', '1') == '1'
+
+# Executável do ffmpeg (padrão: o que estiver no PATH)
+FFMPEG_BINARIO = os.environ.get('FFMPEG_BINARIO') or shutil.which('ffmpeg')
+
+# Áudios mais curtos que isso (segundos) vão direto, sem pré-processamento
+AUDIO_PREPROCESSAR_MIN_SEGUNDOS = float(os.environ.get('AUDIO_PREPROCESSAR_MIN_SEGUNDOS', '30'))
+
+# Bitrate do Opus enviado ao Whisper (mono, 16 kHz)
+AUDIO_BITRATE = os.environ.get('AUDIO_BITRATE', '16k')
+
+# Abaixo desse volume (dB) é silêncio; pausas maiores que AUDIO_PAUSA_MIN (s) são encurtadas
+AUDIO_SILENCIO_DB = float(os.environ.get('AUDIO_SILENCIO_DB', '-35'))
+AUDIO_PAUSA_MIN = float(os.environ.get('AUDIO_PAUSA_MIN', '0.6'))
+
+# Silêncio mantido (s) no lugar de cada pausa encurtada
+AUDIO_PAUSA_MANTIDA = float(os.environ.get('AUDIO_PAUSA_MANTIDA', '0.3'))
+
+# Tamanho desejado (s) de cada trecho; sem pausa por perto, corta em 1,5x isso
+AUDIO_TRECHO_SEGUNDOS = float(os.environ.get('AUDIO_TRECHO_SEGUNDOS', '60'))
+
+# Trechos codificados e transcritos ao mesmo tempo por áudio
+AUDIO_TRECHOS_SIMULTANEOS = int(os.environ.get('AUDIO_TRECHOS_SIMULTANEOS', '4'))
+
+# Trechos mais curtos que isso (s) depois do corte de silêncio são descartados
+TRECHO_MINIMO = 0.3
+
+# Áudio (s) entregue ao decoder antes e depois de cada trecho (pré-roll do Opus é 80 ms)
+MARGEM_TRECHO = 0.1
+
+# Bytes escritos por vez no stdin do ffmpeg
+BLOCO_ENTRADA = 256 * 1024
+
+# Codificações do ffmpeg ao mesmo tempo no processo (uma por núcleo)
+_limite_ffmpeg = asyncio.Semaphore(os.cpu_count() or 1)
+
+_avisado = False
+
+
+class ErroFfmpeg(Exception):
+    """ffmpeg terminou com erro"""
+
+
+def _tamanho(audio):
+    posicao = audio.tell()
+    audio.seek(0, os.SEEK_END)
+    tamanho = audio.tell()
+    audio.seek(posicao)
+    return tamanho
+
+
+def duracao_ogg(dados):
+    """Duração (s) de um Ogg/Opus pela posição da última página; None se não for Opus"""
+    cabecalho = dados.find(b'OpusHead')
+    ultima = dados.rfind(b'OggS\x00')
+    if cabecalho < 0 or ultima < 0 or len(dados) < ultima + 14:
+        return None
+    pre_skip = int.from_bytes(dados[cabecalho + 10:cabecalho + 12], 'little')
+    posicao = int.from_bytes(dados[ultima + 6:ultima + 14], 'little', signed=True)
+    return max(0.0, (posicao - pre_skip) / 48000)
+
+
+def _duracao_arquivo(audio, tamanho):
+    """duracao_ogg lendo só o começo e o fim do arquivo"""
+    audio.seek(0)
+    inicio = audio.read(4096)
+    audio.seek(max(0, tamanho - 65536))
+    fim = audio.read()
+    audio.seek(0)
+    return duracao_ogg(inicio + fim)
+
+
+def _ler(audio, posicao, quantidade):
+    """Lê sem mexer na posição do arquivo (vários ffmpeg leem o mesmo áudio ao mesmo tempo)"""
+    if isinstance(audio, io.BytesIO):
+        with audio.getbuffer() as buffer:
+            return bytes(buffer[posicao:posicao + quantidade])
+    return os.pread(audio.fileno(), quantidade, posicao)
+
+
+def paginas_ogg(audio, tamanho):
+    """[(posição, granule)] de cada página Ogg, lendo só os cabeçalhos; None se não for Ogg"""
+    paginas = []
+    posicao = 0
+    while posicao < tamanho:
+        cabecalho = _ler(audio, posicao, 27)
+        if len(cabecalho) < 27 or cabecalho[:4] != b'OggS':
+            return None
+        segmentos = _ler(audio, posicao + 27, cabecalho[26])
+        paginas.append((posicao, int.from_bytes(cabecalho[6:14], 'little', signed=True)))
+        posicao += 27 + len(segmentos) + sum(segmentos)
+    return paginas
+
+
+def faixas_trecho(paginas, tamanho, inicio=0.0, fim=None):
+    """Bytes do original que cobrem [início, fim): ([(de, até)], instante em que começam)
+
+    Num Ogg/Opus são os cabeçalhos mais as páginas do trecho, um arquivo
+    válido que o ffmpeg (ou o Whisper) lê sem busca. Em outros formatos vai
+    o áudio inteiro e o ffmpeg decodifica desde o começo
+    """
+    # Páginas de áudio (os cabeçalhos OpusHead/OpusTags têm granule 0)
+    com_audio = [i for i, (_, granule) in enumerate(paginas or []) if granule > 0]
+    if not com_audio:
+        return [(0, tamanho)], 0.0
+
+    # A página anterior ao trecho termina no instante em que os bytes enviados começam
+    anteriores = [i for i in com_audio if paginas[i][1] <= (inicio - MARGEM_TRECHO) * 48000]
+    ate = tamanho
+    if fim is not None:
+        ultima = next((i for i in com_audio if paginas[i][1] >= (fim + MARGEM_TRECHO) * 48000), None)
+        if ultima is not None and ultima + 1 < len(paginas):
+            ate = paginas[ultima + 1][0]
+
+    if not anteriores:
+        return [(0, ate)], 0.0
+    anterior = anteriores[-1]
+    cabecalhos = paginas[com_audio[0]][0]
+    return [(0, cabecalhos), (paginas[anterior + 1][0], ate)], paginas[anterior][1] / 48000
+
+
+def pontos_de_corte(duracao, silencios, alvo=AUDIO_TRECHO_SEGUNDOS):
+    """[(início, fim)] dos trechos, cortando no meio da pausa mais perto de cada alvo"""
+    maximo = alvo * 1.5
+    trechos = []
+    inicio = 0.0
+    while duracao - inicio > maximo:
+        meios = [(a + b) / 2 for a, b in silencios if inicio + alvo / 2 < (a + b) / 2 <= inicio + maximo]
+        corte = min(meios, key=lambda meio: abs(meio - inicio - alvo), default=inicio + alvo)
+        trechos.append((inicio, corte))
+        inicio = corte
+    trechos.append((inicio, duracao))
+    return trechos
+
+
+async def _alimentar(entrada, audio, faixas):
+    """Escreve no stdin do ffmpeg os intervalos [(de, até)] de bytes do áudio"""
+    try:
+        for de, ate in faixas:
+            for posicao in range(de, ate, BLOCO_ENTRADA):
+                quantidade = min(BLOCO_ENTRADA, ate - posicao)
+                if isinstance(audio, io.BytesIO):
+                    bloco = _ler(audio, posicao, quantidade)
+                else:
+                    bloco = await em_thread(_ler, audio, posicao, quantidade)
+                entrada.write(bloco)
+                await entrada.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass   # o ffmpeg já parou de ler (fim do trecho, ou erro que sai no stderr)
+    finally:
+        entrada.close()
+
+
+async def _ffmpeg(*argumentos, audio=None, faixas=()):
+    """Roda o ffmpeg com os bytes das faixas do áudio no stdin; retorna (stdout, stderr)"""
+    processo = await asyncio.create_subprocess_exec(
+        FFMPEG_BINARIO, '-hide_banner', *argumentos,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    _, saida, erros = await asyncio.gather(
+        _alimentar(processo.stdin, audio, faixas), processo.stdout.read(), processo.stderr.read()
+    )
+    await processo.wait()
+    log = erros.decode('utf-8', 'replace')
+    if processo.returncode != 0:
+        linhas = log.strip().splitlines()
+        raise ErroFfmpeg(linhas[-1] if linhas else f"código {processo.returncode}")
+    return saida, log
+
+
+async def analisar(audio, tamanho):
+    """(duração, [(início, fim)] dos silêncios) numa passada do silencedetect"""
+    _, log = await _ffmpeg(
+        '-i', 'pipe:0',
+        '-af', f'silencedetect=noise={AUDIO_SILENCIO_DB}dB:d={AUDIO_PAUSA_MIN}',
+        '-f', 'null', '-',
+        audio=audio, faixas=[(0, tamanho)],
+    )
+    tempos = re.findall(r'time=(\d+):(\d+):([\d.]+)', log)
+    if not tempos:
+        raise ErroFfmpeg("duração do áudio não encontrada")
+    h, m, s = tempos[-1]
+    duracao = int(h) * 3600 + int(m) * 60 + float(s)
+
+    inicios = [float(v) for v in re.findall(r'silence_start: (-?[\d.]+)', log)]
+    fins = [float(v) for v in re.findall(r'silence_end: ([\d.]+)', log)]
+    fins += [duracao] * (len(inicios) - len(fins))  # termina em silêncio
+    return duracao, list(zip(inicios, fins))
+
+
+async def codificar(audio, faixas, deslocamento=0.0, inicio=0.0, fim=None):
+    """Trecho [início, fim) sem as pausas longas, mono 16 kHz em Opus
+
+    faixas/deslocamento: bytes enviados ao ffmpeg e o instante (s) em que
+    eles começam no áudio original (ver faixas_trecho)
+    """
+    recorte = ''
+    if fim is not None:
+        # Corte no filtro: o stdin não tem busca, e o -t de saída contaria o áudio já sem as pausas
+        recorte = (f'atrim=start={max(0.0, inicio - deslocamento):.3f}:end={fim - deslocamento:.3f},'
+                   'asetpts=PTS-STARTPTS,')
+    filtro = (
+        f'{recorte}silenceremove=start_periods=1:start_threshold={AUDIO_SILENCIO_DB}dB'
+        f':stop_periods=-1:stop_duration={AUDIO_PAUSA_MIN}:stop_threshold={AUDIO_SILENCIO_DB}dB'
+        f':stop_silence={AUDIO_PAUSA_MANTIDA}'
+    )
+    # compression_level 0: encoder bem mais rápido e, em voz a 16 kbps, quase o mesmo tamanho
+    saida, _ = await _ffmpeg(
+        '-i', 'pipe:0',
+        '-af', filtro, '-ac', '1', '-ar', '16000',
+        '-c:a', 'libopus', '-b:a', AUDIO_BITRATE, '-application', 'voip', '-compression_level', '0',
+        '-f', 'ogg', 'pipe:1',
+        audio=audio, faixas=faixas,
+    )
+    return saida
+
+
+def _disponivel():
+    global _avisado
+    if not AUDIO_PREPROCESSAR:
+        return False
+    if not FFMPEG_BINARIO:
+        if not _avisado:
+            print("ℹ️ ffmpeg não encontrado: áudios vão ao Whisper sem pré-processamento")
+            _avisado = True
+        return False
+    return True
+
+
+async def transcrever_em_trechos(audio, transcrever):
+    """Pré-processa o áudio e transcreve os trechos em paralelo, juntando na ordem
+
+    transcrever: corrotina que envia um arquivo ao Whisper e retorna o texto.
+    Cada trecho vai ao Whisper assim que fica pronto, enquanto os seguintes
+    ainda estão sendo codificados
+    """
+    if not _disponivel():
+        return await transcrever(audio)
+    tamanho = _tamanho(audio)
+    duracao = _duracao_arquivo(audio, tamanho)
+    # Sem cabeçalho Opus, estima pelo tamanho (nota de voz do Telegram: ~32 kbps)
+    if (duracao or tamanho * 8 / 32000) < AUDIO_PREPROCESSAR_MIN_SEGUNDOS:
+        return await transcrever(audio)
+
+    envios = asyncio.Semaphore(AUDIO_TRECHOS_SIMULTANEOS)
+    enviados = []
+    # Ogg/Opus: índice das páginas para mandar a cada ffmpeg só os bytes do seu trecho
+    paginas = await em_thread(paginas_ogg, audio, tamanho) if duracao is not None else None
+
+    async def trecho(de, ate):
+        faixas, deslocamento = faixas_trecho(paginas, tamanho, de, ate)
+        try:
+            async with _limite_ffmpeg:
+                with metricas.medir('bot_ffmpeg_segundos', operacao='codificacao'):
+                    dados = await codificar(audio, faixas, deslocamento, de, ate)
+        except ErroFfmpeg as e:
+            if ate is None or paginas is None:
+                raise
+            # Só esse trecho vai como chegou: as páginas Ogg dele, sem recodificar
+            print(f"⚠️ ffmpeg falhou no trecho {de:.0f}-{ate:.0f}s, enviando o original dele: {e}")
+            metricas.contar('bot_preprocessamento_erros_total')
+            dados = b''.join([_ler(audio, inicio, fim - inicio) for inicio, fim in faixas])
+        else:
+            if (duracao_ogg(dados) or 0) < TRECHO_MINIMO:
+                return ''   # só silêncio
+        # Inteiro e sem ganho de tamanho: vai o original
+        envio = audio if ate is None and len(dados) >= tamanho else io.BytesIO(dados)
+        enviados.append(tamanho if envio is audio else len(dados))
+        async with envios:
+            return await transcrever(envio)
+
+    tarefas = []
+    try:
+        if duracao is None or len(pontos_de_corte(duracao, [])) > 1:
+            # Longo (ou duração desconhecida): procura as pausas para cortar
+            with metricas.medir('bot_ffmpeg_segundos', operacao='analise'):
+                duracao, silencios = await analisar(audio, tamanho)
+            cortes = pontos_de_corte(duracao, silencios)
+        else:
+            cortes = [(0.0, None)]
+        tarefas = [asyncio.ensure_future(trecho(de, ate)) for de, ate in cortes]
+        textos = await asyncio.gather(*tarefas)
+    except (OSError, ErroFfmpeg) as e:
+        if enviados:
+            # Parte já foi ao Whisper: reenviar tudo repetiria o trabalho (e passa de 25 MB nas gravações)
+            raise
+        print(f"⚠️ Pré-processamento falhou, enviando o áudio original: {e}")
+        metricas.contar('bot_preprocessamento_erros_total')
+        audio.seek(0)
+        return await transcrever(audio)
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+
+    metricas.contar('bot_audio_bytes_originais_total', tamanho)
+    metricas.contar('bot_audio_bytes_enviados_total', sum(enviados))
+    metricas.contar('bot_audio_trechos_total', len(enviados))
+    return ' '.join(texto.strip() for texto in textos if texto.strip())
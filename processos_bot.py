@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vários processos de trabalho, repartidos por chat_id
+Um processo de entrada recebe os updates (polling ou webhook) e repassa
+cada um ao processo `chat_id % N`; assim os áudios de um mesmo chat
+continuam em ordem, enquanto chats diferentes usam interpretadores
+diferentes. O estado compartilhado fica nos arquivos SQLite (WAL)
+"""
+
+import os
+import signal
+import asyncio
+import multiprocessing
+from telegram import Update
+
+# ========== CONFIGURAÇÕES ==========
+# Processos de trabalho (1 = tudo num processo só, como antes)
+BOT_PROCESSOS = int(os.environ.get('BOT_PROCESSOS', '1'))
+
+# Segundos para cada processo terminar os áudios aceitos ao desligar
+BOT_TEMPO_ENCERRAMENTO = float(os.environ.get('BOT_TEMPO_ENCERRAMENTO', '90'))
+
+# Sinal de fim enviado pela fila de cada processo
+FIM = None
+
+
+def processo_do_chat(chat_id, total):
+    """Índice do processo responsável pelo chat (sempre o mesmo)"""
+    return (chat_id or 0) % total
+
+
+class RoteadorUpdates:
+    """No processo de entrada: sobe os processos e distribui os updates"""
+
+    def __init__(self, alvo, quantidade=BOT_PROCESSOS):
+        # alvo(indice, fila): função de nível de módulo que roda um processo de trabalho
+        contexto = multiprocessing.get_context('spawn')
+        self.filas = [contexto.Queue() for _ in range(quantidade)]
+        self.processos = [
+            contexto.Process(target=alvo, args=(i, fila), name=f'bot-trabalho-{i}')
+            for i, fila in enumerate(self.filas)
+        ]
+        self.enviados = [0] * quantidade
+
+    def iniciar(self):
+        for processo in self.processos:
+            processo.start()
+
+    async def rotear(self, update, context):
+        """Handler do processo de entrada: repassa o update ao processo do chat"""
+        chat_id = update.effective_chat.id if update.effective_chat else 0
+        indice = processo_do_chat(chat_id, len(self.filas))
+        self.filas[indice].put(update.to_dict())
+        self.enviados[indice] += 1
+
+    def encerrar(self, timeout=BOT_TEMPO_ENCERRAMENTO):
+        """Pede para cada processo terminar o que aceitou e aguarda"""
+        for fila in self.filas:
+            fila.put(FIM)
+        for processo in self.processos:
+            processo.join(timeout)
+            if processo.is_alive():
+                print(f"⚠️ {processo.name} não terminou a tempo, encerrando à força")
+                processo.terminate()
+
+
+async def _consumir(application, fila):
+    """Passa os updates da fila entre processos para a aplicação até o FIM"""
+    loop = asyncio.get_running_loop()
+    while True:
+        dados = await loop.run_in_executor(None, fila.get)
+        if dados is FIM:
+            return
+        await application.update_queue.put(Update.de_json(dados, application.bot))
+
+
+async def _servir(application, fila):
+    """Mesma sequência do run_polling, sem buscar updates no Telegram"""
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await _consumir(application, fila)
+    finally:
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+def executar_trabalho(application, indice, fila):
+    """Corpo de um processo de trabalho (quem desliga é o processo de entrada)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    print(f"⚙️ Processo de trabalho {indice} pronto (pid {os.getpid()})")
+    asyncio.run(_servir(application, fila))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mensagem de progresso única por áudio
+Em vez de uma resposta nova por etapa ("Recebendo", "Transcrevendo",
+transcrição, "Processando", resultado), o bot manda uma mensagem só e a
+edita. As edições têm intervalo mínimo e só a última situação é enviada
+(estados intermediários são pulados se o processamento estiver à frente);
+a edição final sai em segundo plano, fora do caminho do próximo áudio
+"""
+
+import os
+import time
+import asyncio
+from telegram.error import BadRequest, RetryAfter, TelegramError
+from metricas import metricas
+
+# ========== CONFIGURAÇÕES ==========
+# Intervalo mínimo (segundos) entre edições da mesma mensagem (a final não espera)
+PROGRESSO_INTERVALO = float(os.environ.get('PROGRESSO_INTERVALO', '1.0'))
+
+# Tempo máximo (segundos) para entregar as edições finais ao desligar
+PROGRESSO_TEMPO_ENCERRAMENTO = float(os.environ.get('PROGRESSO_TEMPO_ENCERRAMENTO', '15'))
+
+# Edições ainda não entregues (aguardadas no encerramento)
+_tarefas = set()
+
+
+class ProgressoMensagem:
+    """Uma mensagem por áudio, editada a cada etapa
+
+    origem: mensagem do usuário (a de progresso é enviada como resposta a ela)
+    """
+
+    def __init__(self, origem, intervalo=PROGRESSO_INTERVALO):
+        self.origem = origem
+        self.intervalo = intervalo
+        self.mensagem = None        # mensagem de progresso, depois do primeiro envio
+        self._desejado = None       # (texto, parse_mode) mais recente
+        self._publicado = None      # (texto, parse_mode) já visível no chat
+        self._final = False
+        self._mudou = asyncio.Event()
+        self._concluido = asyncio.Event()
+        self._tarefa = None
+
+    def atualizar(self, texto, parse_mode=None):
+        """Troca a situação mostrada (não espera o Telegram)"""
+        if self._final:
+            return
+        if self._mudou.is_set():
+            # A situação anterior nem chegou a ser enviada
+            metricas.contar('bot_progresso_pulados_total')
+        self._desejado = (texto, parse_mode)
+        self._mudou.set()
+        if self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._publicar())
+            _tarefas.add(self._tarefa)
+            self._tarefa.add_done_callback(_tarefas.discard)
+
+    def concluir(self, texto, parse_mode=None):
+        """Situação final, enviada sem esperar o intervalo; retorna a tarefa de envio"""
+        self.atualizar(texto, parse_mode)
+        self._final = True
+        self._concluido.set()
+        return self._tarefa
+
+    async def _publicar(self):
+        """Envia a primeira mensagem e as edições, sempre com a situação mais recente"""
+        ultima = float('-inf')
+        while True:
+            await self._mudou.wait()
+            espera = ultima + self.intervalo - time.monotonic()
+            if espera > 0 and not self._final:
+                try:
+                    await asyncio.wait_for(self._concluido.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+
+            self._mudou.clear()
+            estado = self._desejado
+            if estado != self._publicado:
+                try:
+                    await self._enviar(*estado)
+                    self._publicado = estado
+                except RetryAfter as e:
+                    # Limite do chat: espera e tenta de novo com a situação mais recente
+                    await asyncio.sleep(e.retry_after)
+                    self._mudou.set()
+                    continue
+                except BadRequest as e:
+                    await self._sem_formatacao(estado, e)
+                except TelegramError as e:
+                    print(f"⚠️ Erro ao atualizar progresso: {e}")
+                ultima = time.monotonic()
+
+            if self._final and not self._mudou.is_set():
+                return
+
+    async def _enviar(self, texto, parse_mode):
+        if self.mensagem is None:
+            self.mensagem = await self.origem.reply_text(texto, parse_mode=parse_mode)
+        else:
+            await self.mensagem.edit_text(texto, parse_mode=parse_mode)
+
+    async def _sem_formatacao(self, estado, erro):
+        """Markdown inválido (ex: transcrição com "_"): envia o texto puro"""
+        texto, parse_mode = estado
+        if 'not modified' in str(erro).lower():
+            self._publicado = estado
+            return
+        if parse_mode is None:
+            print(f"⚠️ Erro ao atualizar progresso: {erro}")
+            return
+        try:
+            await self._enviar(texto, None)
+            self._publicado = estado
+        except TelegramError as e:
+            print(f"⚠️ Erro ao atualizar progresso: {e}")
+
+
+async def aguardar_progressos(tempo_max=PROGRESSO_TEMPO_ENCERRAMENTO):
+    """Espera as edições finais pendentes (ao desligar)"""
+    if not _tarefas:
+        return
+    _, restantes = await asyncio.wait(list(_tarefas), timeout=tempo_max)
+    for tarefa in restantes:
+        tarefa.cancel()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro persistente obra → planilha
+Guarda a chave da planilha e o id de cada aba para abrir direto com
+open_by_key, sem busca por título no Drive a cada mensagem
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+import unicodedata
+import gspread
+
+# ========== CONFIGURAÇÕES ==========
+REGISTRO_OBRAS_DB = os.environ.get('REGISTRO_OBRAS_DB', 'registro_obras.db')
+
+
+def chave_obra(titulo):
+    """Normaliza o título da planilha para usar como chave do registro"""
+    texto = unicodedata.normalize('NFKD', titulo)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto.casefold()).strip()
+
+
+class RegistroObras:
+    """Mapa em memória (persistido em SQLite) de obras para planilhas"""
+
+    def __init__(self, caminho=REGISTRO_OBRAS_DB):
+        self.caminho = caminho
+        # Protege só os dicionários e o SQLite; nunca é segurado durante chamadas à API
+        self._lock = threading.RLock()
+        self._conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS obras (
+                chave TEXT PRIMARY KEY,
+                titulo TEXT NOT NULL,
+                spreadsheet_id TEXT NOT NULL,
+                abas TEXT NOT NULL
+            )
+        """)
+        self._conexao.commit()
+
+        # chave -> {"titulo", "spreadsheet_id", "abas": {nome_aba: sheet_id}}
+        self._obras = {}
+        for chave, titulo, spreadsheet_id, abas in self._conexao.execute(
+                "SELECT chave, titulo, spreadsheet_id, abas FROM obras"):
+            self._obras[chave] = {
+                "titulo": titulo,
+                "spreadsheet_id": spreadsheet_id,
+                "abas": json.loads(abas)
+            }
+
+        # Handles já abertos neste processo
+        self._planilhas = {}
+        self._worksheets = {}
+        self._locks_obras = {}
+
+    def obter_planilha(self, gc, titulo, criar, abas_novas=None):
+        """Retorna a planilha da obra; busca no Drive só se não estiver no registro
+
+        abas_novas: ids das abas de uma planilha criada por `criar` (evita
+        reler os metadados logo após o provisionamento)
+        """
+        chave = chave_obra(titulo)
+
+        # As chamadas à API ficam fora de self._lock: só quem abre a mesma
+        # obra espera; url()/titulos() no event loop nunca esperam a rede
+        with self._lock_obra(chave):
+            with self._lock:
+                if chave in self._planilhas:
+                    return self._planilhas[chave]
+                registro = self._obras.get(chave)
+
+            spreadsheet = None
+
+            if registro:
+                try:
+                    spreadsheet = gc.open_by_key(registro['spreadsheet_id'])
+                except gspread.SpreadsheetNotFound:
+                    # Planilha apagada no Drive: esquecer e procurar de novo
+                    self.remover(titulo)
+
+            if spreadsheet is None:
+                try:
+                    spreadsheet = gc.open(titulo)
+                    self.registrar(titulo, spreadsheet)
+                except gspread.SpreadsheetNotFound:
+                    spreadsheet = criar()
+                    self.registrar(titulo, spreadsheet, abas_novas)
+
+            with self._lock:
+                self._planilhas[chave] = spreadsheet
+            return spreadsheet
+
+    def obter_aba(self, gc, titulo, nome_aba, criar, abas_novas=None):
+        """Retorna a aba da obra usando o id registrado (sem chamada extra à API)"""
+        chave = chave_obra(titulo)
+
+        with self._lock_obra(chave):
+            with self._lock:
+                if (chave, nome_aba) in self._worksheets:
+                    return self._worksheets[(chave, nome_aba)]
+
+            spreadsheet = self.obter_planilha(gc, titulo, criar, abas_novas)
+            with self._lock:
+                sheet_id = self._obras[chave]['abas'].get(nome_aba)
+
+            if sheet_id is None:
+                sheet = spreadsheet.worksheet(nome_aba)
+                with self._lock:
+                    self._obras[chave]['abas'][nome_aba] = sheet.id
+                    self._salvar(chave)
+            else:
+                sheet = gspread.Worksheet(spreadsheet, {
+                    "sheetId": sheet_id,
+                    "title": nome_aba,
+                    "index": 0
+                })
+
+            with self._lock:
+                self._worksheets[(chave, nome_aba)] = sheet
+            return sheet
+
+    def _lock_obra(self, chave):
+        """Lock de uma obra: serializa a abertura/criação da mesma planilha"""
+        with self._lock:
+            return self._locks_obras.setdefault(chave, threading.RLock())
+
+    def url(self, titulo):
+        """Link da planilha já registrada (None se a obra ainda não tem planilha)"""
+        chave = chave_obra(titulo)
+        with self._lock:
+            registro = self._obras.get(chave) or self._recarregar(chave)
+        if registro is None:
+            return None
+        return f"https://docs.google.com/spreadsheets/d/{registro['spreadsheet_id']}"
+
+    def titulos(self):
+        """Títulos de todas as planilhas registradas (relidos do SQLite)"""
+        with self._lock:
+            return [titulo for (titulo,) in self._conexao.execute("SELECT titulo FROM obras")]
+
+    def _recarregar(self, chave):
+        """Relê uma obra do SQLite (pode ter sido registrada por outro processo)"""
+        linha = self._conexao.execute(
+            "SELECT titulo, spreadsheet_id, abas FROM obras WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            return None
+        self._obras[chave] = {
+            "titulo": linha[0],
+            "spreadsheet_id": linha[1],
+            "abas": json.loads(linha[2])
+        }
+        return self._obras[chave]
+
+    def registrar(self, titulo, spreadsheet, abas=None):
+        """Grava (ou atualiza) a planilha de uma obra no registro"""
+        if abas is None:
+            abas = {ws.title: ws.id for ws in spreadsheet.worksheets()}
+
+        chave = chave_obra(titulo)
+        with self._lock:
+            self._obras[chave] = {
+                "titulo": titulo,
+                "spreadsheet_id": spreadsheet.id,
+                "abas": dict(abas)
+            }
+            self._planilhas[chave] = spreadsheet
+            self._salvar(chave)
+
+    def remover(self, titulo):
+        """Remove a obra do registro e dos handles em memória"""
+        chave = chave_obra(titulo)
+        with self._lock:
+            self._obras.pop(chave, None)
+            self._planilhas.pop(chave, None)
+            for chave_aba in [c for c in self._worksheets if c[0] == chave]:
+                del self._worksheets[chave_aba]
+            self._conexao.execute("DELETE FROM obras WHERE chave = ?", (chave,))
+            self._conexao.commit()
+
+    def _salvar(self, chave):
+        """Persiste o registro de uma obra no SQLite"""
+        registro = self._obras[chave]
+        self._conexao.execute(
+            "INSERT OR REPLACE INTO obras (chave, titulo, spreadsheet_id, abas) VALUES (?, ?, ?, ?)",
+            (chave, registro['titulo'], registro['spreadsheet_id'], json.dumps(registro['abas']))
+        )
+        self._conexao.commit()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resolução do nome da obra dito no áudio para uma obra já conhecida
+"obra do João", "João" e "obra joao silva" viram a mesma obra: o nome é
+dobrado numa passada só (minúsculas, sem acento, sem pontuação), as
+palavras de ligação saem e a busca usa um índice de trigramas com
+distância de edição nos candidatos. Obra nova só quando nada é parecido
+"""
+
+import os
+import threading
+import unicodedata
+from collections import Counter
+
+# ========== CONFIGURAÇÕES ==========
+# Similaridade mínima (0 a 1) para usar uma obra existente em vez de criar outra
+OBRA_SIMILARIDADE = float(os.environ.get('OBRA_SIMILARIDADE', '0.82'))
+
+# Palavras que não distinguem uma obra da outra ("obra do João" = "João")
+PALAVRAS_LIGACAO = frozenset({
+    'obra', 'obras', 'a', 'o', 'as', 'os', 'da', 'do', 'das', 'dos', 'de',
+    'na', 'no', 'nas', 'nos', 'em', 'e', 'para', 'pra', 'pro',
+})
+
+# Faixas cobertas pela dobra: latim (com acentos), acentos soltos e pontuação geral
+FAIXAS_DOBRA = ((0x0000, 0x0250), (0x0300, 0x0370), (0x2000, 0x2070))
+
+# Fração mínima de trigramas em comum para um candidato ser avaliado
+SOBREPOSICAO_MINIMA = 0.5
+
+
+def _tabela_dobra():
+    """Tabela do str.translate: letra acentuada → base, pontuação → espaço"""
+    tabela = {}
+    for codigo in (c for inicio, fim in FAIXAS_DOBRA for c in range(inicio, fim)):
+        caractere = chr(codigo)
+        categoria = unicodedata.category(caractere)
+        if categoria[0] == 'L':
+            base = ''.join(
+                c for c in unicodedata.normalize('NFKD', caractere.casefold())
+                if not unicodedata.combining(c)
+            )
+            if base != caractere:
+                tabela[codigo] = base
+        elif categoria[0] == 'M':
+            tabela[codigo] = None
+        elif categoria[0] != 'N':
+            tabela[codigo] = ' '
+    return tabela
+
+
+# Montada uma vez na importação; cada nome é dobrado com um único translate
+TABELA_DOBRA = _tabela_dobra()
+
+
+def dobrar_nome(nome):
+    """Minúsculas, sem acento e sem pontuação, com espaços simples"""
+    return ' '.join((nome or '').translate(TABELA_DOBRA).split())
+
+
+def titulo_obra(nome):
+    """Nome de planilha a partir do nome falado ("obra do joão" → "Obra Do Joao")"""
+    return dobrar_nome(nome).title()
+
+
+def nucleo_obra(nome):
+    """Palavras que identificam a obra (sem "obra", "do", "da"...)"""
+    palavras = dobrar_nome(nome).split()
+    nucleo = [p for p in palavras if p not in PALAVRAS_LIGACAO]
+    return ' '.join(nucleo or palavras)
+
+
+def trigramas(texto):
+    """Trigramas do texto com borda ("  jo", " joa", ...)"""
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def distancia_edicao(a, b, limite=None):
+    """Levenshtein com troca de letras vizinhas ("jaoo" → "joao" = 1)
+
+    Para de calcular quando passa do limite (retorna limite + 1)
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limite is not None and len(a) - len(b) > limite:
+        return limite + 1
+    antepenultima, anterior = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            custo = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                custo = min(custo, antepenultima[j - 2] + 1)
+            atual.append(custo)
+        if limite is not None and min(atual) > limite:
+            return limite + 1
+        antepenultima, anterior = anterior, atual
+    return anterior[-1]
+
+
+def _palavras_iguais(a, b):
+    """Mesma palavra, admitindo um erro de digitação/transcrição nas longas"""
+    if a == b:
+        return True
+    if a.isdigit() or b.isdigit() or min(len(a), len(b)) < 4:
+        return False
+    return distancia_edicao(a, b, 1) <= 1
+
+
+def _contida(menor, maior):
+    """Todas as palavras de `menor` aparecem em `maior` ("joao" em "joao silva")"""
+    return all(any(_palavras_iguais(p, q) for q in maior) for p in menor)
+
+
+def similaridade(a, b, trigramas_a=None, trigramas_b=None):
+    """Nota de 0 a 1 entre dois núcleos de nome de obra (trigramas e edição)"""
+    if a == b:
+        return 1.0
+
+    # Números distinguem obras ("rua 10" ≠ "rua 12")
+    if {p for p in a.split() if p.isdigit()} != {p for p in b.split() if p.isdigit()}:
+        return 0.0
+
+    trigramas_a = trigramas_a or trigramas(a)
+    trigramas_b = trigramas_b or trigramas(b)
+    dice = 2 * len(trigramas_a & trigramas_b) / (len(trigramas_a) + len(trigramas_b))
+
+    maior = max(len(a), len(b))
+    edicao = 1 - distancia_edicao(a, b, maior // 4) / maior
+    return max(dice, edicao)
+
+
+def compativeis(a, b):
+    """Um nome é parte do outro ("joao" e "joao silva"; não "joao silva" e "joao souza")"""
+    palavras_a, palavras_b = a.split(), b.split()
+    menor, maior = sorted((palavras_a, palavras_b), key=len)
+    return _contida(menor, maior)
+
+
+class ResolvedorObras:
+    """Índice de trigramas dos nomes (núcleos) das obras conhecidas
+
+    Cada obra guarda os apelidos com que já foi resolvida; um nome parcial
+    ("joao" ↔ "joao silva") só casa se for compatível com todos eles.
+
+    fonte: função opcional que retorna nomes de obras conhecidas; é relida
+    antes de criar uma obra nova (pode ter sido criada por outro processo)
+    formatar: nome dado a uma obra nova (padrão: o nome falado, sem espaços extras)
+    """
+
+    # Nota de um nome parcial compatível (abaixo de um nome igual)
+    NOTA_PARCIAL = 0.9
+
+    def __init__(self, fonte=None, formatar=None, limiar=OBRA_SIMILARIDADE):
+        self.fonte = fonte
+        self.formatar = formatar or (lambda nome: ' '.join(nome.split()))
+        self.limiar = limiar
+        self._lock = threading.Lock()
+        self._obras = {}                # núcleo (nome ou apelido) -> nome da obra
+        self._apelidos = {}             # nome da obra -> núcleos
+        self._trigramas = {}            # núcleo -> trigramas
+        self._indice = {}               # trigrama -> núcleos
+        self._vocabulario = Counter()   # palavras dos nomes das obras (sem apelidos)
+        self.resolvidas = 0
+        self.novas = 0
+        if fonte is not None:
+            self.carregar(fonte())
+
+    def carregar(self, nomes):
+        """Inclui obras já existentes (o primeiro nome de cada núcleo vale)"""
+        with self._lock:
+            for nome in nomes:
+                nucleo = nucleo_obra(nome)
+                if nucleo and nucleo not in self._obras:
+                    self._indexar(nucleo, nome)
+                    self._vocabulario.update(nucleo.split())
+
+    def encontrar(self, nome):
+        """Obra conhecida mais parecida com o nome (None se nenhuma passa do limiar)"""
+        nucleo = nucleo_obra(nome)
+        if not nucleo:
+            return None
+        with self._lock:
+            return self._melhor(nucleo)
+
+    def resolver(self, nome):
+        """Obra existente mais parecida; se nenhuma, registra e retorna uma obra nova"""
+        nucleo = nucleo_obra(nome)
+        if not nucleo:
+            return self.formatar(nome or '')
+
+        with self._lock:
+            obra = self._melhor(nucleo)
+        if obra is None and self.fonte is not None:
+            self.carregar(self.fonte())
+            with self._lock:
+                obra = self._melhor(nucleo)
+
+        with self._lock:
+            if obra is None:
+                # Outra thread pode ter criado a mesma obra enquanto a fonte era lida
+                obra = self._obras.get(nucleo) or self.formatar(nome)
+                if nucleo not in self._obras:
+                    self._vocabulario.update(nucleo.split())
+                self.novas += 1
+            else:
+                self.resolvidas += 1
+            if nucleo not in self._obras:
+                self._indexar(nucleo, obra)
+            return obra
+
+    def obras(self):
+        with self._lock:
+            return list(self._apelidos)
+
+    def _indexar(self, nucleo, obra):
+        self._obras[nucleo] = obra
+        self._apelidos.setdefault(obra, set()).add(nucleo)
+        self._trigramas[nucleo] = trigramas(nucleo)
+        for trigrama in self._trigramas[nucleo]:
+            self._indice.setdefault(trigrama, set()).add(nucleo)
+
+    def _troca_conhecida(self, nucleo, candidato):
+        """Troca de uma palavra por outra que já é nome de obra ("marcio" x "marcos")
+
+        Erro de digitação gera palavra desconhecida; nome conhecido no lugar de
+        outro indica outra obra
+        """
+        palavras, outras = set(nucleo.split()), set(candidato.split())
+        sobram = outras - palavras
+        return bool(sobram) and any(p in self._vocabulario for p in palavras - outras)
+
+    def _melhor(self, nucleo):
+        if nucleo in self._obras:
+            return self._obras[nucleo]
+
+        consulta = trigramas(nucleo)
+        comuns = Counter()
+        for trigrama in consulta:
+            comuns.update(self._indice.get(trigrama, ()))
+
+        notas = {}  # obra -> melhor nota
+        for candidato, quantidade in comuns.items():
+            alvo = self._trigramas[candidato]
+            if quantidade < SOBREPOSICAO_MINIMA * min(len(consulta), len(alvo)):
+                continue
+            obra = self._obras[candidato]
+            if self._troca_conhecida(nucleo, candidato):
+                continue
+            nota = similaridade(nucleo, candidato, consulta, alvo)
+            if (nota < self.limiar and compativeis(nucleo, candidato)
+                    and all(compativeis(nucleo, apelido) for apelido in self._apelidos[obra])):
+                nota = self.NOTA_PARCIAL
+            if nota >= self.limiar and nota > notas.get(obra, 0.0):
+                notas[obra] = nota
+        if not notas:
+            return None
+
+        ordem = sorted(notas.items(), key=lambda item: -item[1])
+        # Empate entre obras diferentes ("joao" com "joao silva" e "joao souza"): não adivinhar
+        if len(ordem) > 1 and ordem[0][1] - ordem[1][1] < 0.02:
+            return None
+        return ordem[0][0]
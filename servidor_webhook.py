@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo webhook: servidor aiohttp embutido como alternativa ao run_polling
+O Telegram entrega cada update por POST; o servidor confere o token
+secreto, coloca o update na fila da aplicação e responde na hora.
+Também expõe /saude para o health check da plataforma e /metricas
+(formato Prometheus)
+"""
+
+import os
+import signal
+import asyncio
+import hashlib
+from aiohttp import web
+from telegram import Update
+from metricas import METRICAS_PORTA, TIPO_CONTEUDO, metricas, servir_metricas
+
+# ========== CONFIGURAÇÕES ==========
+# "polling" (padrão) ou "webhook"
+MODO_BOT = os.environ.get('MODO_BOT', 'polling').strip().lower()
+
+# Endereço público do serviço (ex: https://meu-bot.up.railway.app)
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_CAMINHO = '/' + os.environ.get('WEBHOOK_CAMINHO', 'telegram').strip('/')
+
+# Token conferido no cabeçalho X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SEGREDO = os.environ.get('WEBHOOK_SEGREDO', '')
+
+# Porta HTTP (o Railway informa em PORT)
+PORTA = int(os.environ.get('PORT', '8080'))
+
+CABECALHO_SEGREDO = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def segredo_padrao(token):
+    """Segredo derivado do token do bot (igual em todas as réplicas)"""
+    return hashlib.sha256(f"webhook:{token}".encode()).hexdigest()[:48]
+
+
+def criar_app_web(application, segredo, caminho=WEBHOOK_CAMINHO, estado=None):
+    """Aplicação aiohttp com o endpoint do webhook, o /saude e o /metricas
+
+    estado: função opcional que retorna um dict extra para o /saude
+    """
+
+    async def receber_update(request):
+        if segredo and request.headers.get(CABECALHO_SEGREDO) != segredo:
+            return web.Response(status=403, text='segredo inválido')
+        try:
+            dados = await request.json()
+        except ValueError:
+            return web.Response(status=400, text='json inválido')
+
+        # Só enfileira: o processamento segue na aplicação, fora desta requisição
+        application.update_queue.put_nowait(Update.de_json(dados, application.bot))
+        return web.Response(text='ok')
+
+    async def saude(request):
+        resposta = {
+            "status": "ok" if application.running else "parado",
+            "modo": "webhook",
+            "updates_na_fila": application.update_queue.qsize(),
+        }
+        if estado is not None:
+            resposta.update(estado())
+        return web.json_response(resposta, status=200 if application.running else 503)
+
+    async def exportar_metricas(request):
+        return web.Response(body=metricas.texto_prometheus().encode('utf-8'),
+                            headers={'Content-Type': TIPO_CONTEUDO})
+
+    app_web = web.Application()
+    app_web.router.add_post(caminho, receber_update)
+    app_web.router.add_get('/saude', saude)
+    app_web.router.add_get('/metricas', exportar_metricas)
+    return app_web
+
+
+async def servir_webhook(application, url_publica=WEBHOOK_URL, porta=PORTA,
+                         caminho=WEBHOOK_CAMINHO, segredo=WEBHOOK_SEGREDO,
+                         estado=None, drop_pending_updates=False, parar=None):
+    """Registra o webhook no Telegram e atende até SIGINT/SIGTERM (ou `parar`)"""
+    if not url_publica:
+        raise RuntimeError("WEBHOOK_URL não configurado (endereço público do bot)")
+    segredo = segredo or segredo_padrao(application.bot.token)
+
+    if parar is None:
+        parar = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sinal, parar.set)
+            except NotImplementedError:
+                pass
+
+    runner = web.AppRunner(criar_app_web(application, segredo, caminho, estado))
+
+    # Mesma sequência do run_polling, incluindo os ganchos post_*
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+
+        await application.bot.set_webhook(
+            url=url_publica + caminho,
+            secret_token=segredo,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=drop_pending_updates,
+        )
+        await application.start()
+
+        await runner.setup()
+        await web.TCPSite(runner, '0.0.0.0', porta).start()
+        print(f"🌐 Webhook ativo em {url_publica + caminho} (porta {porta})")
+
+        await parar.wait()
+    finally:
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+def executar(application, estado=None, **kwargs_polling):
+    """Roda o bot no modo escolhido em MODO_BOT"""
+    if MODO_BOT == 'webhook':
+        asyncio.run(servir_webhook(
+            application, estado=estado,
+            drop_pending_updates=kwargs_polling.get('drop_pending_updates', False)
+        ))
+    else:
+        # Polling não tem servidor HTTP: /metricas só com METRICAS_PORTA
+        if METRICAS_PORTA:
+            servir_metricas(METRICAS_PORTA)
+        application.run_polling(**kwargs_polling)
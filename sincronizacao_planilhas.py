@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sincronização do livro de lançamentos com as abas do Google Sheets
+Uma thread copia os lançamentos depois do cursor de cada aba num único
+values.append por aba. Depois de uma falha (ou ao iniciar o processo) a
+aba é conferida pela coluna ID antes de gravar, para não duplicar linhas
+que chegaram a ser gravadas antes da queda. Ao iniciar, as abas que o
+livro ainda não leu (disco novo depois de um deploy) são lidas numa única
+values.batchGet por planilha e entram no livro como já sincronizadas
+"""
+
+import os
+import re
+import threading
+from gspread.urls import SPREADSHEET_VALUES_BATCH_URL
+from gspread.utils import absolute_range_name
+from livro_lancamentos import ABAS
+
+# ========== CONFIGURAÇÕES ==========
+# Segundos entre passadas quando não há nada novo (e base do backoff após falha)
+SINCRONIZACAO_INTERVALO = float(os.environ.get('SINCRONIZACAO_INTERVALO', '5'))
+
+# Espera máxima (segundos) entre tentativas enquanto o Google estiver fora
+SINCRONIZACAO_ESPERA_MAX = float(os.environ.get('SINCRONIZACAO_ESPERA_MAX', '300'))
+
+# Linhas gravadas por chamada em cada aba
+SINCRONIZACAO_LOTE_MAX = int(os.environ.get('SINCRONIZACAO_LOTE_MAX', '200'))
+
+# Coluna com a chave de idempotência de cada linha (F = ID)
+COLUNA_ID = 6
+
+# Primeira linha de lançamentos nas abas (1: título, 2: cabeçalho)
+LINHA_DADOS = 3
+
+
+def linha_inicial(resposta):
+    """Extrai a primeira linha gravada do updatedRange retornado pelo append"""
+    intervalo = resposta['updates']['updatedRange']
+    return int(re.search(r'![A-Z]+(\d+)', intervalo).group(1))
+
+
+class SincronizadorPlanilhas:
+    """Espelha o livro de lançamentos nas abas Gastos/Pagamentos"""
+
+    def __init__(self, livro, obter_cliente, abrir_aba, listar_planilhas=None,
+                 intervalo=SINCRONIZACAO_INTERVALO,
+                 espera_max=SINCRONIZACAO_ESPERA_MAX,
+                 lote_max=SINCRONIZACAO_LOTE_MAX):
+        # obter_cliente() -> gspread.Client; abrir_aba(gc, obra, aba) -> Worksheet
+        # listar_planilhas(gc) -> [(obra, spreadsheet_id)] para a leitura inicial
+        self.livro = livro
+        self.obter_cliente = obter_cliente
+        self.abrir_aba = abrir_aba
+        self.listar_planilhas = listar_planilhas
+        self._importado = listar_planilhas is None
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self.lote_max = lote_max
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        # Abas já conferidas pela coluna ID desde o início/última falha
+        self._conferidas = set()
+        self._falhas_seguidas = 0
+
+        # Contadores
+        self.linhas_gravadas = 0
+        self.linhas_reconciliadas = 0
+        self.linhas_importadas = 0
+
+    def iniciar(self):
+        """Inicia a thread de sincronização"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._executar, name='sincronizacao', daemon=True
+            )
+            self._thread.start()
+
+    def acordar(self):
+        """Avisa que há lançamento novo (sincroniza sem esperar o intervalo)"""
+        self._acordar.set()
+
+    def parar(self, timeout=30):
+        """Faz uma última passada e encerra a thread"""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sincronizar(self):
+        """Uma passada por todas as abas pendentes; retorna True se tudo foi gravado"""
+        destinos = self.livro.destinos_pendentes()
+        if not destinos:
+            return True
+
+        try:
+            gc = self.obter_cliente()
+        except Exception as e:
+            print(f"⚠️ Sincronização adiada, Google indisponível: {e}")
+            return False
+        if gc is None:
+            return False
+
+        tudo_ok = True
+        for chave_obra, obra, aba in destinos:
+            try:
+                self._sincronizar_aba(gc, chave_obra, obra, aba)
+            except Exception as e:
+                tudo_ok = False
+                self._conferidas.discard((chave_obra, aba))
+                self.livro.marcar_falha(chave_obra, aba, e)
+                print(f"⚠️ Falha ao sincronizar {obra}/{aba}: {e}")
+        return tudo_ok
+
+    def importar_planilhas(self):
+        """Leitura única das abas de cada obra ainda não lida; False se algo falhou (tenta de novo)"""
+        try:
+            gc = self.obter_cliente()
+            planilhas = self.listar_planilhas(gc) if gc is not None else None
+        except Exception as e:
+            print(f"⚠️ Leitura inicial das planilhas adiada: {e}")
+            return False
+        if planilhas is None:
+            return False
+
+        tudo_ok = True
+        for obra, spreadsheet_id in planilhas:
+            # Marca por aba no livro: lançamentos gravados antes da leitura não a impedem
+            if self.livro.importado(obra):
+                continue
+            try:
+                importados = self.livro.importar(obra, self._ler_abas(gc, spreadsheet_id))
+            except Exception as e:
+                # Uma planilha com problema não segura as outras; ela é lida na próxima passada
+                print(f"⚠️ Não foi possível ler as abas de {obra}: {e}")
+                tudo_ok = False
+                continue
+            if importados:
+                self.linhas_importadas += importados
+                print(f"📥 {importados} lançamentos de {obra} lidos da planilha para o livro")
+        return tudo_ok
+
+    def _ler_abas(self, gc, spreadsheet_id):
+        """Gastos e Pagamentos numa única chamada: {tipo: [(número da linha, valores)]}"""
+        resposta = gc.request("get", SPREADSHEET_VALUES_BATCH_URL % spreadsheet_id, params={
+            "ranges": [absolute_range_name(aba, f'A{LINHA_DADOS}:F') for aba in ABAS.values()],
+            "valueRenderOption": "UNFORMATTED_VALUE",
+            "dateTimeRenderOption": "FORMATTED_STRING",
+        }).json()
+        return {
+            tipo: [(LINHA_DADOS + i, valores) for i, valores in enumerate(intervalo.get('values', []))]
+            for tipo, intervalo in zip(ABAS, resposta.get('valueRanges', []))
+        }
+
+    def _sincronizar_aba(self, gc, chave_obra, obra, aba):
+        """Grava os lançamentos pendentes de uma aba (em lotes)"""
+        sheet = self.abrir_aba(gc, obra, aba)
+
+        while True:
+            pendentes = self.livro.pendentes(chave_obra, aba, self.lote_max)
+            if not pendentes:
+                return
+
+            gravadas = []
+            if (chave_obra, aba) not in self._conferidas:
+                gravadas = self._reconciliar(sheet, pendentes)
+                self._conferidas.add((chave_obra, aba))
+                ja_gravados = {id_lanc for id_lanc, _ in gravadas}
+                pendentes = [p for p in pendentes if p[0] not in ja_gravados]
+
+            if pendentes:
+                resposta = sheet.spreadsheet.values_append(
+                    absolute_range_name(sheet.title, 'A1'),
+                    params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+                    body={"values": [linha + [chave] for _, chave, linha in pendentes]}
+                )
+                primeira = linha_inicial(resposta)
+                gravadas += [(id_lanc, primeira + i) for i, (id_lanc, _, _) in enumerate(pendentes)]
+                self.linhas_gravadas += len(pendentes)
+
+            self.livro.marcar_sincronizados(chave_obra, aba, gravadas)
+
+    def _reconciliar(self, sheet, pendentes):
+        """Procura na coluna ID os lançamentos que já estão na aba: [(id, linha)]"""
+        ids_planilha = sheet.col_values(COLUNA_ID)
+        linhas = {chave: numero for numero, chave in enumerate(ids_planilha, 1) if chave}
+
+        encontrados = [
+            (id_lanc, linhas[chave]) for id_lanc, chave, _ in pendentes if chave in linhas
+        ]
+        if encontrados:
+            self.linhas_reconciliadas += len(encontrados)
+            print(f"♻️ {len(encontrados)} lançamentos já estavam em {sheet.title}")
+        return encontrados
+
+    def _executar(self):
+        """Laço da thread: sincroniza, espera novidade ou o intervalo (com backoff)"""
+        while True:
+            parando = self._parar.is_set()
+            self._acordar.clear()
+
+            if not self._importado:
+                self._importado = self.importar_planilhas()
+            if self.sincronizar():
+                self._falhas_seguidas = 0
+                espera = self.intervalo
+            else:
+                self._falhas_seguidas += 1
+                espera = min(self.espera_max, self.intervalo * 2 ** self._falhas_seguidas)
+
+            if parando:
+                return
+            # Após falha, só o tempo de backoff acorda a thread (novos lançamentos esperam)
+            if self._falhas_seguidas:
+                self._parar.wait(espera)
+            else:
+                self._acordar.wait(espera)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Totais por obra mantidos em memória
+Montados uma vez a partir do livro de lançamentos (uma única consulta
+agrupada) e atualizados com os lançamentos novos, lidos pelo id (vale
+também para os gravados por outros processos); o /resumo responde daqui,
+sem ler a aba Resumo do Google. Obras que o livro não conhece (disco novo
+depois de um deploy) entram pela leitura inicial das abas feita pelo
+sincronizador
+"""
+
+import threading
+from collections import defaultdict
+from registro_obras import chave_obra
+
+# Mês do lançamento (AAAA-MM): pela data informada ou, sem ela, pela gravação
+MES_SQL = "COALESCE(substr(data_iso, 1, 7), strftime('%Y-%m', criado_em, 'unixepoch'))"
+
+
+def _novos_totais(obra):
+    return {
+        "obra": obra,
+        "gastos": 0.0,
+        "pagamentos": 0.0,
+        "quantidade": 0,
+        "categorias": defaultdict(float),
+        "funcoes": defaultdict(float),
+        "meses": defaultdict(float),
+    }
+
+
+class TotaisObras:
+    """Somas por obra: gastos, pagamentos, categoria, função e mês"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._obras = {}  # chave_obra -> totais
+        self.ultimo_id = 0
+
+    def carregar(self, conexao):
+        """Recalcula tudo a partir da tabela de lançamentos"""
+        obras = {}
+        ultimo_id = conexao.execute("SELECT COALESCE(MAX(id), 0) FROM lancamentos").fetchone()[0]
+        consulta = conexao.execute(f"""
+            SELECT chave_obra, MAX(obra), tipo, categoria, funcao, {MES_SQL}, SUM(valor), COUNT(*)
+            FROM lancamentos
+            WHERE id <= ?
+            GROUP BY 1, 3, 4, 5, 6
+        """, (ultimo_id,))
+        for chave, obra, tipo, categoria, funcao, mes, soma, quantidade in consulta:
+            totais = obras.setdefault(chave, _novos_totais(obra))
+            self._acumular(totais, tipo, soma, quantidade, categoria, funcao, mes)
+
+        with self._lock:
+            self._obras = obras
+            self.ultimo_id = ultimo_id
+
+    def atualizar(self, conexao):
+        """Soma os lançamentos gravados depois da última leitura (deste ou de outro processo)"""
+        with self._lock:
+            novos = conexao.execute(f"""
+                SELECT id, chave_obra, obra, tipo, categoria, funcao, {MES_SQL}, valor
+                FROM lancamentos
+                WHERE id > ?
+                ORDER BY id
+            """, (self.ultimo_id,)).fetchall()
+            for id_lanc, chave, obra, tipo, categoria, funcao, mes, valor in novos:
+                totais = self._obras.setdefault(chave, _novos_totais(obra))
+                self._acumular(totais, tipo, valor, 1, categoria, funcao, mes)
+                self.ultimo_id = id_lanc
+
+    def resumo(self, obra):
+        """Cópia dos totais da obra (None se não houver lançamentos)"""
+        with self._lock:
+            totais = self._obras.get(chave_obra(obra))
+            if totais is None:
+                return None
+            return {
+                nome: dict(valor) if isinstance(valor, defaultdict) else valor
+                for nome, valor in totais.items()
+            }
+
+    def obras(self):
+        """Nomes das obras com lançamentos"""
+        with self._lock:
+            return [totais['obra'] for totais in self._obras.values()]
+
+    @staticmethod
+    def _acumular(totais, tipo, valor, quantidade, categoria, funcao, mes):
+        valor = valor or 0.0
+        totais['quantidade'] += quantidade
+        totais['meses'][mes] += valor
+        if tipo == 'pagamento':
+            totais['pagamentos'] += valor
+            totais['funcoes'][funcao or 'Outros'] += valor
+        else:
+            totais['gastos'] += valor
+            totais['categorias'][categoria or 'Outros'] += valor
+
+
+def mensagem_resumo(resumo):
+    """Texto do /resumo (Markdown do Telegram)"""
+    total = resumo['gastos'] + resumo['pagamentos']
+    linhas = [
+        f"📊 *Resumo - Obra: {resumo['obra']}*\n",
+        f"💸 *Gastos:* R$ {resumo['gastos']:.2f}",
+        f"👷 *Pagamentos:* R$ {resumo['pagamentos']:.2f}",
+        f"💰 *Total:* R$ {total:.2f} ({resumo['quantidade']} lançamentos)",
+    ]
+    for titulo, grupo in (("🏷️ *Por categoria:*", 'categorias'),
+                          ("🔧 *Por função:*", 'funcoes')):
+        if resumo[grupo]:
+            linhas.append(f"\n{titulo}")
+            itens = sorted(resumo[grupo].items(), key=lambda item: -item[1])
+            linhas += [f"• {nome}: R$ {valor:.2f}" for nome, valor in itens]
+    if resumo['meses']:
+        linhas.append("\n📅 *Por mês:*")
+        linhas += [f"• {mes[5:]}/{mes[:4]}: R$ {valor:.2f}" for mes, valor in sorted(resumo['meses'].items())]
+    return '\n'.join(linhas)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transporte HTTP compartilhado para a API da OpenAI
+Pool de conexões (keep-alive), timeouts de conexão/leitura e novas
+tentativas com backoff exponencial + jitter em 429/5xx, respeitando Retry-After (até backoff_max)
+"""
+
+import os
+import random
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import httpx
+
+# ========== CONFIGURAÇÕES ==========
+OPENAI_TIMEOUT_CONEXAO = float(os.environ.get('OPENAI_TIMEOUT_CONEXAO', '10'))
+OPENAI_TIMEOUT_LEITURA = float(os.environ.get('OPENAI_TIMEOUT_LEITURA', '120'))
+OPENAI_MAX_TENTATIVAS = int(os.environ.get('OPENAI_MAX_TENTATIVAS', '4'))
+OPENAI_BACKOFF_BASE = float(os.environ.get('OPENAI_BACKOFF_BASE', '0.5'))
+OPENAI_BACKOFF_MAX = float(os.environ.get('OPENAI_BACKOFF_MAX', '30'))
+OPENAI_POOL_CONEXOES = int(os.environ.get('OPENAI_POOL_CONEXOES', '20'))
+
+# Respostas que valem uma nova tentativa
+STATUS_REPETIR = {408, 429, 500, 502, 503, 504}
+
+
+def segundos_retry_after(resposta):
+    """Lê o cabeçalho Retry-After (segundos ou data HTTP); None se ausente"""
+    valor = resposta.headers.get('Retry-After')
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+class TransporteHTTP:
+    """Cliente httpx assíncrono com pool, timeouts e novas tentativas"""
+
+    def __init__(self,
+                 timeout_conexao=OPENAI_TIMEOUT_CONEXAO,
+                 timeout_leitura=OPENAI_TIMEOUT_LEITURA,
+                 max_tentativas=OPENAI_MAX_TENTATIVAS,
+                 backoff_base=OPENAI_BACKOFF_BASE,
+                 backoff_max=OPENAI_BACKOFF_MAX,
+                 pool_conexoes=OPENAI_POOL_CONEXOES):
+        self.max_tentativas = max(1, max_tentativas)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tentativas_extras = 0
+        self.cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout_leitura, connect=timeout_conexao),
+            limits=httpx.Limits(
+                max_connections=pool_conexoes,
+                max_keepalive_connections=pool_conexoes
+            )
+        )
+
+    async def post(self, url, **kwargs):
+        """POST com novas tentativas; retorna a última resposta recebida"""
+        for tentativa in range(1, self.max_tentativas + 1):
+            ultima = tentativa == self.max_tentativas
+
+            try:
+                resposta = await self.cliente.post(url, **kwargs)
+            except httpx.TransportError as e:
+                # Timeout, conexão recusada/derrubada etc.
+                if ultima:
+                    raise
+                espera = self._backoff(tentativa)
+                print(f"⚠️ Falha de rede ({type(e).__name__}), nova tentativa em {espera:.1f}s")
+            else:
+                if resposta.status_code not in STATUS_REPETIR or ultima:
+                    return resposta
+                espera = segundos_retry_after(resposta)
+                if espera is None:
+                    espera = self._backoff(tentativa)
+                else:
+                    # Retry-After de horas não pode prender a mensagem: teto em backoff_max
+                    espera = min(espera, self.backoff_max)
+                print(f"⚠️ HTTP {resposta.status_code}, nova tentativa em {espera:.1f}s")
+
+            self.tentativas_extras += 1
+            await asyncio.sleep(espera)
+
+    async def fechar(self):
+        """Fecha as conexões do pool"""
+        await self.cliente.aclose()
+
+    def _backoff(self, tentativa):
+        """Backoff exponencial com jitter completo"""
+        teto = min(self.backoff_max, self.backoff_base * (2 ** (tentativa - 1)))
+        return random.uniform(0, teto)